@@ -1,14 +1,94 @@
-from fastapi import FastAPI, File
+import os
+import json
+import shutil
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from fastapi import FastAPI, File, Query, Request, UploadFile, WebSocket, WebSocketDisconnect
 from uvicorn import run as app_run
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response, JSONResponse
-from helmet.constants import APP_HOST, APP_PORT
+from fastapi.responses import Response, JSONResponse, FileResponse
+from starlette.background import BackgroundTask
+from helmet.constants import APP_HOST, APP_PORT, RESPONSE_FORMATS, RESPONSE_FORMAT_IMAGE, RESPONSE_FORMAT_JSON, PREDICT_BATCH_MAX_IMAGES, \
+    INFERENCE_MODES, INFERENCE_MODE_FULL, VIDEO_RESPONSE_FORMATS, VIDEO_RESPONSE_FORMAT_VIDEO, WEBSOCKET_MAX_PENDING_FRAMES
+from helmet.logger import logging
 from helmet.pipeline.train_pipeline import TrainPipeline
 from helmet.pipeline.prediction_pipeline import PredictionPipeline
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.batch_scheduler import BatchScheduler
+from helmet.serving.stream_scheduler import StreamScheduler
+from helmet.serving.inference_executor import InferenceExecutor
+from helmet.serving.model_watcher import ModelWatcher
+from helmet.serving.result_cache import ResultCache
+from helmet.serving.video_pipeline import VideoPipeline
+from helmet.serving.frame_gate import FrameGate
+from helmet.serving.frame_stream import FrameSlot, FrameStreamStats
+from helmet.serving.shared_memory_ingest import SharedMemoryIngest
+from helmet.serving.prefork_server import PreforkServer
+from helmet.serving.admission_control import AdmissionController, AdmissionRejected, find_rejection
+from helmet.serving.degradation import DegradationPolicy
+from helmet.serving.cascade import Cascade
+from helmet.serving.camera_roi import CameraRegions
+from helmet.utils.main_utils import get_process_memory_mb, get_process_pss_mb
+from helmet.entity.config_entity import BatchSchedulerConfig, StreamSchedulerConfig, InferenceExecutorConfig, ResultCacheConfig, VideoPipelineConfig, \
+    FrameGateConfig, SharedMemoryIngestConfig, PreforkServerConfig, \
+    AdmissionControlConfig, DegradationConfig, CascadeConfig, CameraROIConfig
+try:
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    # only uvicorn's websockets transport raises it, the wsproto one does not need the package
+    ConnectionClosed = WebSocketDisconnect
 
 
 app = FastAPI()
 
+model_registry = ModelRegistry()
+model_watcher = ModelWatcher(model_registry) if model_registry.model_registry_config.WATCHER_ENABLED else None
+degradation_config = DegradationConfig()
+# requests waiting for admission plus images waiting for a batch, read lazily as both are created below
+degradation_policy = DegradationPolicy(
+    model_registry,
+    queue_depth=lambda: (admission_controller.queue_depth if admission_controller is not None else 0) +
+                        (batch_scheduler.get_stats()["queue_depth"] if batch_scheduler is not None else 0),
+    degradation_config=degradation_config) if degradation_config.ENABLED else None
+batch_scheduler_config = BatchSchedulerConfig()
+batch_scheduler = BatchScheduler(model_registry, batch_scheduler_config,
+                                 degradation_policy=degradation_policy) if batch_scheduler_config.ENABLED else None
+stream_scheduler_config = StreamSchedulerConfig()
+stream_scheduler = StreamScheduler(model_registry, stream_scheduler_config,
+                                   degradation_policy=degradation_policy) if stream_scheduler_config.ENABLED else None
+inference_executor_config = InferenceExecutorConfig()
+# with batching every forward goes through one scheduler thread, one per enabled scheduler
+scheduler_threads = (batch_scheduler is not None) + (stream_scheduler is not None)
+inference_executor = InferenceExecutor(inference_executor_config,
+                                       concurrent_forwards=scheduler_threads if batch_scheduler is not None else None)
+result_cache_config = ResultCacheConfig()
+result_cache = ResultCache(result_cache_config) if result_cache_config.ENABLED else None
+frame_gate_config = FrameGateConfig()
+frame_gate = FrameGate(frame_gate_config) if frame_gate_config.ENABLED else None
+cascade = Cascade(CascadeConfig())
+camera_regions = CameraRegions(CameraROIConfig())
+frame_stream_stats = FrameStreamStats()
+shared_memory_ingest_config = SharedMemoryIngestConfig()
+# co-located grabbers are named streams too, sharing the stream scheduler with the WebSocket cameras
+shared_memory_ingest = SharedMemoryIngest(
+    lambda stream_name: PredictionPipeline(model_registry=model_registry, batch_scheduler=batch_scheduler,
+                                           frame_gate=frame_gate, stream_scheduler=stream_scheduler, stream_id=stream_name,
+                                           degradation_policy=degradation_policy, cascade=cascade,
+                                           camera_regions=camera_regions),
+    shared_memory_ingest_config) if shared_memory_ingest_config.ENABLED else None
+admission_control_config = AdmissionControlConfig()
+admission_controller = AdmissionController(admission_control_config) if admission_control_config.ENABLED else None
+# a video upload holds its slot for the whole video, so videos never take the image slots
+video_admission_controller = AdmissionController(admission_control_config,
+                                                 max_concurrent=admission_control_config.VIDEO_MAX_CONCURRENT,
+                                                 max_queue_depth=admission_control_config.VIDEO_MAX_QUEUE_DEPTH) \
+    if admission_control_config.ENABLED else None
+training_executor = ThreadPoolExecutor(max_workers=inference_executor_config.TRAINING_MAX_WORKERS,
+                                       thread_name_prefix="training")
+
 origins = ["*"]
 
 app.add_middleware(
@@ -20,12 +100,133 @@ app.add_middleware(
 )
 
 
+def is_video_prediction(request: Request) -> bool:
+    return request.url.path == "/predict/video"
+
+
+def shed_response(rejection: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(content=str(rejection), status_code=503, headers={"Retry-After": str(rejection.retry_after_seconds)})
+
+
+def expired_response(error: Exception) -> Optional[JSONResponse]:
+    """503 for an admitted request whose deadline passed before its forward, None for any other error"""
+    rejection = find_rejection(error)
+    if rejection is None or admission_controller is None:
+        return None
+    admission_controller.record_expired()
+    rejection.retry_after_seconds = admission_controller.retry_after()
+    return shed_response(rejection)
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    # only prediction requests compete for the inference executor
+    if admission_controller is None or not request.url.path.startswith("/predict"):
+        return await call_next(request)
+    is_video = is_video_prediction(request)
+    controller = video_admission_controller if is_video else admission_controller
+    try:
+        deadline_ms = float(request.headers[admission_control_config.DEADLINE_HEADER])
+    except (KeyError, ValueError):
+        deadline_ms = admission_control_config.VIDEO_DEADLINE_MS if is_video else None
+    try:
+        async with controller.admit(deadline_ms) as deadline:
+            # the endpoint checks the deadline again right before the forward
+            request.state.deadline = deadline
+            return await call_next(request)
+    except AdmissionRejected as e:
+        return shed_response(e)
+
+
+@app.middleware("http")
+async def serving_tier(request: Request, call_next):
+    # outermost of the two, so the latency the policy sees includes the wait for admission;
+    # a video's duration says nothing about the load, so videos are left out of the latency window
+    if degradation_policy is None or not request.url.path.startswith("/predict") or is_video_prediction(request):
+        return await call_next(request)
+    # resolved once, the endpoint runs the request on this tier's model and reports the same name
+    serving_tier = degradation_policy.resolve()
+    request.state.serving_tier = serving_tier
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    if response.status_code != 503:
+        degradation_policy.observe(time.perf_counter() - start_time, serving_tier.name)
+    response.headers["X-Serving-Tier"] = serving_tier.name
+    return response
+
+
+@app.on_event("startup")
+async def load_model():
+    inference_executor.start()
+    # load the detector once so requests only pay for inference
+    try:
+        await inference_executor.run(model_registry.initialize)
+    except Exception as e:
+        # keep serving /train, the model is loaded lazily on the first prediction instead
+        logging.error(f"Could not load the model at startup: {e}")
+    if batch_scheduler is not None:
+        batch_scheduler.start()
+    if stream_scheduler is not None:
+        stream_scheduler.start()
+    # under prefork the parent watches for new models and only worker 0 owns the shared memory rings
+    if model_watcher is not None and not PreforkServer.is_worker():
+        model_watcher.start()
+    if shared_memory_ingest is not None and PreforkServer.is_primary():
+        shared_memory_ingest.start()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    if shared_memory_ingest is not None:
+        shared_memory_ingest.stop()
+    if model_watcher is not None:
+        model_watcher.stop()
+    if stream_scheduler is not None:
+        stream_scheduler.stop()
+    if batch_scheduler is not None:
+        batch_scheduler.stop()
+    inference_executor.shutdown()
+    training_executor.shutdown(wait=False)
+
+
+@app.get("/model")
+async def model_info():
+    return JSONResponse(content=model_registry.get_model_info(), status_code=200)
+
+
+@app.get("/stats")
+async def stats():
+    content = {
+        "batch_scheduler": batch_scheduler.get_stats() if batch_scheduler is not None else None,
+        "stream_scheduler": stream_scheduler.get_stats() if stream_scheduler is not None else None,
+        "inference_executor": inference_executor.get_stats(),
+        "model_watcher": model_watcher.get_stats() if model_watcher is not None and not PreforkServer.is_worker() else None,
+        "result_cache": result_cache.get_stats() if result_cache is not None else None,
+        "admission_control": admission_controller.get_stats() if admission_controller is not None else None,
+        "video_admission_control": video_admission_controller.get_stats() if video_admission_controller is not None else None,
+        "degradation": degradation_policy.get_stats() if degradation_policy is not None else None,
+        "cascade": cascade.get_stats(),
+        "camera_regions": camera_regions.get_stats(),
+        "frame_gate": frame_gate.get_stats() if frame_gate is not None else None,
+        "websocket": frame_stream_stats.get_stats(),
+        "shared_memory_ingest": shared_memory_ingest.get_stats() if shared_memory_ingest is not None and PreforkServer.is_primary() else None,
+        "process": {
+            "worker": PreforkServer.worker_info,
+            "rss_mb": round(get_process_memory_mb(), 1),
+            "pss_mb": get_process_pss_mb(),
+        },
+    }
+    return JSONResponse(content=content, status_code=200)
+
+
 @app.get("/train")
 async def training():
     try:
         train_pipeline = TrainPipeline()
 
-        train_pipeline.run_pipeline()
+        # training runs on its own executor so it never occupies the inference workers
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(training_executor, train_pipeline.run_pipeline)
 
         return Response("Training successful !!")
 
@@ -34,16 +235,169 @@ async def training():
 
 
 @app.post("/predict")
-async def prediction(image_file: bytes = File(description="A file read as bytes")):
+async def prediction(request: Request, image_file: bytes = File(description="A file read as bytes"),
+                     response_format: str = Query(RESPONSE_FORMAT_IMAGE, description="'image' for the rendered jpeg, "
+                                                  "'json' for boxes, labels and scores only"),
+                     mode: str = Query(INFERENCE_MODE_FULL, description="'full' for the whole frame, 'tiled' for "
+                                       "overlapping full resolution tiles, 'cascade' for a low resolution pass "
+                                       "re-checked at full resolution only when uncertain"),
+                     region_mask: Optional[bytes] = File(None, description="Optional mask image, non zero pixels are "
+                                                         "searched, the rest is skipped"),
+                     camera_id: Optional[str] = Query(None, description="Stream name, frames that barely changed since "
+                                                      "this camera's last inferred frame reuse its detections and "
+                                                      "only the camera's region of interest is searched")):
+    if response_format not in RESPONSE_FORMATS:
+        return JSONResponse(content=f"response_format must be one of {RESPONSE_FORMATS}", status_code=400)
+    if mode not in INFERENCE_MODES:
+        return JSONResponse(content=f"mode must be one of {INFERENCE_MODES}", status_code=400)
     try:
-        prediction_pipeline = PredictionPipeline()
-        final_output = prediction_pipeline.run_pipeline(image_file)
-        # print(final_output)
-        # return JSONResponse(content= final_output, status_code=200)
+        prediction_pipeline = PredictionPipeline(model_registry=model_registry, batch_scheduler=batch_scheduler,
+                                                 result_cache=result_cache, frame_gate=frame_gate,
+                                                 degradation_policy=degradation_policy, cascade=cascade,
+                                                 camera_regions=camera_regions,
+                                                 deadline=getattr(request.state, "deadline", None),
+                                                 serving_tier=getattr(request.state, "serving_tier", None))
+        # decode, inference and encode run on the bounded executor, the event loop keeps serving
+        final_output = await inference_executor.run(prediction_pipeline.run_pipeline, image_file, response_format,
+                                                    mode, region_mask, camera_id)
+        if response_format == RESPONSE_FORMAT_JSON:
+            return JSONResponse(content=final_output, status_code=200)
         return final_output
     except Exception as e:
+        return expired_response(e) or JSONResponse(content=f"Error Occurred! {e}", status_code=500)
+
+
+
+@app.post("/predict/batch")
+async def batch_prediction(request: Request, image_files: List[UploadFile] = File(description="Image files"),
+                           response_format: str = Query(RESPONSE_FORMAT_IMAGE, description="'image' or 'json', as for /predict")):
+    if response_format not in RESPONSE_FORMATS:
+        return JSONResponse(content=f"response_format must be one of {RESPONSE_FORMATS}", status_code=400)
+    if len(image_files) > PREDICT_BATCH_MAX_IMAGES:
+        return JSONResponse(content=f"At most {PREDICT_BATCH_MAX_IMAGES} images per request", status_code=413)
+    try:
+        images = [await image_file.read() for image_file in image_files]
+        prediction_pipeline = PredictionPipeline(model_registry=model_registry, batch_scheduler=batch_scheduler,
+                                                 degradation_policy=degradation_policy, cascade=cascade,
+                                                 camera_regions=camera_regions,
+                                                 deadline=getattr(request.state, "deadline", None),
+                                                 serving_tier=getattr(request.state, "serving_tier", None))
+        results = await inference_executor.run(prediction_pipeline.run_batch_pipeline, images, response_format)
+        for image_file, result in zip(image_files, results):
+            result["filename"] = image_file.filename
+        return JSONResponse(content={"results": results}, status_code=200)
+    except Exception as e:
+        return expired_response(e) or JSONResponse(content=f"Error Occurred! {e}", status_code=500)
+
+
+def save_upload(upload_file: UploadFile, path: str) -> None:
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload_file.file, f)
+
+
+@app.post("/predict/video")
+async def video_prediction(video_file: UploadFile = File(description="A video file, e.g. mp4"),
+                           response_format: str = Query(VIDEO_RESPONSE_FORMAT_VIDEO, description="'video' for the "
+                                                        "annotated mp4, 'json' for per frame detections"),
+                           frame_stride: int = Query(None, ge=1, description="Process every n-th frame, the rest are skipped"),
+                           detect_interval: int = Query(None, ge=1, description="Run the detector on every n-th processed "
+                                                        "frame and track boxes in between")):
+    if response_format not in VIDEO_RESPONSE_FORMATS:
+        return JSONResponse(content=f"response_format must be one of {VIDEO_RESPONSE_FORMATS}", status_code=400)
+    work_dir = tempfile.mkdtemp(prefix="helmet-video-")
+    try:
+        input_path = os.path.join(work_dir, os.path.basename(video_file.filename or "input.mp4"))
+        output_path = os.path.join(work_dir, "annotated.mp4") if response_format == VIDEO_RESPONSE_FORMAT_VIDEO else None
+        await inference_executor.run(save_upload, video_file, input_path)
+
+        # the serving_tier middleware leaves videos out, the whole video runs on the tier current now
+        prediction_pipeline = PredictionPipeline(model_registry=model_registry, batch_scheduler=batch_scheduler,
+                                                 degradation_policy=degradation_policy, cascade=cascade,
+                                                 camera_regions=camera_regions)
+        tier_headers = {"X-Serving-Tier": prediction_pipeline.tier_name} if prediction_pipeline.tier_name else {}
+        video_pipeline = VideoPipeline(prediction_pipeline, VideoPipelineConfig())
+        # the pipeline starts its own decode, inference and encode threads, one executor slot waits on them
+        final_output = await inference_executor.run(video_pipeline.run, input_path, output_path, frame_stride,
+                                                    detect_interval)
+
+        if response_format == VIDEO_RESPONSE_FORMAT_VIDEO:
+            return FileResponse(output_path, media_type="video/mp4", filename="annotated.mp4",
+                                headers={"X-Video-Stats": json.dumps(final_output["stats"]), **tier_headers},
+                                background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True))
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return JSONResponse(content=final_output, status_code=200, headers=tier_headers)
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
         return JSONResponse(content=f"Error Occurred! {e}", status_code=500)
 
 
+@app.websocket("/ws/predict")
+async def websocket_prediction(websocket: WebSocket, camera_id: Optional[str] = None, mode: str = INFERENCE_MODE_FULL):
+    """
+    Clients push encoded frames as binary messages and receive one JSON message per processed frame:
+    {"frame": sequence number, "image_size", "detections", "latency_ms", "dropped"}. Frames that
+    arrive while the connection already has WEBSOCKET_MAX_PENDING_FRAMES waiting replace the oldest.
+    """
+    await websocket.accept()
+    if mode not in INFERENCE_MODES:
+        await websocket.close(code=1008, reason=f"mode must be one of {INFERENCE_MODES}")
+        return
+
+    frame_slot = FrameSlot(WEBSOCKET_MAX_PENDING_FRAMES)
+    frame_stream_stats.connection_opened()
+    # named cameras are batched fairly against each other by the stream scheduler
+    prediction_pipeline = PredictionPipeline(model_registry=model_registry, batch_scheduler=batch_scheduler,
+                                             result_cache=result_cache, frame_gate=frame_gate,
+                                             stream_scheduler=stream_scheduler, stream_id=camera_id,
+                                             degradation_policy=degradation_policy, cascade=cascade,
+                                             camera_regions=camera_regions)
+
+    async def receive_frames():
+        sequence = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    frame_slot.put((sequence, time.perf_counter(), message["bytes"]))
+                    sequence += 1
+        finally:
+            frame_slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            frame = await frame_slot.get()
+            if frame is None:
+                break
+            sequence, received_at, data = frame
+            # every frame runs on the tier current when it is taken up
+            prediction_pipeline.pin_serving_tier()
+            try:
+                result = await inference_executor.run(prediction_pipeline.run_pipeline, data, RESPONSE_FORMAT_JSON,
+                                                      mode, None, camera_id)
+                message = {"frame": sequence, **result}
+                frame_stream_stats.frames_processed += 1
+            except Exception as e:
+                message = {"frame": sequence, "error": str(e)}
+                frame_stream_stats.errors += 1
+            message["latency_ms"] = round(1000 * (time.perf_counter() - received_at), 2)
+            message["dropped"] = frame_slot.dropped
+            await websocket.send_json(message)
+    except (WebSocketDisconnect, ConnectionClosed, RuntimeError):
+        # the client went away mid send; starlette raises RuntimeError once the socket is closed
+        pass
+    finally:
+        receiver.cancel()
+        # collects the reader's cancellation or its own disconnect error so neither is logged as unretrieved
+        await asyncio.gather(receiver, return_exceptions=True)
+        frame_stream_stats.connection_closed(frame_slot)
+
+
 if __name__ == "__main__":
-    app_run(app, host=APP_HOST, port=APP_PORT)
\ No newline at end of file
+    prefork_server_config = PreforkServerConfig()
+    if prefork_server_config.WORKERS > 1:
+        PreforkServer(app, model_registry, prefork_server_config, model_watcher=model_watcher).run()
+    else:
+        app_run(app, host=APP_HOST, port=APP_PORT)
\ No newline at end of file
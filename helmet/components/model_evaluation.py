@@ -11,6 +11,7 @@ from helmet.constants import *
 from helmet.logger import logging
 from helmet.exception import HelmetException
 from helmet.utils.main_utils import load_object
+from helmet.ml.models.model_configuration import set_model_input_size
 from helmet.entity.config_entity import ModelEvaluationConfig
 from helmet.configuration.s3_operations import S3Operation
 from helmet.entity.artifacts_entity import ModelTrainerArtifacts, DataTransformationArtifacts, ModelEvaluationArtifacts
@@ -127,6 +128,7 @@ class ModelEvaluation:
             logging.info("loaded saved model")
 
             trained_model = trained_model.to(DEVICE)
+            set_model_input_size(trained_model, self.model_evaluation_config.MODEL_MIN_SIZE, self.model_evaluation_config.MODEL_MAX_SIZE)
 
             all_losses_dict, all_losses = self.evaluate(trained_model, test_loader, device=DEVICE)
             os.makedirs(self.model_evaluation_config.EVALUATED_MODEL_DIR, exist_ok=True)
@@ -134,6 +136,8 @@ class ModelEvaluation:
 
             s3_model = self.get_model_from_s3()
             s3_model = torch.load(s3_model, map_location=torch.device(DEVICE))
+            # models trained before the resolution change still carry torchvision's 800/1333 bounds
+            set_model_input_size(s3_model, self.model_evaluation_config.MODEL_MIN_SIZE, self.model_evaluation_config.MODEL_MAX_SIZE)
 
             s3_all_losses_dict, s3_all_losses = self.evaluate(s3_model,test_loader, device=DEVICE)
 
@@ -0,0 +1,225 @@
+import os
+import sys
+import inspect
+import torch
+import torch.nn.functional as F
+from torchvision.ops import box_iou
+from helmet.logger import logging
+from helmet.exception import HelmetException
+from helmet.constants import EXPORT_PARITY_MATCH_IOU
+from helmet.utils.main_utils import load_object
+from helmet.entity.config_entity import ModelExporterConfig
+from helmet.entity.artifacts_entity import ModelTrainerArtifacts, DataTransformationArtifacts, ModelExporterArtifacts
+from helmet.serving.inference_backend import OnnxRuntimeBackend
+
+
+class ModelExporter:
+    def __init__(self, model_exporter_config: ModelExporterConfig,
+                 model_trainer_artifacts: ModelTrainerArtifacts,
+                 data_transformation_artifacts: DataTransformationArtifacts):
+        """
+        :param model_exporter_config: Configuration for model exporter
+        :param model_trainer_artifacts: Output reference of model trainer artifact stage
+        :param data_transformation_artifacts: Output reference of data transformation artifact stage,
+                                              the test split is used for the parity check
+        """
+        self.model_exporter_config = model_exporter_config
+        self.model_trainer_artifacts = model_trainer_artifacts
+        self.data_transformation_artifacts = data_transformation_artifacts
+
+
+    def export_torchscript(self, model) -> str:
+        """
+        Method Name :   export_torchscript
+        Description :   This method scripts the eager detector and saves it as a TorchScript archive.
+                        Freezing and graph optimisation happen at load time on the serving device.
+
+        Output      :   Path of the TorchScript model
+        """
+        logging.info("Entered the export_torchscript method of ModelExporter class")
+        try:
+            model.eval()
+            scripted_model = torch.jit.script(model)
+            os.makedirs(self.model_exporter_config.TRAINED_MODEL_DIR, exist_ok=True)
+            scripted_model.save(self.model_exporter_config.TORCHSCRIPT_MODEL_PATH)
+            logging.info("Exited the export_torchscript method of ModelExporter class")
+            return self.model_exporter_config.TORCHSCRIPT_MODEL_PATH
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def export_onnx(self, model) -> str:
+        """
+        Method Name :   export_onnx
+        Description :   This method exports the detector to ONNX. The graph takes a single CHW image
+                        with dynamic height and width and returns boxes, labels and scores.
+
+        Output      :   Path of the ONNX model
+        """
+        logging.info("Entered the export_onnx method of ModelExporter class")
+        try:
+            model = model.to("cpu").eval()
+            size = self.model_exporter_config.EXPORT_INPUT_SIZE
+            sample_image = torch.rand(3, size, size)
+            os.makedirs(self.model_exporter_config.TRAINED_MODEL_DIR, exist_ok=True)
+            # the dynamo exporter needs onnxscript, the TorchScript based one exports this model as is
+            export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+            torch.onnx.export(model, ([sample_image],), self.model_exporter_config.ONNX_MODEL_PATH, **export_kwargs,
+                              opset_version=self.model_exporter_config.ONNX_OPSET_VERSION,
+                              do_constant_folding=True,
+                              input_names=["image"],
+                              output_names=["boxes", "labels", "scores"],
+                              dynamic_axes={"image": [1, 2], "boxes": [0], "labels": [0], "scores": [0]})
+            logging.info("Exited the export_onnx method of ModelExporter class")
+            return self.model_exporter_config.ONNX_MODEL_PATH
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    @staticmethod
+    def compare_predictions(reference: dict, candidate: dict, match_iou: float = EXPORT_PARITY_MATCH_IOU):
+        """
+        Returns the max absolute box and score difference between two prediction dicts, infinity
+        when they do not contain the same detections. Detections are paired by label and IoU, not
+        by index, so boxes with tied scores that come out in another order still match.
+        """
+        reference = {k: v.cpu() for k, v in reference.items()}
+        candidate = {k: v.cpu() for k, v in candidate.items()}
+        if len(reference['boxes']) != len(candidate['boxes']):
+            return float('inf'), float('inf')
+        if len(reference['boxes']) == 0:
+            return 0.0, 0.0
+
+        iou = box_iou(reference['boxes'], candidate['boxes'])
+        iou[reference['labels'][:, None] != candidate['labels'][None, :]] = -1
+        box_diff, score_diff = 0.0, 0.0
+        # greedy, most confident reference detection first
+        for index in reference['scores'].argsort(descending=True).tolist():
+            match = int(iou[index].argmax())
+            if iou[index, match] < match_iou:
+                return float('inf'), float('inf')
+            iou[:, match] = -1
+            box_diff = max(box_diff, (reference['boxes'][index] - candidate['boxes'][match]).abs().max().item())
+            score_diff = max(score_diff, abs(reference['scores'][index].item() - candidate['scores'][match].item()))
+        return box_diff, score_diff
+
+
+    def parity_images(self) -> list:
+        """Test images plus resized copies of the first one at other, non square, sizes"""
+        test_dataset = load_object(self.data_transformation_artifacts.transformed_test_object)
+        num_images = min(self.model_exporter_config.PARITY_NUM_IMAGES, len(test_dataset))
+        images = [test_dataset[index][0] for index in range(num_images)]
+        if images:
+            images += [F.interpolate(images[0][None], size=size, mode="bilinear", align_corners=False)[0]
+                       for size in self.model_exporter_config.PARITY_EXTRA_SIZES]
+        return images
+
+
+    def parity_check(self, model, export_predict, device=None) -> tuple:
+        """
+        Method Name :   parity_check
+        Description :   This method runs the eager model and an exported model on the test split,
+                        plus copies at other sizes, and compares boxes, labels and scores.
+
+        Output      :   Max box difference, max score difference
+        """
+        logging.info("Entered the parity_check method of ModelExporter class")
+        try:
+            images = self.parity_images()
+            device = device if device is not None else self.model_exporter_config.DEVICE
+            model.to(device).eval()
+            max_box_diff, max_score_diff = 0.0, 0.0
+            for image in images:
+                image = image.to(device)
+                with torch.inference_mode():
+                    reference = model([image])[0]
+                    candidate = export_predict(image)
+                box_diff, score_diff = self.compare_predictions(reference, candidate, self.model_exporter_config.PARITY_MATCH_IOU)
+                max_box_diff = max(max_box_diff, box_diff)
+                max_score_diff = max(max_score_diff, score_diff)
+
+            logging.info(f"Parity over {len(images)} images: max box diff {max_box_diff}, max score diff {max_score_diff}")
+            logging.info("Exited the parity_check method of ModelExporter class")
+            return max_box_diff, max_score_diff
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def is_within_tolerance(self, max_box_diff: float, max_score_diff: float) -> bool:
+        return max_box_diff <= self.model_exporter_config.PARITY_BOX_ATOL and \
+            max_score_diff <= self.model_exporter_config.PARITY_SCORE_ATOL
+
+
+    def export_with_parity(self, name: str, model, export, load_predict, device=None) -> tuple:
+        """
+        Exports model with export(model), loads it back with load_predict(path) and checks parity. A
+        failing export is logged and reported as failed parity, it must not stop training.
+
+        Output      :   Export path (None when the export failed), max box diff, max score diff, parity ok
+        """
+        try:
+            model_path = export(model)
+            logging.info(f"Exported {name} model to {model_path}")
+            box_diff, score_diff = self.parity_check(model, load_predict(model_path), device=device)
+            is_parity_ok = self.is_within_tolerance(box_diff, score_diff)
+            if not is_parity_ok:
+                logging.warning(f"{name} model does not match the eager model within tolerance")
+            return model_path, box_diff, score_diff, is_parity_ok
+        except Exception as e:
+            logging.error(f"{name} export failed, it will not be published: {e}")
+            return None, float('inf'), float('inf'), False
+
+
+    def load_torchscript_predict(self, model_path: str):
+        scripted_model = torch.jit.load(model_path, map_location=self.model_exporter_config.DEVICE)
+        scripted_model.eval()
+        # a scripted detection model always returns a (losses, detections) tuple
+        return lambda image: scripted_model([image])[1][0]
+
+
+    @staticmethod
+    def load_onnx_predict(model_path: str):
+        onnx_backend = OnnxRuntimeBackend("cpu")
+        onnx_backend.load(model_path)
+        return lambda image: onnx_backend([image])[0]
+
+
+    def initiate_model_exporter(self) -> ModelExporterArtifacts:
+        """
+        Method Name :   initiate_model_exporter
+        Description :   This function exports the trained model to TorchScript and ONNX for serving
+                        and checks each export against the eager model
+
+        Output      :   Returns model exporter artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_model_exporter method of ModelExporter class")
+        try:
+            model = torch.load(self.model_trainer_artifacts.trained_model_path,
+                               map_location=self.model_exporter_config.DEVICE)
+
+            torchscript_model_path, torchscript_box_diff, torchscript_score_diff, is_torchscript_parity_ok = \
+                self.export_with_parity("TorchScript", model, self.export_torchscript, self.load_torchscript_predict)
+            # onnxruntime runs on the cpu here, so compare against the eager model on the cpu too
+            onnx_model_path, onnx_box_diff, onnx_score_diff, is_onnx_parity_ok = \
+                self.export_with_parity("ONNX", model, self.export_onnx, self.load_onnx_predict, device=torch.device("cpu"))
+
+            model_exporter_artifacts = ModelExporterArtifacts(
+                torchscript_model_path=torchscript_model_path,
+                torchscript_parity_max_box_diff=torchscript_box_diff,
+                torchscript_parity_max_score_diff=torchscript_score_diff,
+                is_torchscript_parity_ok=is_torchscript_parity_ok,
+                onnx_model_path=onnx_model_path,
+                onnx_parity_max_box_diff=onnx_box_diff,
+                onnx_parity_max_score_diff=onnx_score_diff,
+                is_onnx_parity_ok=is_onnx_parity_ok,
+            )
+            logging.info(f"Model exporter artifact: {model_exporter_artifacts}")
+            logging.info("Exited the initiate_model_exporter method of ModelExporter class")
+            return model_exporter_artifacts
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
@@ -2,16 +2,20 @@ import sys
 from helmet.exception import HelmetException
 from helmet.logger import logging
 from helmet.entity.config_entity import ModelPusherConfig
-from helmet.entity.artifacts_entity import ModelPusherArtifacts
+from helmet.entity.artifacts_entity import ModelPusherArtifacts, ModelExporterArtifacts, ModelQuantizationArtifacts
 from helmet.configuration.s3_operations import S3Operation
 
 
 class ModelPusher:
 
-    def __init__(self, model_pusher_config: ModelPusherConfig, s3: S3Operation):
+    def __init__(self, model_pusher_config: ModelPusherConfig, s3: S3Operation,
+                 model_exporter_artifacts: ModelExporterArtifacts = None,
+                 model_quantization_artifacts: ModelQuantizationArtifacts = None):
 
         self.model_pusher_config = model_pusher_config
         self.s3 = s3
+        self.model_exporter_artifacts = model_exporter_artifacts
+        self.model_quantization_artifacts = model_quantization_artifacts
 
     
     def initiate_model_pusher(self) -> ModelPusherArtifacts:
@@ -32,6 +36,34 @@ class ModelPusher:
             )
             logging.info("Uploaded best model to s3 bucket")
 
+            if self.model_exporter_artifacts is not None and self.model_exporter_artifacts.is_torchscript_parity_ok:
+                self.s3.upload_file(
+                    self.model_exporter_artifacts.torchscript_model_path,
+                    self.model_pusher_config.S3_TORCHSCRIPT_MODEL_KEY_PATH,
+                    self.model_pusher_config.BUCKET_NAME,
+                    remove=False,
+                )
+                logging.info("Uploaded TorchScript model to s3 bucket")
+
+            if self.model_exporter_artifacts is not None and self.model_exporter_artifacts.is_onnx_parity_ok:
+                self.s3.upload_file(
+                    self.model_exporter_artifacts.onnx_model_path,
+                    self.model_pusher_config.S3_ONNX_MODEL_KEY_PATH,
+                    self.model_pusher_config.BUCKET_NAME,
+                    remove=False,
+                )
+                logging.info("Uploaded ONNX model to s3 bucket")
+
+            # the int8 model is published once it reloads and runs, the quantization report tells whether to serve it
+            if self.model_quantization_artifacts is not None and self.model_quantization_artifacts.is_load_check_ok:
+                self.s3.upload_file(
+                    self.model_quantization_artifacts.quantized_model_path,
+                    self.model_pusher_config.S3_QUANTIZED_MODEL_KEY_PATH,
+                    self.model_pusher_config.BUCKET_NAME,
+                    remove=False,
+                )
+                logging.info("Uploaded quantized model to s3 bucket")
+
             # Saving the model pusher artifacts
             model_pusher_artifact = ModelPusherArtifacts(
                 bucket_name=self.model_pusher_config.BUCKET_NAME,
@@ -0,0 +1,210 @@
+import os
+import sys
+import copy
+import time
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader
+from helmet.logger import logging
+from helmet.exception import HelmetException
+from helmet.utils.main_utils import load_object
+from helmet.ml.detection.engine import evaluate
+from helmet.entity.config_entity import ModelQuantizationConfig
+from helmet.entity.artifacts_entity import ModelTrainerArtifacts, DataTransformationArtifacts, ModelQuantizationArtifacts
+from helmet.serving.inference_backend import QuantizedTorchBackend
+
+
+class ModelQuantization:
+    def __init__(self, model_quantization_config: ModelQuantizationConfig,
+                 model_trainer_artifacts: ModelTrainerArtifacts,
+                 data_transformation_artifacts: DataTransformationArtifacts):
+        """
+        :param model_quantization_config: Configuration for model quantization
+        :param model_trainer_artifacts: Output reference of model trainer artifact stage
+        :param data_transformation_artifacts: Output reference of data transformation artifact stage,
+                                              the test split is used for calibration and the report
+        """
+        self.model_quantization_config = model_quantization_config
+        self.model_trainer_artifacts = model_trainer_artifacts
+        self.data_transformation_artifacts = data_transformation_artifacts
+
+
+    @staticmethod
+    def collate_fn(batch):
+        try:
+            return tuple(zip(*batch))
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def quantize_dynamic(self, model):
+        """
+        Method Name :   quantize_dynamic
+        Description :   This method quantizes the weights of the Linear layers (box head fc6/fc7 and the
+                        box predictor) to int8, activations are quantized on the fly.
+
+        Output      :   Quantized copy of the model
+        """
+        logging.info("Entered the quantize_dynamic method of ModelQuantization class")
+        try:
+            quantized_model = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear},
+                                                                     dtype=torch.qint8)
+            logging.info("Exited the quantize_dynamic method of ModelQuantization class")
+            return quantized_model
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def quantize_static_backbone(self, model, calibration_images):
+        """
+        Method Name :   quantize_static_backbone
+        Description :   This method applies post training static quantization to the MobileNetV3 body
+                        of the backbone with FX graph mode. Observers are calibrated by running the
+                        whole detector on the calibration images. The FPN, RPN and heads stay fp32.
+
+        Output      :   The model with a quantized backbone body
+        """
+        logging.info("Entered the quantize_static_backbone method of ModelQuantization class")
+        try:
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+            size = self.model_quantization_config.INPUT_SIZE
+            qconfig_mapping = get_default_qconfig_mapping(self.model_quantization_config.ENGINE)
+            prepared_body = prepare_fx(model.backbone.body, qconfig_mapping, (torch.rand(1, 3, size, size),))
+
+            model.backbone.body = prepared_body
+            with torch.inference_mode():
+                for image in calibration_images:
+                    model([image])
+
+            model.backbone.body = convert_fx(prepared_body)
+            logging.info(f"Calibrated the backbone on {len(calibration_images)} images")
+            logging.info("Exited the quantize_static_backbone method of ModelQuantization class")
+            return model
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def save_quantized_model(self, quantized_model) -> str:
+        """Saves the int8 model scripted, a pickled FX quantized backbone cannot be unpickled again"""
+        os.makedirs(self.model_quantization_config.MODEL_QUANTIZATION_ARTIFACTS_DIR, exist_ok=True)
+        torch.jit.script(quantized_model).save(self.model_quantization_config.QUANTIZED_MODEL_PATH)
+        return self.model_quantization_config.QUANTIZED_MODEL_PATH
+
+
+    def load_check(self, model_path: str, image) -> bool:
+        """
+        Method Name :   load_check
+        Description :   This method loads the saved int8 model the way serving does and runs one
+                        image through it, the model is only published when this works.
+
+        Output      :   True when the saved model loads and predicts
+        """
+        logging.info("Entered the load_check method of ModelQuantization class")
+        try:
+            backend = QuantizedTorchBackend("cpu")
+            backend.load(model_path)
+            with torch.inference_mode():
+                pred = backend([image])[0]
+            is_ok = all(key in pred for key in ("boxes", "labels", "scores"))
+        except Exception as e:
+            logging.error(f"The saved quantized model could not be loaded and run: {e}")
+            is_ok = False
+        logging.info(f"Quantized model load check {'passed' if is_ok else 'failed'}")
+        logging.info("Exited the load_check method of ModelQuantization class")
+        return is_ok
+
+
+    def evaluate_map(self, model, test_loader) -> float:
+        """COCO mAP@[.5:.95] of the model on the test split"""
+        coco_evaluator = evaluate(model, test_loader, device=torch.device("cpu"))
+        return float(coco_evaluator.coco_eval["bbox"].stats[0])
+
+
+    @staticmethod
+    def benchmark_latency(model, images) -> dict:
+        """Per image latency in ms after one warm up forward"""
+        timings = []
+        with torch.inference_mode():
+            model([images[0]])
+            for image in images:
+                start_time = time.perf_counter()
+                model([image])
+                timings.append(1000 * (time.perf_counter() - start_time))
+        return {"mean": float(np.mean(timings)), "p50": float(np.percentile(timings, 50)),
+                "p95": float(np.percentile(timings, 95))}
+
+
+    def initiate_model_quantization(self) -> ModelQuantizationArtifacts:
+        """
+        Method Name :   initiate_model_quantization
+        Description :   This function builds the int8 model, and reports mAP and latency of the fp32
+                        and int8 models on the test split so each deployment can pick one
+
+        Output      :   Returns model quantization artifact
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the initiate_model_quantization method of ModelQuantization class")
+        try:
+            # int8 kernels only run on the cpu
+            torch.backends.quantized.engine = self.model_quantization_config.ENGINE
+            model = torch.load(self.model_trainer_artifacts.trained_model_path, map_location=torch.device("cpu"))
+            model.eval()
+
+            test_dataset = load_object(self.data_transformation_artifacts.transformed_test_object)
+            test_loader = DataLoader(test_dataset,
+                                     batch_size=1,
+                                     shuffle=self.model_quantization_config.SHUFFLE,
+                                     num_workers=self.model_quantization_config.NUM_WORKERS,
+                                     collate_fn=self.collate_fn)
+
+            num_calibration = min(self.model_quantization_config.CALIBRATION_IMAGES, len(test_dataset))
+            calibration_images = [test_dataset[index][0] for index in range(num_calibration)]
+            num_benchmark = min(self.model_quantization_config.BENCHMARK_IMAGES, len(test_dataset))
+            benchmark_images = [test_dataset[index][0] for index in range(num_benchmark)]
+
+            quantized_model = self.quantize_dynamic(model)
+            if self.model_quantization_config.MODE == "static":
+                quantized_model = self.quantize_static_backbone(quantized_model, calibration_images)
+
+            quantized_model_path = self.save_quantized_model(quantized_model)
+            logging.info(f"Saved the {self.model_quantization_config.MODE} quantized model")
+            is_load_check_ok = self.load_check(quantized_model_path, benchmark_images[0])
+
+            fp32_map = self.evaluate_map(model, test_loader)
+            int8_map = self.evaluate_map(quantized_model, test_loader)
+            fp32_latency = self.benchmark_latency(model, benchmark_images)
+            int8_latency = self.benchmark_latency(quantized_model, benchmark_images)
+
+            report = pd.DataFrame([
+                {"model": "fp32", "map": fp32_map, "latency_mean_ms": fp32_latency["mean"],
+                 "latency_p50_ms": fp32_latency["p50"], "latency_p95_ms": fp32_latency["p95"],
+                 "size_mb": os.path.getsize(self.model_trainer_artifacts.trained_model_path) / (1024 * 1024)},
+                {"model": f"int8_{self.model_quantization_config.MODE}", "map": int8_map,
+                 "latency_mean_ms": int8_latency["mean"], "latency_p50_ms": int8_latency["p50"],
+                 "latency_p95_ms": int8_latency["p95"],
+                 "size_mb": os.path.getsize(self.model_quantization_config.QUANTIZED_MODEL_PATH) / (1024 * 1024)},
+            ])
+            report.to_csv(self.model_quantization_config.REPORT_FILE_PATH, index=False)
+            logging.info(f"Quantization report:\n{report.to_string(index=False)}")
+
+            model_quantization_artifacts = ModelQuantizationArtifacts(
+                quantized_model_path=self.model_quantization_config.QUANTIZED_MODEL_PATH,
+                quantization_mode=self.model_quantization_config.MODE,
+                fp32_map=fp32_map,
+                int8_map=int8_map,
+                fp32_latency_ms=fp32_latency["mean"],
+                int8_latency_ms=int8_latency["mean"],
+                report_file_path=self.model_quantization_config.REPORT_FILE_PATH,
+                is_load_check_ok=is_load_check_ok,
+            )
+            logging.info(f"Model quantization artifact: {model_quantization_artifacts}")
+            logging.info("Exited the initiate_model_quantization method of ModelQuantization class")
+            return model_quantization_artifacts
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
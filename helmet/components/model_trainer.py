@@ -114,7 +114,11 @@ class ModelTrainer:
 
             logging.info("Loaded training data loader object")
 
-            model = models.detection.fasterrcnn_mobilenet_v3_large_fpn(pretrained=True)
+            # the data transformation already resized every image to INPUT_SIZE, keep the model's
+            # internal transform from upsampling them again
+            model = models.detection.fasterrcnn_mobilenet_v3_large_fpn(pretrained=True,
+                                                                       min_size=self.model_trainer_config.MODEL_MIN_SIZE,
+                                                                       max_size=self.model_trainer_config.MODEL_MAX_SIZE)
 
             logging.info("Loaded faster Rcnn  model")
 
@@ -242,3 +242,28 @@ class S3Operation:
             
         except Exception as e:
             raise HelmetException(e, sys) from e
+
+
+    def get_object_version(self, filename: str, bucket_name: str) -> str:
+        """
+        Method Name :   get_object_version
+        Description :   This method returns the version id of the filename object, or its ETag
+                        when versioning is not enabled on the bucket
+
+        Output      :   Version identifier of the object
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the get_object_version method of S3Operations class")
+
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=filename)
+            version_id = response.get("VersionId")
+            if version_id is None or version_id == "null":
+                version_id = response["ETag"].strip('"')
+
+            logging.info("Exited the get_object_version method of S3Operations class")
+
+            return version_id
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
@@ -11,6 +11,10 @@ ZIP_FILE_NAME = 'data.zip'
 ANNOTATIONS_COCO_JSON_FILE = '_annotations.coco.json'
 
 INPUT_SIZE = 416
+# the detector's internal GeneralizedRCNNTransform resize bounds, tied to INPUT_SIZE so
+# images already resized by the data transformation are not upsampled again
+MODEL_MIN_SIZE = INPUT_SIZE
+MODEL_MAX_SIZE = INPUT_SIZE
 HORIZONTAL_FLIP = 0.3
 VERTICAL_FLIP = 0.3
 RANDOM_BRIGHTNESS_CONTRAST = 0.1
@@ -44,6 +48,32 @@ TRAINED_NUM_WORKERS = 1
 EPOCH = 1
 
 
+# Model exporter constants
+TORCHSCRIPT_MODEL_NAME = 'model_scripted.pt'
+ONNX_MODEL_NAME = 'model.onnx'
+ONNX_OPSET_VERSION: int = 11
+EXPORT_PARITY_NUM_IMAGES: int = 20
+EXPORT_PARITY_BOX_ATOL: float = 1e-2
+EXPORT_PARITY_SCORE_ATOL: float = 1e-3
+# (height, width) copies of a test image, the test split is all INPUT_SIZE squares and never varies the dynamic axes
+EXPORT_PARITY_EXTRA_SIZES = [(320, 480), (480, 640)]
+# a detection matches the one of the same label it overlaps most, at least this much
+EXPORT_PARITY_MATCH_IOU: float = 0.9
+
+
+# Model quantization constants
+QUANTIZATION_ENABLED: bool = True
+MODEL_QUANTIZATION_ARTIFACTS_DIR = 'ModelQuantizationArtifacts'
+QUANTIZED_MODEL_NAME = 'model_quantized.pt'
+QUANTIZATION_REPORT_FILE_NAME = 'quantization_report.csv'
+# 'dynamic' quantizes the Linear layers of the box head and predictor,
+# 'static' additionally calibrates and quantizes the MobileNetV3 backbone body
+QUANTIZATION_MODE = 'dynamic'
+QUANTIZATION_ENGINE = 'fbgemm'  # 'qnnpack' on ARM
+QUANTIZATION_CALIBRATION_IMAGES: int = 50
+QUANTIZATION_BENCHMARK_IMAGES: int = 20
+
+
 # Model evaluation constants
 MODEL_EVALUATION_ARTIFACTS_DIR = 'ModelEvaluationArtifacts'
 MODEL_EVALUATION_FILE_NAME = 'loss.csv'
@@ -57,8 +87,180 @@ APP_PORT = 8080
 
 # Prediction Constants
 PREDICTION_CLASSES = ['With Helmet', 'Without Helmet']
+PREDICTION_SCORE_THRESHOLD: float = 0.8
+# short side the served model resizes to; the long side is capped keeping torchvision's 800/1333 ratio
+SERVING_INPUT_SIZE: int = INPUT_SIZE
+SERVING_MAX_SIZE: int = int(SERVING_INPUT_SIZE * 1333 / 800)
+# JPEGs whose short side is at least twice this are decoded at 1/2, 1/4 or 1/8 resolution,
+# never below it; the model never resizes the short side above SERVING_INPUT_SIZE. Only JSON
+# responses use it, rendered images are returned at the size they were decoded at
+DECODE_DRAFT_ENABLED: bool = True
+DECODE_DRAFT_MIN_SIZE: int = SERVING_INPUT_SIZE
+# proposal budgets and NMS thresholds of the served model; torchvision's FPN defaults keep 1000
+# proposals per feature level before the RPN NMS, 1000 after it and 100 detections, far more than
+# the few workers in a frame need. The score threshold is applied inside the box head, before its NMS
+SERVING_RPN_PRE_NMS_TOP_N: int = 300
+SERVING_RPN_POST_NMS_TOP_N: int = 100
+SERVING_RPN_NMS_THRESH: float = 0.7
+SERVING_BOX_NMS_THRESH: float = 0.5
+SERVING_BOX_DETECTIONS_PER_IMG: int = 50
+RESPONSE_FORMAT_IMAGE = 'image'
+RESPONSE_FORMAT_JSON = 'json'
+RESPONSE_FORMATS = [RESPONSE_FORMAT_IMAGE, RESPONSE_FORMAT_JSON]
+# 'full' runs the detector on the whole frame, 'tiled' on overlapping full resolution tiles,
+# 'cascade' a low resolution pass first and a full resolution re-check only when it is uncertain
+INFERENCE_MODE_FULL = 'full'
+INFERENCE_MODE_TILED = 'tiled'
+INFERENCE_MODE_CASCADE = 'cascade'
+INFERENCE_MODES = [INFERENCE_MODE_FULL, INFERENCE_MODE_TILED, INFERENCE_MODE_CASCADE]
+
+# Tiled inference constants
+# tiles match the serving input size so the model does not resize them
+TILE_SIZE: int = SERVING_INPUT_SIZE
+# wider than a worker's head at full resolution so every head is whole in at least one tile
+TILE_OVERLAP: int = 96
+TILE_NMS_IOU_THRESHOLD: float = 0.5
+TILE_BATCH_SIZE: int = 32
+
+# Cascade inference constants
+CASCADE_LOW_INPUT_SIZE: int = 256
+# first pass boxes scoring above this and up to PREDICTION_SCORE_THRESHOLD are ambiguous
+CASCADE_AMBIGUOUS_LOW: float = 0.4
+# this many first pass boxes above CASCADE_AMBIGUOUS_LOW re-run the whole frame
+CASCADE_CROWDED_COUNT: int = 8
+CASCADE_RECHECK = 'crops'           # 'crops' around the ambiguous boxes or the 'full' frame
+CASCADE_CROP_CONTEXT: float = 1.0   # margin around an ambiguous box, in box sizes
+CASCADE_CROP_MIN_SIZE: int = 128
+CASCADE_NMS_IOU_THRESHOLD: float = 0.5
+
+# Per camera region of interest constants, JSON file keyed by camera id, see CameraRegions
+CAMERA_ROI_FILE_ENV_KEY = "HELMET_CAMERA_ROI_FILE"
+CAMERA_ROI_FILE_NAME = "camera_roi.json"
+CAMERA_ROI_RELOAD_INTERVAL_SECONDS: float = 10
+
+# Video pipeline constants
+VIDEO_RESPONSE_FORMAT_VIDEO = 'video'
+VIDEO_RESPONSE_FORMATS = [VIDEO_RESPONSE_FORMAT_VIDEO, RESPONSE_FORMAT_JSON]
+VIDEO_FRAME_STRIDE: int = 1
+VIDEO_QUEUE_SIZE: int = 16
+VIDEO_BATCH_SIZE: int = 4
+VIDEO_OUTPUT_FOURCC = 'mp4v'
+VIDEO_BOX_COLOR_BGR = {0: (0, 200, 0), 1: (0, 0, 230)}
+# 1 runs the detector on every frame, N > 1 tracks boxes across the N - 1 frames in between
+VIDEO_DETECT_INTERVAL: int = 1
+
+# Tracker constants
+TRACKER_IOU_THRESHOLD: float = 0.3
+TRACKER_CONFIDENCE_DECAY: float = 0.9
+TRACKER_MOTION_PENALTY: float = 2.0
+TRACKER_MIN_CONFIDENCE: float = 0.5
+
+# Frame gate constants, per camera reuse of detections for unchanged frames
+FRAME_GATE_ENABLED: bool = True
+FRAME_GATE_METHOD = 'diff'                 # 'diff' or 'hash'
+FRAME_GATE_THUMBNAIL_SIZE: int = 32
+FRAME_GATE_DIFF_THRESHOLD: float = 0.02    # mean absolute difference of [0, 1] pixels
+FRAME_GATE_HASH_THRESHOLD: float = 0.05    # share of differing hash bits
+FRAME_GATE_MAX_REUSE_FRAMES: int = 25
+FRAME_GATE_MAX_STREAMS: int = 256
+
+# WebSocket streaming constants
+# frames waiting per connection, older frames are dropped once a connection has this many pending
+WEBSOCKET_MAX_PENDING_FRAMES: int = 1
+
+# Shared memory ingestion constants, comma separated stream names, one frame/result ring pair each
+SHARED_MEMORY_STREAMS_ENV_KEY = "HELMET_SHM_STREAMS"
+SHARED_MEMORY_SLOT_COUNT: int = 4
+SHARED_MEMORY_MAX_FRAME_HEIGHT: int = 1080
+SHARED_MEMORY_MAX_FRAME_WIDTH: int = 1920
+SHARED_MEMORY_MAX_DETECTIONS: int = 64
+SHARED_MEMORY_POLL_INTERVAL_MS: float = 1
+
+# Result cache constants
+RESULT_CACHE_ENABLED: bool = True
+RESULT_CACHE_MAX_ENTRIES: int = 1024
+RESULT_CACHE_TTL_SECONDS: float = 300
+
+# Batch prediction constants
+PREDICT_BATCH_MAX_IMAGES: int = 32
+PREDICT_BATCH_SIZE: int = 8
+PREDICT_BATCH_DECODE_WORKERS: int = 4
+
+# Model registry constants
+PREDICT_MODEL_DIR = os.path.join("artifacts", "PredictModel")
+MODEL_WARMUP: bool = True
+# 'torch' serves the pickled eager model, 'torchscript' the exported TorchScript model,
+# 'onnxruntime' the exported ONNX model, 'quantized' the int8 model (cpu only)
+INFERENCE_BACKEND = 'torch'
+INFERENCE_BACKEND_MODEL_NAMES = {
+    'torch': TRAINED_MODEL_NAME,
+    'torchscript': TORCHSCRIPT_MODEL_NAME,
+    'onnxruntime': ONNX_MODEL_NAME,
+    'quantized': QUANTIZED_MODEL_NAME,
+}
+MODEL_WATCHER_ENABLED: bool = True
+MODEL_WATCHER_INTERVAL_SECONDS: float = 60
+
+# Batch scheduler constants
+BATCH_SCHEDULER_ENABLED: bool = True
+BATCH_SCHEDULER_MAX_BATCH_SIZE: int = 8
+BATCH_SCHEDULER_MAX_WAIT_MS: float = 10
+
+# Stream scheduler constants, batching of named camera streams (WebSocket connections with a camera_id)
+STREAM_SCHEDULER_ENABLED: bool = True
+STREAM_SCHEDULER_POLICY = 'round_robin'          # 'round_robin' or 'deadline'
+STREAM_SCHEDULER_MAX_BATCH_SIZE: int = 8
+STREAM_SCHEDULER_MAX_WAIT_MS: float = 10
+STREAM_SCHEDULER_DEADLINE_MS: float = 500
+STREAM_SCHEDULER_MAX_PENDING_PER_STREAM: int = 2
+STREAM_SCHEDULER_LATENCY_WINDOW: int = 256
+STREAM_SCHEDULER_MAX_STREAMS: int = 256              # stream ids are client supplied, cap how many are tracked
+STREAM_SCHEDULER_IDLE_STREAM_TTL_SECONDS: float = 300
+
+# Inference executor constants
+# with the batch scheduler on, workers mostly decode/encode and wait on the scheduler,
+# so keep at least BATCH_SCHEDULER_MAX_BATCH_SIZE of them to let full batches form
+INFERENCE_EXECUTOR_MAX_WORKERS: int = 8
+# None derives intra-op threads from the available cores and the number of concurrent forwards
+INFERENCE_TORCH_NUM_THREADS = None
+TRAINING_EXECUTOR_MAX_WORKERS: int = 1
+
+
+
+# Admission control constants, applied to the /predict endpoints
+ADMISSION_CONTROL_ENABLED: bool = True
+# None admits as many requests at once as the inference executor has workers
+ADMISSION_MAX_CONCURRENT = None
+ADMISSION_MAX_QUEUE_DEPTH: int = 64
+ADMISSION_DEFAULT_DEADLINE_MS: float = 5000
+ADMISSION_DEADLINE_HEADER = "X-Request-Deadline-Ms"
+# /predict/video holds a slot for a whole upload, so it gets its own small limit instead of the image slots
+ADMISSION_VIDEO_MAX_CONCURRENT: int = 1
+ADMISSION_VIDEO_MAX_QUEUE_DEPTH: int = 4
+ADMISSION_VIDEO_DEADLINE_MS: float = 60000
 
+# Load adaptive degradation constants
+DEGRADATION_ENABLED: bool = True
+# cheapest last; tier 0 is the resident model as configured, later tiers are weight sharing variants
+# with a smaller input size and fewer region proposals (a lighter backbone needs its own trained model)
+DEGRADATION_TIERS = [
+    {"name": "full", "input_size": SERVING_INPUT_SIZE},
+    {"name": "reduced", "input_size": 320, "rpn_post_nms_top_n": 75},
+    {"name": "minimal", "input_size": 256, "rpn_pre_nms_top_n": 150, "rpn_post_nms_top_n": 50},
+]
+DEGRADATION_P95_HIGH_MS: float = 1000
+DEGRADATION_P95_LOW_MS: float = 400
+DEGRADATION_QUEUE_HIGH: int = 16
+DEGRADATION_QUEUE_LOW: int = 2
+DEGRADATION_STEP_DOWN_COOLDOWN_SECONDS: float = 5
+DEGRADATION_STEP_UP_COOLDOWN_SECONDS: float = 30
+DEGRADATION_EVALUATE_INTERVAL_SECONDS: float = 1
+DEGRADATION_LATENCY_WINDOW: int = 200
 
+# Prefork serving constants
+# above 1 the parent loads the model once and forks this many workers, each pinned to its own cpus
+SERVING_WORKERS: int = 1
+SERVING_PIN_CPUS: bool = True
 
 # AWS CONSTANTS
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
@@ -20,6 +20,30 @@ class ModelTrainerArtifacts:
     trained_model_path: str
 
 
+@dataclass
+class ModelExporterArtifacts:
+    torchscript_model_path: str
+    torchscript_parity_max_box_diff: float
+    torchscript_parity_max_score_diff: float
+    is_torchscript_parity_ok: bool
+    onnx_model_path: str
+    onnx_parity_max_box_diff: float
+    onnx_parity_max_score_diff: float
+    is_onnx_parity_ok: bool
+
+
+@dataclass
+class ModelQuantizationArtifacts:
+    quantized_model_path: str
+    quantization_mode: str
+    fp32_map: float
+    int8_map: float
+    fp32_latency_ms: float
+    int8_latency_ms: float
+    report_file_path: str
+    is_load_check_ok: bool
+
+
 @dataclass
 class ModelEvaluationArtifacts:
     is_model_accepted: bool
@@ -47,9 +47,43 @@ class ModelTrainerConfig:
         self.SHUFFLE: bool = TRAINED_SHUFFLE
         self.NUM_WORKERS = TRAINED_NUM_WORKERS
         self.EPOCH: int = EPOCH
+        self.MODEL_MIN_SIZE: int = MODEL_MIN_SIZE
+        self.MODEL_MAX_SIZE: int = MODEL_MAX_SIZE
         self.DEVICE = DEVICE 
 
 
+@dataclass
+class ModelExporterConfig:
+    def __init__(self):
+        self.TRAINED_MODEL_DIR: str = os.path.join(from_root(), ARTIFACTS_DIR, TRAINED_MODEL_DIR)
+        self.TORCHSCRIPT_MODEL_PATH: str = os.path.join(self.TRAINED_MODEL_DIR, TORCHSCRIPT_MODEL_NAME)
+        self.ONNX_MODEL_PATH: str = os.path.join(self.TRAINED_MODEL_DIR, ONNX_MODEL_NAME)
+        self.ONNX_OPSET_VERSION: int = ONNX_OPSET_VERSION
+        self.EXPORT_INPUT_SIZE: int = INPUT_SIZE
+        self.PARITY_NUM_IMAGES: int = EXPORT_PARITY_NUM_IMAGES
+        self.PARITY_BOX_ATOL: float = EXPORT_PARITY_BOX_ATOL
+        self.PARITY_SCORE_ATOL: float = EXPORT_PARITY_SCORE_ATOL
+        self.PARITY_EXTRA_SIZES: list = EXPORT_PARITY_EXTRA_SIZES
+        self.PARITY_MATCH_IOU: float = EXPORT_PARITY_MATCH_IOU
+        self.DEVICE = DEVICE
+
+
+@dataclass
+class ModelQuantizationConfig:
+    def __init__(self):
+        self.ENABLED: bool = QUANTIZATION_ENABLED
+        self.MODEL_QUANTIZATION_ARTIFACTS_DIR: str = os.path.join(from_root(), ARTIFACTS_DIR, MODEL_QUANTIZATION_ARTIFACTS_DIR)
+        self.QUANTIZED_MODEL_PATH: str = os.path.join(self.MODEL_QUANTIZATION_ARTIFACTS_DIR, QUANTIZED_MODEL_NAME)
+        self.REPORT_FILE_PATH: str = os.path.join(self.MODEL_QUANTIZATION_ARTIFACTS_DIR, QUANTIZATION_REPORT_FILE_NAME)
+        self.MODE: str = QUANTIZATION_MODE
+        self.ENGINE: str = QUANTIZATION_ENGINE
+        self.CALIBRATION_IMAGES: int = QUANTIZATION_CALIBRATION_IMAGES
+        self.BENCHMARK_IMAGES: int = QUANTIZATION_BENCHMARK_IMAGES
+        self.INPUT_SIZE: int = INPUT_SIZE
+        self.SHUFFLE: bool = TRAINED_SHUFFLE
+        self.NUM_WORKERS = TRAINED_NUM_WORKERS
+
+
 @dataclass
 class ModelEvaluationConfig:
     def __init__(self):
@@ -60,6 +94,8 @@ class ModelEvaluationConfig:
         self.BATCH: int = 1
         self.SHUFFLE: bool = TRAINED_SHUFFLE
         self.NUM_WORKERS = TRAINED_NUM_WORKERS
+        self.MODEL_MIN_SIZE: int = MODEL_MIN_SIZE
+        self.MODEL_MAX_SIZE: int = MODEL_MAX_SIZE
 
 
 
@@ -69,4 +105,175 @@ class ModelPusherConfig:
         self.TRAINED_MODEL_DIR: str = os.path.join(from_root(),ARTIFACTS_DIR,TRAINED_MODEL_DIR)
         self.BEST_MODEL_PATH: str = os.path.join(self.TRAINED_MODEL_DIR,TRAINED_MODEL_NAME)
         self.BUCKET_NAME: str = BUCKET_NAME
-        self.S3_MODEL_KEY_PATH: str = os.path.join(TRAINED_MODEL_NAME)
\ No newline at end of file
+        self.S3_MODEL_KEY_PATH: str = os.path.join(TRAINED_MODEL_NAME)
+        self.TORCHSCRIPT_MODEL_PATH: str = os.path.join(self.TRAINED_MODEL_DIR, TORCHSCRIPT_MODEL_NAME)
+        self.S3_TORCHSCRIPT_MODEL_KEY_PATH: str = os.path.join(TORCHSCRIPT_MODEL_NAME)
+        self.S3_ONNX_MODEL_KEY_PATH: str = os.path.join(ONNX_MODEL_NAME)
+        self.S3_QUANTIZED_MODEL_KEY_PATH: str = os.path.join(QUANTIZED_MODEL_NAME)
+
+
+@dataclass
+class ModelRegistryConfig:
+    def __init__(self):
+        self.PREDICT_MODEL_DIR: str = os.path.join(from_root(), PREDICT_MODEL_DIR)
+        self.INFERENCE_BACKEND: str = INFERENCE_BACKEND
+        self.MODEL_NAME: str = INFERENCE_BACKEND_MODEL_NAMES[self.INFERENCE_BACKEND]
+        self.PREDICT_MODEL_PATH: str = os.path.join(self.PREDICT_MODEL_DIR, self.MODEL_NAME)
+        self.BUCKET_NAME: str = BUCKET_NAME
+        self.S3_MODEL_KEY_PATH: str = self.MODEL_NAME
+        self.DEVICE = DEVICE
+        self.WARMUP: bool = MODEL_WARMUP
+        self.SERVING_INPUT_SIZE: int = SERVING_INPUT_SIZE
+        self.SERVING_MAX_SIZE: int = SERVING_MAX_SIZE
+        self.SCORE_THRESHOLD: float = PREDICTION_SCORE_THRESHOLD
+        self.RPN_PRE_NMS_TOP_N: int = SERVING_RPN_PRE_NMS_TOP_N
+        self.RPN_POST_NMS_TOP_N: int = SERVING_RPN_POST_NMS_TOP_N
+        self.RPN_NMS_THRESH: float = SERVING_RPN_NMS_THRESH
+        self.BOX_NMS_THRESH: float = SERVING_BOX_NMS_THRESH
+        self.BOX_DETECTIONS_PER_IMG: int = SERVING_BOX_DETECTIONS_PER_IMG
+        self.WARMUP_INPUT_SIZE: int = SERVING_INPUT_SIZE
+        self.WATCHER_ENABLED: bool = MODEL_WATCHER_ENABLED
+        self.WATCHER_INTERVAL_SECONDS: float = MODEL_WATCHER_INTERVAL_SECONDS
+
+
+@dataclass
+class BatchSchedulerConfig:
+    def __init__(self):
+        self.ENABLED: bool = BATCH_SCHEDULER_ENABLED
+        self.MAX_BATCH_SIZE: int = BATCH_SCHEDULER_MAX_BATCH_SIZE
+        self.MAX_WAIT_SECONDS: float = BATCH_SCHEDULER_MAX_WAIT_MS / 1000
+        self.DEVICE = DEVICE
+
+
+@dataclass
+class StreamSchedulerConfig:
+    def __init__(self):
+        self.ENABLED: bool = STREAM_SCHEDULER_ENABLED
+        self.POLICY: str = STREAM_SCHEDULER_POLICY
+        self.MAX_BATCH_SIZE: int = STREAM_SCHEDULER_MAX_BATCH_SIZE
+        self.MAX_WAIT_SECONDS: float = STREAM_SCHEDULER_MAX_WAIT_MS / 1000
+        self.DEADLINE_MS: float = STREAM_SCHEDULER_DEADLINE_MS
+        self.MAX_PENDING_PER_STREAM: int = STREAM_SCHEDULER_MAX_PENDING_PER_STREAM
+        self.LATENCY_WINDOW: int = STREAM_SCHEDULER_LATENCY_WINDOW
+        self.MAX_STREAMS: int = STREAM_SCHEDULER_MAX_STREAMS
+        self.IDLE_STREAM_TTL_SECONDS: float = STREAM_SCHEDULER_IDLE_STREAM_TTL_SECONDS
+        self.DEVICE = DEVICE
+
+
+@dataclass
+class InferenceExecutorConfig:
+    def __init__(self):
+        self.MAX_WORKERS: int = INFERENCE_EXECUTOR_MAX_WORKERS
+        self.TORCH_NUM_THREADS = INFERENCE_TORCH_NUM_THREADS
+        self.TRAINING_MAX_WORKERS: int = TRAINING_EXECUTOR_MAX_WORKERS
+
+
+@dataclass
+class ResultCacheConfig:
+    def __init__(self):
+        self.ENABLED: bool = RESULT_CACHE_ENABLED
+        self.MAX_ENTRIES: int = RESULT_CACHE_MAX_ENTRIES
+        self.TTL_SECONDS: float = RESULT_CACHE_TTL_SECONDS
+
+
+@dataclass
+class VideoPipelineConfig:
+    def __init__(self):
+        self.FRAME_STRIDE: int = VIDEO_FRAME_STRIDE
+        self.QUEUE_SIZE: int = VIDEO_QUEUE_SIZE
+        self.BATCH_SIZE: int = VIDEO_BATCH_SIZE
+        self.OUTPUT_FOURCC: str = VIDEO_OUTPUT_FOURCC
+        self.BOX_COLOR_BGR: dict = VIDEO_BOX_COLOR_BGR
+        self.DETECT_INTERVAL: int = VIDEO_DETECT_INTERVAL
+
+
+@dataclass
+class TrackerConfig:
+    def __init__(self):
+        self.IOU_THRESHOLD: float = TRACKER_IOU_THRESHOLD
+        self.CONFIDENCE_DECAY: float = TRACKER_CONFIDENCE_DECAY
+        self.MOTION_PENALTY: float = TRACKER_MOTION_PENALTY
+        self.MIN_CONFIDENCE: float = TRACKER_MIN_CONFIDENCE
+
+
+@dataclass
+class FrameGateConfig:
+    def __init__(self):
+        self.ENABLED: bool = FRAME_GATE_ENABLED
+        self.METHOD: str = FRAME_GATE_METHOD
+        self.THUMBNAIL_SIZE: int = FRAME_GATE_THUMBNAIL_SIZE
+        self.DIFF_THRESHOLD: float = FRAME_GATE_DIFF_THRESHOLD
+        self.HASH_THRESHOLD: float = FRAME_GATE_HASH_THRESHOLD
+        self.MAX_REUSE_FRAMES: int = FRAME_GATE_MAX_REUSE_FRAMES
+        self.MAX_STREAMS: int = FRAME_GATE_MAX_STREAMS
+
+
+@dataclass
+class SharedMemoryIngestConfig:
+    def __init__(self):
+        self.STREAMS: list = [name.strip() for name in os.getenv(SHARED_MEMORY_STREAMS_ENV_KEY, "").split(",") if name.strip()]
+        self.ENABLED: bool = bool(self.STREAMS)
+        self.SLOT_COUNT: int = SHARED_MEMORY_SLOT_COUNT
+        self.MAX_FRAME_HEIGHT: int = SHARED_MEMORY_MAX_FRAME_HEIGHT
+        self.MAX_FRAME_WIDTH: int = SHARED_MEMORY_MAX_FRAME_WIDTH
+        self.MAX_DETECTIONS: int = SHARED_MEMORY_MAX_DETECTIONS
+        self.POLL_INTERVAL_SECONDS: float = SHARED_MEMORY_POLL_INTERVAL_MS / 1000
+
+
+@dataclass
+class PreforkServerConfig:
+    def __init__(self):
+        self.HOST: str = APP_HOST
+        self.PORT: int = APP_PORT
+        self.WORKERS: int = SERVING_WORKERS
+        self.PIN_CPUS: bool = SERVING_PIN_CPUS
+
+
+@dataclass
+class AdmissionControlConfig:
+    def __init__(self):
+        self.ENABLED: bool = ADMISSION_CONTROL_ENABLED
+        self.MAX_CONCURRENT: int = ADMISSION_MAX_CONCURRENT if ADMISSION_MAX_CONCURRENT is not None else INFERENCE_EXECUTOR_MAX_WORKERS
+        self.MAX_QUEUE_DEPTH: int = ADMISSION_MAX_QUEUE_DEPTH
+        self.DEFAULT_DEADLINE_MS: float = ADMISSION_DEFAULT_DEADLINE_MS
+        self.DEADLINE_HEADER: str = ADMISSION_DEADLINE_HEADER
+        self.VIDEO_MAX_CONCURRENT: int = ADMISSION_VIDEO_MAX_CONCURRENT
+        self.VIDEO_MAX_QUEUE_DEPTH: int = ADMISSION_VIDEO_MAX_QUEUE_DEPTH
+        self.VIDEO_DEADLINE_MS: float = ADMISSION_VIDEO_DEADLINE_MS
+
+
+@dataclass
+class DegradationConfig:
+    def __init__(self):
+        self.ENABLED: bool = DEGRADATION_ENABLED
+        # the long side of every tier keeps torchvision's 800/1333 ratio unless a tier sets max_size
+        self.TIERS: list = [dict(tier, max_size=tier.get("max_size", int(tier["input_size"] * 1333 / 800)))
+                            for tier in DEGRADATION_TIERS]
+        self.P95_HIGH_MS: float = DEGRADATION_P95_HIGH_MS
+        self.P95_LOW_MS: float = DEGRADATION_P95_LOW_MS
+        self.QUEUE_HIGH: int = DEGRADATION_QUEUE_HIGH
+        self.QUEUE_LOW: int = DEGRADATION_QUEUE_LOW
+        self.STEP_DOWN_COOLDOWN_SECONDS: float = DEGRADATION_STEP_DOWN_COOLDOWN_SECONDS
+        self.STEP_UP_COOLDOWN_SECONDS: float = DEGRADATION_STEP_UP_COOLDOWN_SECONDS
+        self.EVALUATE_INTERVAL_SECONDS: float = DEGRADATION_EVALUATE_INTERVAL_SECONDS
+        self.LATENCY_WINDOW: int = DEGRADATION_LATENCY_WINDOW
+
+
+@dataclass
+class CascadeConfig:
+    def __init__(self):
+        self.LOW_INPUT_SIZE: int = CASCADE_LOW_INPUT_SIZE
+        self.LOW_MAX_SIZE: int = int(CASCADE_LOW_INPUT_SIZE * 1333 / 800)
+        self.AMBIGUOUS_LOW: float = CASCADE_AMBIGUOUS_LOW
+        self.CROWDED_COUNT: int = CASCADE_CROWDED_COUNT
+        self.RECHECK: str = CASCADE_RECHECK
+        self.CROP_CONTEXT: float = CASCADE_CROP_CONTEXT
+        self.CROP_MIN_SIZE: int = CASCADE_CROP_MIN_SIZE
+        self.NMS_IOU_THRESHOLD: float = CASCADE_NMS_IOU_THRESHOLD
+
+
+@dataclass
+class CameraROIConfig:
+    def __init__(self):
+        self.FILE_PATH: str = os.getenv(CAMERA_ROI_FILE_ENV_KEY, os.path.join(from_root(), CAMERA_ROI_FILE_NAME))
+        self.RELOAD_INTERVAL_SECONDS: float = CAMERA_ROI_RELOAD_INTERVAL_SECONDS
\ No newline at end of file
@@ -61,7 +61,7 @@ class HelmetDetection(datasets.VisionDataset):
             targ = {} # here is our transformed target
             targ['boxes'] = boxes
             targ['labels'] = torch.tensor([t['category_id'] for t in target], dtype=torch.int64)
-            targ['image_id'] = torch.tensor([t['image_id'] for t in target])
+            targ['image_id'] = torch.tensor([id])  # one id per image, as CocoEvaluator expects
             targ['area'] = (boxes[:, 3] - boxes[:, 1]) * (boxes[:, 2] - boxes[:, 0]) # we have a different area
             targ['iscrowd'] = torch.tensor([t['iscrowd'] for t in target], dtype=torch.int64)
             return image.div(255), targ # scale images
@@ -0,0 +1,60 @@
+import copy
+
+
+def set_model_input_size(model, min_size: int, max_size: int = None):
+    """
+    Sets the resize bounds of a torchvision detection model's GeneralizedRCNNTransform.
+
+    The transform scales every image so its short side is min_size unless that would push the
+    long side past max_size. Keeping these in line with the pipeline's input size stops the model
+    from upsampling images that were already resized.
+    """
+    model.transform.min_size = (min_size,)
+    model.transform.max_size = max_size if max_size is not None else min_size
+    return model
+
+
+def set_model_proposal_budget(model, rpn_pre_nms_top_n: int = None, rpn_post_nms_top_n: int = None,
+                              box_detections_per_img: int = None):
+    """
+    Sets how many region proposals the RPN keeps per image at inference, before and after its
+    NMS, and how many detections the box head returns. None keeps the current value. With an FPN
+    backbone the pre NMS count applies to every feature level separately.
+    """
+    if rpn_pre_nms_top_n is not None:
+        model.rpn._pre_nms_top_n = dict(model.rpn._pre_nms_top_n, testing=rpn_pre_nms_top_n)
+    if rpn_post_nms_top_n is not None:
+        model.rpn._post_nms_top_n = dict(model.rpn._post_nms_top_n, testing=rpn_post_nms_top_n)
+    if box_detections_per_img is not None:
+        model.roi_heads.detections_per_img = box_detections_per_img
+    return model
+
+
+def set_model_postprocess(model, box_score_thresh: float = None, box_nms_thresh: float = None, rpn_nms_thresh: float = None):
+    """
+    Sets the score threshold and NMS IoU thresholds the model applies in its own post-processing,
+    so low scoring boxes are dropped before the box head's NMS instead of after it. None keeps the
+    current value.
+    """
+    if box_score_thresh is not None:
+        model.roi_heads.score_thresh = box_score_thresh
+    if box_nms_thresh is not None:
+        model.roi_heads.nms_thresh = box_nms_thresh
+    if rpn_nms_thresh is not None:
+        model.rpn.nms_thresh = rpn_nms_thresh
+    return model
+
+
+def make_model_variant(model):
+    """
+    Shallow copy of a torchvision detection model that shares every weight tensor with the original
+    but has its own transform, rpn and roi_heads objects, so input size and proposal settings can be
+    changed on the copy without touching the original.
+    """
+    variant = copy.copy(model)
+    variant._modules = model._modules.copy()
+    for name in ("transform", "rpn", "roi_heads"):
+        variant._modules[name] = copy.copy(model._modules[name])
+    variant.rpn._pre_nms_top_n = dict(model.rpn._pre_nms_top_n)
+    variant.rpn._post_nms_top_n = dict(model.rpn._post_nms_top_n)
+    return variant
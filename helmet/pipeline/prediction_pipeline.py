@@ -1,72 +1,361 @@
-import os
 import io
 import sys
 from PIL import Image
 import base64
+import hashlib
+import warnings
+import numpy as np
 from io import BytesIO
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 from torchvision import transforms
 from torchvision.utils import draw_bounding_boxes
 from helmet.exception import HelmetException
 from helmet.logger import logging
-from helmet.configuration.s3_operations import S3Operation
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.batch_scheduler import BatchScheduler
+from helmet.serving.stream_scheduler import StreamScheduler
+from helmet.serving.result_cache import ResultCache
+from helmet.serving.frame_gate import FrameGate
+from helmet.serving.degradation import DegradationPolicy, ServingTier
+from helmet.serving.cascade import Cascade, CASCADE_RECHECK_CROPS
+from helmet.serving.camera_roi import CameraRegions
+from helmet.serving.admission_control import check_deadline
+from helmet.serving.tiling import make_tiles, filter_tiles_by_mask, filter_detections_by_mask, merge_tile_detections
 from helmet.constants import *
 
 
 class PredictionPipeline:
-    def __init__(self):
-        self.s3 = S3Operation()
-        self.bucket_name = BUCKET_NAME
+    def __init__(self, model_registry: ModelRegistry = None, batch_scheduler: BatchScheduler = None,
+                 result_cache: ResultCache = None, frame_gate: FrameGate = None,
+                 stream_scheduler: StreamScheduler = None, stream_id: str = None,
+                 degradation_policy: DegradationPolicy = None, cascade: Cascade = None,
+                 camera_regions: CameraRegions = None, deadline: float = None, serving_tier: ServingTier = None):
+        # the registry keeps one resident model per process, so building a pipeline is cheap
+        self.model_registry = model_registry if model_registry is not None else ModelRegistry()
+        self.batch_scheduler = batch_scheduler
+        self.result_cache = result_cache
+        self.frame_gate = frame_gate
+        # a pipeline serving one named camera stream sends its frames through the stream scheduler
+        self.stream_scheduler = stream_scheduler if stream_id is not None else None
+        self.stream_id = stream_id
+        self.degradation_policy = degradation_policy
+        self.cascade = cascade if cascade is not None else Cascade()
+        self.camera_regions = camera_regions
+        # time.perf_counter() deadline of an admitted request, checked again right before each forward
+        self.deadline = deadline
+        self.serving_tier = None
+        self.pin_serving_tier(serving_tier)
+        self.draft_size = DECODE_DRAFT_MIN_SIZE if DECODE_DRAFT_ENABLED else None
 
-    def image_loader(self, image_bytes):
-        """load image, returns cuda tensor"""
+    def image_loader(self, image_bytes, draft_size: int = None):
+        """
+        Decodes the image once into a uint8 HWC buffer and derives both tensors from it.
+
+        :param image_bytes: encoded image
+        :param draft_size: when set, JPEGs far larger than this are decoded at reduced resolution,
+                           keeping both sides at least draft_size
+        :return: float CHW tensor in [0, 1] for the model, uint8 CHW view of the decoded buffer for
+                 drawing, and the scale from decoded to original coordinates
+        """
         logging.info("Entered the image_loader method of PredictionPipeline class")
         try:
-            # image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
             image = Image.open(io.BytesIO(image_bytes))
-            convert_tensor = transforms.ToTensor()
-            tensor_image = convert_tensor(image)
-            # image = image[:3]
-            image_int = torch.tensor(tensor_image * 255, dtype=torch.uint8)
+            original_width, original_height = image.size
+            if draft_size is not None and image.format == "JPEG":
+                # the JPEG decoder scales by 1/2, 1/4 or 1/8 while decoding, far cheaper than a resize
+                image.draft("RGB", (draft_size, draft_size))
+            # normalise RGBA, grayscale, palette and CMYK images to three channels
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+
+            with warnings.catch_warnings():
+                # the buffer is read only and is never written to
+                warnings.simplefilter("ignore", UserWarning)
+                image_hwc = torch.from_numpy(np.asarray(image))
+            image_int = image_hwc.permute(2, 0, 1)
+            tensor_image = image_int.to(torch.float32).div_(255)
+            scale = original_width / image.size[0]
+
             logging.info("Exited the image_loader method of PredictionPipeline class")
-            return tensor_image, image_int
+            return tensor_image, image_int, scale
 
         except Exception as e:
             raise HelmetException(e, sys) from e
 
-    
-    def get_model_from_s3(self) -> str:
+
+    def pin_serving_tier(self, serving_tier: ServingTier = None) -> None:
+        """
+        Fixes the load tier, and so the model, of the work that follows. A pipeline serves one
+        request on the tier it was built with; long lived pipelines of a stream re-pin per frame.
         """
-        Method Name :   predict
-        Description :   This method predicts the image.
+        if self.degradation_policy is not None:
+            self.serving_tier = serving_tier if serving_tier is not None else self.degradation_policy.resolve()
 
-        Output      :   Predictions
+
+    def get_model(self):
+        """The resident model, or the variant of the pinned load tier when degradation is on"""
+        if self.serving_tier is not None:
+            return self.serving_tier.model
+        return self.model_registry.get_model()
+
+    @property
+    def tier_name(self) -> str:
+        return self.serving_tier.name if self.serving_tier is not None else None
+
+    @property
+    def tier_index(self) -> int:
+        return self.serving_tier.index if self.serving_tier is not None else None
+
+
+    def detect(self, image_tensor, model=None) -> dict:
+        """
+        Runs the detector on one image, returns the raw prediction dict on the cpu. model defaults
+        to get_model(), every forward goes through the scheduler in use whichever model it runs.
         """
-        logging.info("Entered the get_model_from_s3 method of PredictionPipeline class")
+        logging.info("Entered the detect method of PredictionPipeline class")
         try:
-            # Loading the best model from s3 bucket
-            os.makedirs("artifacts/PredictModel", exist_ok=True)
-            predict_model_path = os.path.join(os.getcwd(), "artifacts", "PredictModel", TRAINED_MODEL_NAME)
-            best_model_path = self.s3.read_data_from_s3(TRAINED_MODEL_NAME, self.bucket_name, predict_model_path)
-            logging.info("Exited the get_model_from_s3 method of PredictionPipeline class")
-            return best_model_path
+            model = model if model is not None else self.get_model()
+            if self.stream_scheduler is not None:
+                pred = self.stream_scheduler.predict(self.stream_id, image_tensor, model=model)
+            elif self.batch_scheduler is not None:
+                # concurrent requests are grouped into one forward by the scheduler
+                pred = self.batch_scheduler.predict(image_tensor, self.deadline, model)
+            else:
+                check_deadline(self.deadline)
+                with torch.inference_mode():
+                    prediction = model([image_tensor.to(DEVICE)])
+                    pred = {k: v.to("cpu") for k, v in prediction[0].items()}
+            logging.info("Exited the detect method of PredictionPipeline class")
+            return pred
 
         except Exception as e:
             raise HelmetException(e, sys) from e
 
 
-    
-    def prediction(self, best_model_path: str, image_tensor, image_int_tensor) -> float:
-        logging.info("Entered the prediction method of PredictionPipeline class")
+    def detect_batch(self, image_tensors: List, batch_size: int = PREDICT_BATCH_SIZE, model=None) -> List[dict]:
+        """
+        Method Name :   detect_batch
+        Description :   This method runs the detector on many images. Images of the same size are
+                        forwarded together in chunks of batch_size so no batch is padded up to a
+                        much larger neighbour. A stream pipeline keeps one frame pending at a
+                        time, so its images go through the stream scheduler one after another.
+
+        Output      :   Raw prediction dicts on the cpu, in input order
+        """
+        logging.info("Entered the detect_batch method of PredictionPipeline class")
+        try:
+            groups = defaultdict(list)
+            for index, image in enumerate(image_tensors):
+                groups[tuple(image.shape[-2:])].append(index)
+            ordered = [index for size in sorted(groups) for index in groups[size]]
+
+            preds = [None] * len(image_tensors)
+            model = model if model is not None else self.get_model()
+            if self.stream_scheduler is not None:
+                # queued together they would supersede each other as frames of the same stream
+                for index in ordered:
+                    preds[index] = self.stream_scheduler.predict(self.stream_id, image_tensors[index], model=model)
+            elif self.batch_scheduler is not None:
+                # queue same-size images back to back so the scheduler forms size-grouped batches
+                futures = [(index, self.batch_scheduler.submit(image_tensors[index], self.deadline, model)) for index in ordered]
+                for index, future in futures:
+                    preds[index] = future.result()
+            else:
+                for indices in groups.values():
+                    for start in range(0, len(indices), batch_size):
+                        chunk = indices[start:start + batch_size]
+                        check_deadline(self.deadline)
+                        with torch.inference_mode():
+                            outputs = model([image_tensors[index].to(DEVICE) for index in chunk])
+                        for index, output in zip(chunk, outputs):
+                            preds[index] = {k: v.to("cpu") for k, v in output.items()}
+
+            logging.info("Exited the detect_batch method of PredictionPipeline class")
+            return preds
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def tiled_prediction(self, image_tensor, region_mask=None) -> dict:
+        """
+        Method Name :   tiled_prediction
+        Description :   This method cuts the full resolution image into overlapping TILE_SIZE tiles,
+                        skips the tiles outside the optional region mask, runs the rest through the
+                        detector together and merges the boxes across tile seams with per class NMS.
+
+        Output      :   Raw prediction dict in image coordinates
+        """
+        logging.info("Entered the tiled_prediction method of PredictionPipeline class")
+        try:
+            height, width = image_tensor.shape[-2:]
+            tiles = make_tiles(height, width, TILE_SIZE, TILE_OVERLAP)
+            if region_mask is not None:
+                tiles = filter_tiles_by_mask(tiles, region_mask)
+
+            crops = [image_tensor[:, y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+            preds = self.detect_batch(crops, batch_size=TILE_BATCH_SIZE)
+            pred = merge_tile_detections(preds, tiles, TILE_NMS_IOU_THRESHOLD)
+            logging.info(f"Ran {len(tiles)} tiles for a {width}x{height} image")
+            logging.info("Exited the tiled_prediction method of PredictionPipeline class")
+            return pred
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def cascade_prediction(self, image_tensor) -> dict:
+        """
+        Method Name :   cascade_prediction
+        Description :   This method runs a low resolution pass first and only runs the full
+                        resolution model again, on crops around the ambiguous boxes or on the whole
+                        frame, when the first pass is uncertain or the frame is crowded.
+
+        Output      :   Raw prediction dict in image coordinates
+        """
+        logging.info("Entered the cascade_prediction method of PredictionPipeline class")
         try:
-            model = torch.load(best_model_path, map_location=torch.device(DEVICE))
-            model.eval()
-            with torch.no_grad():
-                prediction = model([image_tensor.to(DEVICE)])
-                pred = prediction[0]
+            config = self.cascade.cascade_config
+            # a variant sharing the resident weights, with a small input size and a permissive threshold
+            low_model = self.model_registry.get_model_variant("cascade_low", input_size=config.LOW_INPUT_SIZE,
+                                                              max_size=config.LOW_MAX_SIZE,
+                                                              score_threshold=config.AMBIGUOUS_LOW)
+            pred = self.detect(image_tensor, model=low_model)
+
+            recheck = self.cascade.recheck(pred, PREDICTION_SCORE_THRESHOLD)
+            crops = 0
+            if recheck is None:
+                pred = self.filter_detections(pred)
+            elif recheck == CASCADE_RECHECK_CROPS:
+                height, width = image_tensor.shape[-2:]
+                confident = pred['scores'] > PREDICTION_SCORE_THRESHOLD
+                ambiguous = (pred['scores'] > config.AMBIGUOUS_LOW) & ~confident
+                regions = self.cascade.crop_regions(pred['boxes'][ambiguous], height, width)
+                crops = len(regions)
+                crop_preds = self.detect_batch([image_tensor[:, y0:y1, x0:x1] for x0, y0, x1, y1 in regions])
+                # confident first pass boxes stand, ambiguous ones survive only if a crop confirms them
+                pred = merge_tile_detections([{k: v[confident] for k, v in pred.items()}] +
+                                             [self.filter_detections(crop_pred) for crop_pred in crop_preds],
+                                             [(0, 0, width, height)] + regions, config.NMS_IOU_THRESHOLD)
+            else:
+                pred = self.detect(image_tensor)
+
+            self.cascade.record(recheck, crops)
+            logging.info("Exited the cascade_prediction method of PredictionPipeline class")
+            return pred
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    @staticmethod
+    def load_region_mask(mask_bytes: bytes, image_tensor):
+        """Decodes a mask image, non zero pixels are inside the region, resized to the image"""
+        mask = Image.open(io.BytesIO(mask_bytes)).convert("L")
+        height, width = image_tensor.shape[-2:]
+        if mask.size != (width, height):
+            mask = mask.resize((width, height), Image.NEAREST)
+        return torch.from_numpy(np.array(mask) > 0)
+
+
+    def infer(self, image_tensor, inference_mode: str = INFERENCE_MODE_FULL, region_mask=None) -> dict:
+        """Runs the requested inference mode, returns detections above the score threshold"""
+        if inference_mode == INFERENCE_MODE_TILED:
+            pred = self.tiled_prediction(image_tensor, region_mask)
+        elif inference_mode == INFERENCE_MODE_CASCADE:
+            pred = self.cascade_prediction(image_tensor)
+        else:
+            pred = self.detect(image_tensor)
+        pred = self.filter_detections(pred)
+        if region_mask is not None:
+            pred = filter_detections_by_mask(pred, region_mask)
+        return pred
+
+
+    def roi_infer(self, image_tensor, camera_id: str = None, inference_mode: str = INFERENCE_MODE_FULL,
+                  region_mask=None) -> dict:
+        """
+        infer on the crop around the camera's region of interest, boxes are mapped back to the full
+        frame and detections outside the region are dropped. Cameras without a region run infer.
+        """
+        height, width = image_tensor.shape[-2:]
+        roi = self.camera_regions.get(camera_id, height, width) if self.camera_regions is not None and camera_id else None
+        if roi is None:
+            return self.infer(image_tensor, inference_mode, region_mask)
+        if roi.bounds is None:
+            return {'boxes': torch.zeros((0, 4)), 'labels': torch.zeros((0,), dtype=torch.int64), 'scores': torch.zeros((0,))}
+
+        mask = roi.mask if region_mask is None else roi.mask & region_mask
+        x0, y0, x1, y1 = roi.bounds
+        pred = self.infer(image_tensor[:, y0:y1, x0:x1], inference_mode, mask[y0:y1, x0:x1])
+        return dict(pred, boxes=pred['boxes'] + torch.tensor([x0, y0, x0, y0], dtype=pred['boxes'].dtype))
+
+
+    def roi_digest(self, camera_id: str = None):
+        """Fingerprint of the camera's current region of interest, None when it has none"""
+        if self.camera_regions is None or not camera_id:
+            return None
+        return self.camera_regions.digest(camera_id)
+
+
+    def gated_infer(self, image_tensor, camera_id: str = None, inference_mode: str = INFERENCE_MODE_FULL,
+                    region_mask=None, context=None) -> dict:
+        """roi_infer, skipped in favour of the camera's previous detections when its scene has not changed"""
+        compute = lambda: self.roi_infer(image_tensor, camera_id, inference_mode, region_mask)
+        if self.frame_gate is None or camera_id is None:
+            return compute()
+        # an edited region of interest or a hot reloaded model invalidates the detections computed before
+        return self.frame_gate.gate(camera_id, image_tensor, compute,
+                                    context=(inference_mode, self.roi_digest(camera_id),
+                                             self.model_registry.get_model_version(), context))
+
+
+    def filter_detections(self, pred: dict, score_threshold: float = PREDICTION_SCORE_THRESHOLD) -> dict:
+        model_score_threshold = self.get_model().score_threshold
+        if model_score_threshold is not None and model_score_threshold >= score_threshold:
+            # the model already dropped these boxes in its own post-processing
+            return pred
+        keep = pred['scores'] > score_threshold
+        return {'boxes': pred['boxes'][keep], 'labels': pred['labels'][keep], 'scores': pred['scores'][keep]}
+
+
+    @staticmethod
+    def original_size(image_tensor, scale: float = 1.0) -> tuple:
+        """(width, height) of the image before reduced resolution decoding"""
+        return round(image_tensor.shape[-1] * scale), round(image_tensor.shape[-2] * scale)
+
+
+    @staticmethod
+    def label_name(label: int) -> str:
+        return PREDICTION_CLASSES[label] if 0 <= label < len(PREDICTION_CLASSES) else str(label)
+
 
+    def format_detections(self, pred: dict, image_size, scale: float = 1.0) -> dict:
+        """
+        Method Name :   format_detections
+        Description :   This method converts filtered predictions to plain python types. Boxes are
+                        multiplied by scale to map them from the decoded to the original image.
+
+        Output      :   {"image_size": [width, height], "detections": [{"box", "label", "label_id", "score"}]}
+        """
+        boxes = (pred['boxes'] * scale).tolist() if scale != 1.0 else pred['boxes'].tolist()
+        labels = pred['labels'].tolist()
+        scores = pred['scores'].tolist()
+        detections = [
+            {"box": [round(v, 2) for v in box], "label": self.label_name(label), "label_id": label, "score": round(score, 4)}
+            for box, label, score in zip(boxes, labels, scores)
+        ]
+        return {"image_size": list(image_size), "detections": detections}
+
+
+    def render_prediction(self, pred: dict, image_int_tensor) -> bytes:
+        logging.info("Entered the render_prediction method of PredictionPipeline class")
+        try:
             bbox_tensor = draw_bounding_boxes(image_int_tensor,
-                                pred['boxes'][pred['scores'] > 0.8],
-                                [PREDICTION_CLASSES[i] for i in pred['labels'][pred['scores'] > 0.8].tolist()],
+                                pred['boxes'],
+                                [self.label_name(i) for i in pred['labels'].tolist()],
                                 width=4).permute(0, 2, 1)
 
             transform = transforms.ToPILImage()
@@ -75,6 +364,18 @@ class PredictionPipeline:
             img.save(buffered, format="JPEG")
             img_str = base64.b64encode(buffered.getvalue())
 
+            logging.info("Exited the render_prediction method of PredictionPipeline class")
+            return img_str
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def prediction(self, image_tensor, image_int_tensor, camera_id: str = None) -> bytes:
+        logging.info("Entered the prediction method of PredictionPipeline class")
+        try:
+            pred = self.gated_infer(image_tensor, camera_id)
+            img_str = self.render_prediction(pred, image_int_tensor)
             logging.info("Exited the prediction method of PredictionPipeline class")
             return img_str
 
@@ -82,17 +383,100 @@ class PredictionPipeline:
             raise HelmetException(e, sys) from e
 
 
-    
-    
-    def run_pipeline(self, data):
+    def decode_draft_size(self, response_format: str, inference_mode: str = INFERENCE_MODE_FULL):
+        """
+        Draft size to decode with, None for full resolution. The rendered image is returned at the
+        decoded size, so only JSON responses, whose boxes are scaled back, use draft decode. Tiling
+        and the cascade's re-check exist to see full resolution, so they never do.
+        """
+        if response_format != RESPONSE_FORMAT_JSON or inference_mode != INFERENCE_MODE_FULL:
+            return None
+        return self.draft_size
+
+
+    def run_pipeline(self, data, response_format: str = RESPONSE_FORMAT_IMAGE,
+                     inference_mode: str = INFERENCE_MODE_FULL, region_mask_bytes: bytes = None, camera_id: str = None):
+        """
+        :param data: encoded image bytes
+        :param response_format: RESPONSE_FORMAT_IMAGE returns the base64 jpeg with boxes drawn,
+                                RESPONSE_FORMAT_JSON returns the detections only and skips all rendering
+        :param inference_mode: INFERENCE_MODE_FULL, INFERENCE_MODE_TILED or INFERENCE_MODE_CASCADE
+        :param region_mask_bytes: optional mask image, tiles and detections outside it are dropped
+        :param camera_id: optional stream name, enables frame gating against that camera's previous frame
+        """
         logging.info("Entered the run_pipeline method of PredictionPipeline class")
         try:
-            image, image_int = self.image_loader(data)
-            print(image.shape)
-            print(image_int.shape)
-            best_model_path: str = self.get_model_from_s3()
-            detected_image = self.prediction(best_model_path, image, image_int)
+            mask_digest = hashlib.sha256(region_mask_bytes).hexdigest() if region_mask_bytes else None
+            roi_digest = self.roi_digest(camera_id)
+            tier_name = self.tier_name
+            compute = lambda: self._run_pipeline(data, response_format, inference_mode, region_mask_bytes, camera_id,
+                                                 mask_digest, tier_name)
+            if self.result_cache is not None:
+                # byte identical frames and gateway retries are answered from the cache
+                key = self.result_cache.make_key(data, self.model_registry.get_model_version(),
+                                                 response_format, inference_mode, mask_digest, tier_name,
+                                                 camera_id, roi_digest)
+                output = self.result_cache.get_or_compute(key, compute)
+            else:
+                output = compute()
             logging.info("Exited the run_pipeline method of PredictionPipeline class")
-            return detected_image
+            return output
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def _run_pipeline(self, data, response_format: str, inference_mode: str, region_mask_bytes: bytes,
+                      camera_id: str = None, mask_digest: str = None, tier_name: str = None):
+        try:
+            image, image_int, scale = self.image_loader(data, self.decode_draft_size(response_format, inference_mode))
+            region_mask = self.load_region_mask(region_mask_bytes, image) if region_mask_bytes else None
+
+            pred = self.gated_infer(image, camera_id, inference_mode, region_mask, context=(mask_digest, tier_name))
+            if response_format == RESPONSE_FORMAT_JSON:
+                output = self.format_detections(pred, image_size=self.original_size(image, scale), scale=scale)
+                if tier_name is not None:
+                    output["tier"] = tier_name
+            else:
+                output = self.render_prediction(pred, image_int)
+            return output
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def run_batch_pipeline(self, data_list: List[bytes], response_format: str = RESPONSE_FORMAT_IMAGE) -> List[dict]:
+        """
+        :param data_list: encoded images
+        :param response_format: same as run_pipeline
+        :return: one result per input image in input order, {"result": ...} or {"error": ...}
+                 when that image could not be decoded; JSON results name the serving tier like run_pipeline
+        """
+        logging.info("Entered the run_batch_pipeline method of PredictionPipeline class")
+        try:
+            def load(data):
+                try:
+                    return self.image_loader(data, self.decode_draft_size(response_format)), None
+                except Exception as e:
+                    return None, str(e)
+
+            with ThreadPoolExecutor(max_workers=PREDICT_BATCH_DECODE_WORKERS) as executor:
+                loaded = list(executor.map(load, data_list))
+
+            valid = [index for index, (images, _) in enumerate(loaded) if images is not None]
+            preds = self.detect_batch([loaded[index][0][0] for index in valid])
+
+            results = [{"error": error} for _, error in loaded]
+            for index, pred in zip(valid, preds):
+                image, image_int, scale = loaded[index][0]
+                pred = self.filter_detections(pred)
+                if response_format == RESPONSE_FORMAT_JSON:
+                    output = self.format_detections(pred, image_size=self.original_size(image, scale), scale=scale)
+                    if self.tier_name is not None:
+                        output["tier"] = self.tier_name
+                    results[index] = {"result": output}
+                else:
+                    results[index] = {"result": self.render_prediction(pred, image_int).decode()}
+
+            logging.info("Exited the run_batch_pipeline method of PredictionPipeline class")
+            return results
         except Exception as e:
             raise HelmetException(e, sys) from e
@@ -2,11 +2,13 @@ import sys
 from helmet.components.data_ingestion import DataIngestion
 from helmet.components.data_transformation import DataTransformation
 from helmet.components.model_trainer import ModelTrainer
+from helmet.components.model_exporter import ModelExporter
+from helmet.components.model_quantization import ModelQuantization
 from helmet.components.model_evaluation import ModelEvaluation
 from helmet.components.model_pusher import ModelPusher
 from helmet.configuration.s3_operations import S3Operation
-from helmet.entity.config_entity import DataIngestionConfig,DataTransformationConfig, ModelTrainerConfig,ModelEvaluationConfig, ModelPusherConfig
-from helmet.entity.artifacts_entity import DataIngestionArtifacts, DataTransformationArtifacts, ModelTrainerArtifacts, ModelEvaluationArtifacts,ModelPusherArtifacts 
+from helmet.entity.config_entity import DataIngestionConfig,DataTransformationConfig, ModelTrainerConfig, ModelExporterConfig, ModelQuantizationConfig, ModelEvaluationConfig, ModelPusherConfig
+from helmet.entity.artifacts_entity import DataIngestionArtifacts, DataTransformationArtifacts, ModelTrainerArtifacts, ModelExporterArtifacts, ModelQuantizationArtifacts, ModelEvaluationArtifacts,ModelPusherArtifacts 
 from helmet.logger import logging
 from helmet.exception import HelmetException
 
@@ -18,6 +20,8 @@ class TrainPipeline:
         self.data_ingestion_config = DataIngestionConfig()
         self.data_transformation_config = DataTransformationConfig()
         self.model_trainer_config = ModelTrainerConfig()
+        self.model_exporter_config = ModelExporterConfig()
+        self.model_quantization_config = ModelQuantizationConfig()
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
         self.s3_operations = S3Operation()
@@ -79,6 +83,34 @@ class TrainPipeline:
             raise HelmetException(e, sys)
 
     
+    def start_model_exporter(self, model_trainer_artifact: ModelTrainerArtifacts, data_transformation_artifact: DataTransformationArtifacts) -> ModelExporterArtifacts:
+        logging.info("Entered the start_model_exporter method of TrainPipeline class")
+        try:
+            model_exporter = ModelExporter(model_exporter_config=self.model_exporter_config,
+                                           model_trainer_artifacts=model_trainer_artifact,
+                                           data_transformation_artifacts=data_transformation_artifact)
+            model_exporter_artifact = model_exporter.initiate_model_exporter()
+            logging.info("Exited the start_model_exporter method of TrainPipeline class")
+            return model_exporter_artifact
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+    
+    def start_model_quantization(self, model_trainer_artifact: ModelTrainerArtifacts, data_transformation_artifact: DataTransformationArtifacts) -> ModelQuantizationArtifacts:
+        logging.info("Entered the start_model_quantization method of TrainPipeline class")
+        try:
+            model_quantization = ModelQuantization(model_quantization_config=self.model_quantization_config,
+                                                   model_trainer_artifacts=model_trainer_artifact,
+                                                   data_transformation_artifacts=data_transformation_artifact)
+            model_quantization_artifact = model_quantization.initiate_model_quantization()
+            logging.info("Exited the start_model_quantization method of TrainPipeline class")
+            return model_quantization_artifact
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+    
     def start_model_evaluation(self, model_trainer_artifact: ModelTrainerArtifacts, data_transformation_artifact: DataTransformationArtifacts) -> ModelEvaluationArtifacts:
         logging.info("Entered the start_model_evaluation method of TrainPipeline class")
         try:
@@ -95,12 +127,15 @@ class TrainPipeline:
 
 
     
-    def start_model_pusher(self,s3: S3Operation,) -> ModelPusherArtifacts:
+    def start_model_pusher(self,s3: S3Operation, model_exporter_artifact: ModelExporterArtifacts = None,
+                           model_quantization_artifact: ModelQuantizationArtifacts = None) -> ModelPusherArtifacts:
         logging.info("Entered the start_model_pusher method of TrainPipeline class")
         try:
             model_pusher = ModelPusher(
                 model_pusher_config=self.model_pusher_config,
                 s3=s3,
+                model_exporter_artifacts=model_exporter_artifact,
+                model_quantization_artifacts=model_quantization_artifact,
             )
             model_pusher_artifact = model_pusher.initiate_model_pusher()
             logging.info("Initiated the model pusher")
@@ -122,13 +157,24 @@ class TrainPipeline:
             model_trainer_artifact = self.start_model_trainer(
                 data_transformation_artifact=data_transformation_artifact
             )
+            model_exporter_artifact = self.start_model_exporter(model_trainer_artifact=model_trainer_artifact,
+                                                                data_transformation_artifact=data_transformation_artifact
+            )
             model_evaluation_artifact = self.start_model_evaluation(model_trainer_artifact=model_trainer_artifact,
                                                                     data_transformation_artifact=data_transformation_artifact
             )
             if not model_evaluation_artifact.is_model_accepted:
                  raise Exception("Trained model is not better than the best model")
+
+            # quantizing costs two COCO evaluations and the benchmarks, only spend them on an accepted model
+            model_quantization_artifact = None
+            if self.model_quantization_config.ENABLED:
+                model_quantization_artifact = self.start_model_quantization(model_trainer_artifact=model_trainer_artifact,
+                                                                            data_transformation_artifact=data_transformation_artifact
+                )
             
-            model_pusher_artifact = self.start_model_pusher(s3=self.s3_operations)
+            model_pusher_artifact = self.start_model_pusher(s3=self.s3_operations, model_exporter_artifact=model_exporter_artifact,
+                                                            model_quantization_artifact=model_quantization_artifact)
             
             logging.info("Exited the run_pipeline method of TrainPipeline class")
 
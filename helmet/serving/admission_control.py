@@ -0,0 +1,131 @@
+import math
+import time
+import asyncio
+import contextlib
+from collections import deque
+import numpy as np
+from helmet.entity.config_entity import AdmissionControlConfig
+
+
+class AdmissionRejected(Exception):
+    """The request was shed, the queue was full or its deadline passed before the model ran"""
+
+    def __init__(self, message: str, retry_after_seconds: int = 1):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+def check_deadline(deadline: float = None) -> None:
+    """Raises AdmissionRejected when the time.perf_counter() deadline of an admitted request has passed"""
+    if deadline is not None and time.perf_counter() > deadline:
+        raise AdmissionRejected("Request deadline passed before inference")
+
+
+def find_rejection(error: BaseException):
+    """The AdmissionRejected an exception was raised from, if any, e.g. through HelmetException wrapping"""
+    while error is not None:
+        if isinstance(error, AdmissionRejected):
+            return error
+        error = error.__cause__
+    return None
+
+
+class AdmissionController:
+    """
+    Bounded admission in front of the inference executor.
+
+    At most MAX_CONCURRENT requests run at a time and at most MAX_QUEUE_DEPTH wait for a slot.
+    A request arriving at a full queue is rejected straight away, a queued request whose deadline
+    passes before it gets a slot is dropped without touching the model. admit() hands back the
+    deadline so the request can re-check it right before the forward, after waiting in the executor
+    or a batch queue. Rejections carry a Retry-After estimate from the queue length and the recent
+    service time. Only touched from the event loop.
+    """
+
+    def __init__(self, admission_control_config: AdmissionControlConfig = None, max_concurrent: int = None,
+                 max_queue_depth: int = None):
+        """
+        :param admission_control_config: Configuration for the queue
+        :param max_concurrent: Requests served at the same time, defaults to the config's MAX_CONCURRENT
+        :param max_queue_depth: Requests waiting for a slot, defaults to the config's MAX_QUEUE_DEPTH
+        """
+        self.admission_control_config = admission_control_config if admission_control_config is not None else AdmissionControlConfig()
+        self.max_concurrent = max_concurrent if max_concurrent is not None else self.admission_control_config.MAX_CONCURRENT
+        self.max_queue_depth = max_queue_depth if max_queue_depth is not None else self.admission_control_config.MAX_QUEUE_DEPTH
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._waiting = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected_queue_full = 0
+        self._dropped_deadline = 0
+        self._expired_before_inference = 0
+        self._service_time_estimate = 0.0
+        self._queue_waits_ms = deque(maxlen=1024)
+
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained"""
+        return max(1, math.ceil((self._waiting + 1) * self._service_time_estimate / self.max_concurrent))
+
+
+    def record_expired(self) -> None:
+        """Counts an admitted request that was dropped because its deadline passed before inference"""
+        self._expired_before_inference += 1
+
+
+    @contextlib.asynccontextmanager
+    async def admit(self, deadline_ms: float = None):
+        """Waits for a serving slot and yields the request's time.perf_counter() deadline, raises AdmissionRejected when the request is shed"""
+        arrived = time.perf_counter()
+        deadline_ms = deadline_ms if deadline_ms is not None else self.admission_control_config.DEFAULT_DEADLINE_MS
+        deadline = arrived + deadline_ms / 1000
+
+        if self._semaphore.locked():
+            if self._waiting >= self.max_queue_depth:
+                self._rejected_queue_full += 1
+                raise AdmissionRejected("Server is at capacity", self.retry_after())
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(0.0, deadline - time.perf_counter()))
+            except asyncio.TimeoutError:
+                self._dropped_deadline += 1
+                raise AdmissionRejected("Request deadline passed while queued", self.retry_after())
+            finally:
+                self._waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        started = time.perf_counter()
+        self._queue_waits_ms.append(1000 * (started - arrived))
+        self._admitted += 1
+        self._active += 1
+        try:
+            yield deadline
+        finally:
+            self._active -= 1
+            service_time = time.perf_counter() - started
+            self._service_time_estimate = service_time if not self._service_time_estimate \
+                else 0.9 * self._service_time_estimate + 0.1 * service_time
+            self._semaphore.release()
+
+
+    def get_stats(self) -> dict:
+        queue_waits = np.array(self._queue_waits_ms) if self._queue_waits_ms else None
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue_depth": self.max_queue_depth,
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "admitted": self._admitted,
+            "rejected_queue_full": self._rejected_queue_full,
+            "dropped_deadline": self._dropped_deadline,
+            "expired_before_inference": self._expired_before_inference,
+            "mean_queue_wait_ms": round(float(queue_waits.mean()), 3) if queue_waits is not None else 0.0,
+            "p95_queue_wait_ms": round(float(np.percentile(queue_waits, 95)), 3) if queue_waits is not None else 0.0,
+            "service_time_estimate_ms": round(1000 * self._service_time_estimate, 3),
+        }
@@ -0,0 +1,174 @@
+import sys
+import time
+import queue
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from typing import Dict, List
+import torch
+from helmet.entity.config_entity import BatchSchedulerConfig
+from helmet.exception import HelmetException
+from helmet.logger import logging
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.degradation import DegradationPolicy
+from helmet.serving.inference_backend import InferenceBackend
+from helmet.serving.admission_control import AdmissionRejected
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching in front of the detector.
+
+    Requests are queued with submit(). A single worker thread waits for the first request,
+    keeps collecting until MAX_BATCH_SIZE images are queued or MAX_WAIT_SECONDS have passed,
+    runs one batched forward and resolves every request's future with its own detections.
+    Requests whose deadline passed while they were queued fail with AdmissionRejected instead.
+    A request may name the model it has to run on, e.g. its serving tier's; requests for different
+    models that land in the same batch are forwarded separately.
+    """
+
+    def __init__(self, model_registry: ModelRegistry, batch_scheduler_config: BatchSchedulerConfig = None,
+                 degradation_policy: DegradationPolicy = None):
+        self.model_registry = model_registry
+        # under load the policy hands out a cheaper variant of the resident model
+        self.degradation_policy = degradation_policy
+        self.batch_scheduler_config = batch_scheduler_config if batch_scheduler_config is not None else BatchSchedulerConfig()
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._stop_event = threading.Event()
+        self._worker: threading.Thread = None
+        self._stats_lock = threading.Lock()
+        self._batches_run = 0
+        self._images_processed = 0
+        self._batch_size_histogram = Counter()
+        self._total_forward_time = 0.0
+        self._total_queue_wait_time = 0.0
+
+
+    def start(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._worker.start()
+        logging.info("Started the batch scheduler worker")
+
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        logging.info("Stopped the batch scheduler worker")
+
+
+    def submit(self, image_tensor: torch.Tensor, deadline: float = None, model: InferenceBackend = None) -> Future:
+        """Queues one image, the returned future resolves to its prediction dict"""
+        future = Future()
+        self._queue.put((image_tensor, future, time.perf_counter(), deadline, model))
+        return future
+
+
+    def predict(self, image_tensor: torch.Tensor, deadline: float = None,
+                model: InferenceBackend = None) -> Dict[str, torch.Tensor]:
+        try:
+            return self.submit(image_tensor, deadline, model).result()
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def _collect_batch(self) -> List[tuple]:
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.batch_scheduler_config.MAX_WAIT_SECONDS
+        while len(batch) < self.batch_scheduler_config.MAX_BATCH_SIZE:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+
+    def _run_batch(self, batch: List[tuple]) -> None:
+        # drop requests whose caller already gave up
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        # and requests that waited in the queue past their deadline, without running the model for them
+        now = time.perf_counter()
+        for _, future, _, deadline, _ in batch:
+            if deadline is not None and now > deadline:
+                future.set_exception(AdmissionRejected("Request deadline passed before inference"))
+        batch = [item for item in batch if item[3] is None or now <= item[3]]
+
+        # requests resolved to different tiers around a tier change run on their own model each
+        groups = defaultdict(list)
+        for item in batch:
+            groups[id(item[4])].append(item)
+        for group in groups.values():
+            self._forward(group)
+
+
+    def _forward(self, batch: List[tuple]) -> None:
+        device = self.batch_scheduler_config.DEVICE
+        forward_start = time.perf_counter()
+        try:
+            model = batch[0][4]
+            if model is None:
+                model = self.degradation_policy.get_model() if self.degradation_policy is not None else self.model_registry.get_model()
+            with torch.inference_mode():
+                outputs = model([image.to(device) for image, _, _, _, _ in batch])
+            outputs = [{k: v.to("cpu") for k, v in output.items()} for output in outputs]
+        except Exception as e:
+            logging.error(f"Batched forward of {len(batch)} images failed: {e}")
+            for _, future, _, _, _ in batch:
+                future.set_exception(e)
+            return
+        forward_end = time.perf_counter()
+
+        for (_, future, _, _, _), output in zip(batch, outputs):
+            future.set_result(output)
+
+        with self._stats_lock:
+            self._batches_run += 1
+            self._images_processed += len(batch)
+            self._batch_size_histogram[len(batch)] += 1
+            self._total_forward_time += forward_end - forward_start
+            self._total_queue_wait_time += sum(forward_start - enqueued for _, _, enqueued, _, _ in batch)
+
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+
+        # fail whatever is still queued so no caller waits forever
+        while True:
+            try:
+                _, future, _, _, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            batches_run = self._batches_run
+            images_processed = self._images_processed
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.batch_scheduler_config.MAX_BATCH_SIZE,
+                "max_wait_ms": self.batch_scheduler_config.MAX_WAIT_SECONDS * 1000,
+                "batches_run": batches_run,
+                "images_processed": images_processed,
+                "mean_batch_size": round(images_processed / batches_run, 3) if batches_run else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_size_histogram.items())},
+                "mean_forward_ms": round(1000 * self._total_forward_time / batches_run, 3) if batches_run else 0.0,
+                "mean_queue_wait_ms": round(1000 * self._total_queue_wait_time / images_processed, 3) if images_processed else 0.0,
+            }
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import time
+import threading
+from typing import Dict, Optional, Tuple
+import numpy as np
+import torch
+from PIL import Image, ImageDraw
+from helmet.entity.config_entity import CameraROIConfig
+from helmet.logger import logging
+
+
+class CameraROI:
+    """The region of interest of one camera at one frame size"""
+
+    def __init__(self, mask: torch.Tensor):
+        self.mask = mask
+        ys, xs = torch.nonzero(mask, as_tuple=True)
+        # (x0, y0, x1, y1) of the smallest crop holding the whole region, None when it is empty
+        self.bounds: Optional[Tuple[int, int, int, int]] = \
+            (int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1) if len(xs) else None
+
+
+class CameraRegions:
+    """
+    Per camera regions of interest, read from a JSON file keyed by camera id:
+
+        {"gate_cam": [{"rect": [0.0, 0.35, 0.6, 1.0]},
+                      {"polygon": [[0.6, 0.5], [1.0, 0.4], [1.0, 1.0], [0.6, 1.0]]}]}
+
+    Coordinates are fractions of the frame width and height, so a definition holds for every
+    resolution a camera is decoded at. A camera's region is the union of its shapes. The file is
+    re-read when it changes, masks are built once per camera and frame size.
+    """
+
+    def __init__(self, camera_roi_config: CameraROIConfig = None):
+        self.camera_roi_config = camera_roi_config if camera_roi_config is not None else CameraROIConfig()
+        self._lock = threading.Lock()
+        self._definitions: Dict[str, list] = {}
+        self._digests: Dict[str, str] = {}
+        self._rois: Dict[tuple, CameraROI] = {}
+        self._file_mtime = None
+        self._last_check = 0.0
+        self.reload_if_changed()
+
+
+    def reload_if_changed(self) -> bool:
+        path = self.camera_roi_config.FILE_PATH
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime == self._file_mtime:
+            return False
+
+        definitions = {}
+        if mtime is not None:
+            try:
+                with open(path) as roi_file:
+                    definitions = json.load(roi_file)
+            except (OSError, ValueError) as e:
+                # keep serving the previous regions rather than none at all
+                logging.error(f"Could not read camera regions from {path}: {e}")
+                return False
+        # a short fingerprint per camera so cached results can tell an edited region from the old one
+        digests = {camera_id: hashlib.sha256(json.dumps(shapes, sort_keys=True).encode()).hexdigest()[:16]
+                   for camera_id, shapes in definitions.items() if shapes}
+        with self._lock:
+            self._definitions = definitions
+            self._digests = digests
+            self._rois = {}
+            self._file_mtime = mtime
+        logging.info(f"Loaded regions of interest for {len(definitions)} cameras from {path}")
+        return True
+
+
+    @staticmethod
+    def rasterize(shapes: list, height: int, width: int) -> torch.Tensor:
+        mask = Image.new("L", (width, height), 0)
+        draw = ImageDraw.Draw(mask)
+        for shape in shapes:
+            if "rect" in shape:
+                x0, y0, x1, y1 = shape["rect"]
+                draw.rectangle([x0 * width, y0 * height, x1 * width - 1, y1 * height - 1], fill=1)
+            elif "polygon" in shape:
+                draw.polygon([(x * width, y * height) for x, y in shape["polygon"]], fill=1)
+            else:
+                raise ValueError(f"A region needs a 'rect' or a 'polygon', got {shape}")
+        return torch.from_numpy(np.array(mask) > 0)
+
+
+    def _check_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check >= self.camera_roi_config.RELOAD_INTERVAL_SECONDS:
+            self._last_check = now
+            self.reload_if_changed()
+
+
+    def digest(self, camera_id: str) -> Optional[str]:
+        """Fingerprint of the current region definition of camera_id, None when the camera has none"""
+        self._check_reload()
+        with self._lock:
+            return self._digests.get(camera_id)
+
+
+    def get(self, camera_id: str, height: int, width: int) -> Optional[CameraROI]:
+        """The region of camera_id for a height x width frame, None when the camera has none"""
+        self._check_reload()
+        with self._lock:
+            shapes = self._definitions.get(camera_id)
+            if not shapes:
+                return None
+            key = (camera_id, height, width)
+            roi = self._rois.get(key)
+            if roi is None:
+                roi = self._rois[key] = CameraROI(self.rasterize(shapes, height, width))
+            return roi
+
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "file_path": self.camera_roi_config.FILE_PATH,
+                "cameras": sorted(self._definitions),
+                "cached_masks": len(self._rois),
+            }
@@ -0,0 +1,76 @@
+import threading
+from typing import List, Tuple
+import torch
+from helmet.entity.config_entity import CascadeConfig
+
+CASCADE_RECHECK_CROPS = 'crops'
+CASCADE_RECHECK_FULL = 'full'
+
+
+class Cascade:
+    """
+    Decides when a low resolution pass needs a second look and where.
+
+    The first pass runs at LOW_INPUT_SIZE with a score threshold lowered to AMBIGUOUS_LOW, so
+    uncertain boxes are visible. Boxes scoring between AMBIGUOUS_LOW and the serving threshold are
+    ambiguous. A frame without ambiguous boxes is answered from the first pass; one with them is
+    re-checked on crops around them or on the full frame, as RECHECK says; a crowded frame, where
+    crops would overlap into most of the image anyway, is always re-run on the full frame.
+    The counters are shared by every pipeline using this instance.
+    """
+
+    def __init__(self, cascade_config: CascadeConfig = None):
+        self.cascade_config = cascade_config if cascade_config is not None else CascadeConfig()
+        if self.cascade_config.RECHECK not in (CASCADE_RECHECK_CROPS, CASCADE_RECHECK_FULL):
+            raise ValueError(f"Unknown cascade recheck {self.cascade_config.RECHECK}")
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._rechecked_crops = 0
+        self._rechecked_full = 0
+        self._crops = 0
+
+
+    def recheck(self, pred: dict, score_threshold: float):
+        """CASCADE_RECHECK_CROPS, CASCADE_RECHECK_FULL or None for a first pass prediction"""
+        scores = pred['scores']
+        candidates = scores > self.cascade_config.AMBIGUOUS_LOW
+        if int(candidates.sum()) >= self.cascade_config.CROWDED_COUNT:
+            return CASCADE_RECHECK_FULL
+        if bool((candidates & (scores <= score_threshold)).any()):
+            return self.cascade_config.RECHECK
+        return None
+
+
+    def crop_regions(self, boxes: torch.Tensor, height: int, width: int) -> List[Tuple[int, int, int, int]]:
+        """(x0, y0, x1, y1) regions around each box with CROP_CONTEXT box sizes of margin, at least CROP_MIN_SIZE"""
+        regions = []
+        for x0, y0, x1, y1 in boxes.tolist():
+            margin = self.cascade_config.CROP_CONTEXT * max(x1 - x0, y1 - y0)
+            half_size = max((max(x1 - x0, y1 - y0) + 2 * margin), self.cascade_config.CROP_MIN_SIZE) / 2
+            centre_x, centre_y = (x0 + x1) / 2, (y0 + y1) / 2
+            regions.append((max(0, int(centre_x - half_size)), max(0, int(centre_y - half_size)),
+                            min(width, int(centre_x + half_size)), min(height, int(centre_y + half_size))))
+        return regions
+
+
+    def record(self, recheck: str, crops: int = 0) -> None:
+        with self._lock:
+            self._frames += 1
+            if recheck == CASCADE_RECHECK_CROPS:
+                self._rechecked_crops += 1
+                self._crops += crops
+            elif recheck == CASCADE_RECHECK_FULL:
+                self._rechecked_full += 1
+
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            rechecked = self._rechecked_crops + self._rechecked_full
+            return {
+                "frames": self._frames,
+                "first_stage_only": self._frames - rechecked,
+                "rechecked_on_crops": self._rechecked_crops,
+                "rechecked_full_frame": self._rechecked_full,
+                "mean_crops_per_recheck": round(self._crops / self._rechecked_crops, 3) if self._rechecked_crops else 0.0,
+                "second_stage_rate": round(rechecked / self._frames, 4) if self._frames else 0.0,
+            }
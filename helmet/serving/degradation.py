@@ -0,0 +1,143 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from helmet.entity.config_entity import DegradationConfig
+from helmet.logger import logging
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.inference_backend import InferenceBackend
+
+
+class ServingTier:
+    """
+    The tier one request is served on. Resolved once per request so the response header, the
+    JSON tier field, the cache key and the forward all agree; the model is looked up on first use,
+    on the inference thread, and then stays fixed for the request.
+    """
+
+    def __init__(self, name: str, resolve_model, index: int = 0):
+        self.name = name
+        # position in DegradationConfig.TIERS, for consumers that cannot carry the name
+        self.index = index
+        self._resolve_model = resolve_model
+        self._model: InferenceBackend = None
+
+    @property
+    def model(self) -> InferenceBackend:
+        if self._model is None:
+            self._model = self._resolve_model()
+        return self._model
+
+
+class DegradationPolicy:
+    """
+    Steps the served model down through cheaper tiers under load and back up once it subsides.
+
+    Load is the request queue depth and the p95 of recent request latencies. Past either high
+    watermark the policy moves one tier down, at most once per STEP_DOWN_COOLDOWN_SECONDS; while
+    both stay under their low watermarks for STEP_UP_COOLDOWN_SECONDS it moves one tier back up.
+    The gap between the watermarks keeps it from flapping. Tier 0 is the resident model as
+    configured, later tiers are variants of it sharing its weights (see ModelRegistry.get_model_variant).
+    """
+
+    def __init__(self, model_registry: ModelRegistry, queue_depth=None, degradation_config: DegradationConfig = None):
+        """
+        :param model_registry: Registry holding the resident model
+        :param queue_depth: callable returning the number of requests waiting, the load signal besides latency
+        :param degradation_config: Tiers and watermarks
+        """
+        self.model_registry = model_registry
+        self.queue_depth = queue_depth if queue_depth is not None else (lambda: 0)
+        self.degradation_config = degradation_config if degradation_config is not None else DegradationConfig()
+        self.tiers = self.degradation_config.TIERS
+        self._tier_index = 0
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=self.degradation_config.LATENCY_WINDOW)
+        self._last_change = time.monotonic()
+        self._last_evaluation = 0.0
+        self._last_pressure = time.monotonic()
+        self._step_downs = 0
+        self._step_ups = 0
+        self._served_per_tier = {tier["name"]: 0 for tier in self.tiers}
+
+
+    @property
+    def tier_name(self) -> str:
+        return self.tiers[self._tier_index]["name"]
+
+
+    def model_for(self, tier_index: int) -> InferenceBackend:
+        if tier_index == 0:
+            return self.model_registry.get_model()
+        return self.model_registry.get_model_variant(**self.tiers[tier_index])
+
+
+    def get_model(self) -> InferenceBackend:
+        return self.model_for(self._tier_index)
+
+
+    def resolve(self) -> ServingTier:
+        """The current tier, fixed for the request it is handed to even if the policy moves on"""
+        tier_index = self._tier_index
+        return ServingTier(self.tiers[tier_index]["name"], lambda: self.model_for(tier_index), tier_index)
+
+
+    def observe(self, latency_seconds: float, tier_name: str = None) -> None:
+        """Records the latency of one finished request and re-evaluates the tier"""
+        with self._lock:
+            self._latencies_ms.append(1000 * latency_seconds)
+            if tier_name in self._served_per_tier:
+                self._served_per_tier[tier_name] += 1
+        self.evaluate()
+
+
+    def p95_latency_ms(self) -> float:
+        with self._lock:
+            return float(np.percentile(self._latencies_ms, 95)) if self._latencies_ms else 0.0
+
+
+    def evaluate(self) -> str:
+        now = time.monotonic()
+        if now - self._last_evaluation < self.degradation_config.EVALUATE_INTERVAL_SECONDS:
+            return self.tier_name
+        self._last_evaluation = now
+
+        p95_latency_ms = self.p95_latency_ms()
+        queue_depth = self.queue_depth()
+        config = self.degradation_config
+        with self._lock:
+            under_pressure = p95_latency_ms > config.P95_HIGH_MS or queue_depth >= config.QUEUE_HIGH
+            relieved = p95_latency_ms < config.P95_LOW_MS and queue_depth <= config.QUEUE_LOW
+            if not relieved:
+                self._last_pressure = now
+
+            previous = self._tier_index
+            if under_pressure and self._tier_index < len(self.tiers) - 1 \
+                    and now - self._last_change >= config.STEP_DOWN_COOLDOWN_SECONDS:
+                self._tier_index += 1
+                self._step_downs += 1
+            elif self._tier_index > 0 and now - max(self._last_change, self._last_pressure) >= config.STEP_UP_COOLDOWN_SECONDS:
+                self._tier_index -= 1
+                self._step_ups += 1
+
+            if self._tier_index != previous:
+                self._last_change = now
+                # latencies measured on the old tier say little about the new one
+                self._latencies_ms.clear()
+                logging.info(f"Serving tier {self.tiers[previous]['name']} -> {self.tier_name} "
+                             f"(p95 {p95_latency_ms:.0f} ms, queue depth {queue_depth})")
+            return self.tier_name
+
+
+    def get_stats(self) -> dict:
+        p95_latency_ms = self.p95_latency_ms()
+        with self._lock:
+            return {
+                "tier": self.tier_name,
+                "tiers": [tier["name"] for tier in self.tiers],
+                "p95_latency_ms": round(p95_latency_ms, 3),
+                "queue_depth": self.queue_depth(),
+                "step_downs": self._step_downs,
+                "step_ups": self._step_ups,
+                "served_per_tier": dict(self._served_per_tier),
+            }
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+import torch
+import torch.nn.functional as F
+from helmet.entity.config_entity import FrameGateConfig
+
+FRAME_GATE_METHOD_DIFF = 'diff'
+FRAME_GATE_METHOD_HASH = 'hash'
+
+
+class _StreamState:
+    def __init__(self, fingerprint: torch.Tensor, image_shape, context, pred: dict):
+        self.fingerprint = fingerprint
+        self.image_shape = image_shape
+        self.context = context
+        self.pred = pred
+        self.reused = 0
+        self.frames = 1
+        self.inferences = 1
+
+
+class FrameGate:
+    """
+    Skips the detector for frames of a camera stream that look the same as the last frame the
+    detector ran on, and returns that frame's detections instead.
+
+    Frames are compared on a small grayscale thumbnail, either by mean absolute difference or by
+    the share of differing bits of a difference hash. The comparison is always against the frame
+    that was last inferred, so slow changes add up and eventually trigger inference, and
+    MAX_REUSE_FRAMES bounds how long one result can be reused.
+    """
+
+    def __init__(self, frame_gate_config: FrameGateConfig = None):
+        self.frame_gate_config = frame_gate_config if frame_gate_config is not None else FrameGateConfig()
+        if self.frame_gate_config.METHOD not in (FRAME_GATE_METHOD_DIFF, FRAME_GATE_METHOD_HASH):
+            raise ValueError(f"Unknown frame gate method {self.frame_gate_config.METHOD}")
+        self._streams: "OrderedDict[str, _StreamState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._skipped = 0
+
+
+    def fingerprint(self, image_tensor) -> torch.Tensor:
+        size = self.frame_gate_config.THUMBNAIL_SIZE
+        gray = image_tensor.to(torch.float32).mean(dim=0, keepdim=True)[None]
+        if self.frame_gate_config.METHOD == FRAME_GATE_METHOD_HASH:
+            # difference hash: is each pixel brighter than its right neighbour
+            thumbnail = F.interpolate(gray, size=(size, size + 1), mode="area")[0, 0]
+            return thumbnail[:, 1:] > thumbnail[:, :-1]
+        return F.interpolate(gray, size=(size, size), mode="area")[0, 0]
+
+
+    def distance(self, fingerprint: torch.Tensor, reference: torch.Tensor) -> float:
+        if self.frame_gate_config.METHOD == FRAME_GATE_METHOD_HASH:
+            return float((fingerprint != reference).float().mean())
+        return float((fingerprint - reference).abs().mean())
+
+
+    @property
+    def threshold(self) -> float:
+        if self.frame_gate_config.METHOD == FRAME_GATE_METHOD_HASH:
+            return self.frame_gate_config.HASH_THRESHOLD
+        return self.frame_gate_config.DIFF_THRESHOLD
+
+
+    def gate(self, stream_id: str, image_tensor, compute, context=None) -> dict:
+        """
+        Returns the previous detections of stream_id when image_tensor has not changed meaningfully
+        since the detector last ran on it, otherwise runs compute() and remembers its result.
+        context holds whatever else the result depends on (mode, mask), a change forces inference.
+        """
+        fingerprint = self.fingerprint(image_tensor)
+        image_shape = tuple(image_tensor.shape)
+        with self._lock:
+            self._frames += 1
+            state = self._streams.get(stream_id)
+            if state is not None:
+                self._streams.move_to_end(stream_id)
+                state.frames += 1
+                if state.context == context and state.image_shape == image_shape \
+                        and state.reused < self.frame_gate_config.MAX_REUSE_FRAMES \
+                        and self.distance(fingerprint, state.fingerprint) <= self.threshold:
+                    state.reused += 1
+                    self._skipped += 1
+                    return state.pred
+
+        pred = compute()
+
+        with self._lock:
+            state = self._streams.get(stream_id)
+            if state is None:
+                self._streams[stream_id] = _StreamState(fingerprint, image_shape, context, pred)
+                while len(self._streams) > self.frame_gate_config.MAX_STREAMS:
+                    self._streams.popitem(last=False)
+            else:
+                state.fingerprint, state.image_shape, state.context, state.pred = fingerprint, image_shape, context, pred
+                state.reused = 0
+                state.inferences += 1
+        return pred
+
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "method": self.frame_gate_config.METHOD,
+                "threshold": self.threshold,
+                "frames": self._frames,
+                "skipped": self._skipped,
+                "inference_saved_fraction": round(self._skipped / self._frames, 4) if self._frames else 0.0,
+                "streams": {
+                    stream_id: {"frames": state.frames, "inferences": state.inferences,
+                                "skipped": state.frames - state.inferences}
+                    for stream_id, state in self._streams.items()
+                },
+            }
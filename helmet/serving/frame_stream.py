@@ -0,0 +1,76 @@
+import asyncio
+from collections import deque
+
+
+class FrameSlot:
+    """
+    Bounded buffer of the newest frames of one streaming connection.
+
+    The receiver never waits on inference: when the buffer is full the oldest pending frame is
+    dropped, so a client sending faster than the model always gets its most recent frame processed
+    next instead of an ever growing backlog.
+    """
+
+    def __init__(self, max_pending: int = 1):
+        self._frames = deque(maxlen=max(1, max_pending))
+        self._available = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+
+    def put(self, frame) -> None:
+        if len(self._frames) == self._frames.maxlen:
+            self.dropped += 1
+        self._frames.append(frame)
+        self.received += 1
+        self._available.set()
+
+
+    def close(self) -> None:
+        self._closed = True
+        self._available.set()
+
+
+    async def get(self):
+        """Next pending frame, oldest first, or None once the connection closed"""
+        while not self._frames:
+            if self._closed:
+                return None
+            self._available.clear()
+            await self._available.wait()
+        return self._frames.popleft()
+
+
+class FrameStreamStats:
+    """Counters across all streaming connections, only touched from the event loop"""
+
+    def __init__(self):
+        self.active_connections = 0
+        self.total_connections = 0
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.errors = 0
+
+
+    def connection_opened(self) -> None:
+        self.active_connections += 1
+        self.total_connections += 1
+
+
+    def connection_closed(self, frame_slot: FrameSlot) -> None:
+        self.active_connections -= 1
+        self.frames_received += frame_slot.received
+        self.frames_dropped += frame_slot.dropped
+
+
+    def get_stats(self) -> dict:
+        return {
+            "active_connections": self.active_connections,
+            "total_connections": self.total_connections,
+            "frames_received": self.frames_received,
+            "frames_processed": self.frames_processed,
+            "frames_dropped": self.frames_dropped,
+            "errors": self.errors,
+        }
@@ -0,0 +1,160 @@
+import os
+import copy
+from typing import Dict, List
+import torch
+from helmet.logger import logging
+from helmet.constants import QUANTIZATION_ENGINE
+from helmet.ml.models.model_configuration import set_model_input_size, set_model_proposal_budget, set_model_postprocess, \
+    make_model_variant
+
+
+class InferenceBackend:
+    """
+    Runs the detector for serving.
+
+    A backend is called like the torchvision model, with a list of CHW float images,
+    and returns one {"boxes", "labels", "scores"} dict per image.
+    """
+    name: str = None
+
+    def __init__(self, device):
+        self.device = device
+        self.weights_memory_mb = 0.0
+        # score threshold the model applies itself, None when callers still have to filter
+        self.score_threshold: float = None
+
+    def load(self, model_path: str) -> None:
+        raise NotImplementedError
+
+    def configure(self, input_size: int = None, max_size: int = None, score_threshold: float = None,
+                  box_nms_thresh: float = None, rpn_nms_thresh: float = None, **proposal_budget) -> None:
+        """Applies serving settings to the loaded model, exported graphs keep what they were exported with"""
+        logging.warning(f"The {self.name} backend keeps the settings it was exported with, "
+                        f"ignoring input_size={input_size}, max_size={max_size}, score_threshold={score_threshold}, "
+                        f"box_nms_thresh={box_nms_thresh}, rpn_nms_thresh={rpn_nms_thresh}, {proposal_budget}")
+
+    def variant(self, input_size: int = None, max_size: int = None, **proposal_budget) -> "InferenceBackend":
+        """A backend sharing this one's weights with other serving settings, exported graphs cannot vary"""
+        logging.warning(f"The {self.name} backend has no variants, serving it unchanged")
+        return self
+
+    def __call__(self, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        raise NotImplementedError
+
+    @staticmethod
+    def tensors_memory_mb(tensors) -> float:
+        return sum(t.numel() * t.element_size() for t in tensors) / (1024 * 1024)
+
+
+class TorchBackend(InferenceBackend):
+    """Eager torchvision model pickled by ModelTrainer"""
+    name = 'torch'
+
+    def load(self, model_path: str) -> None:
+        self.model = torch.load(model_path, map_location=self.device)
+        self.model.to(self.device)
+        self.model.eval()
+        for param in self.model.parameters():
+            param.requires_grad_(False)
+        self.weights_memory_mb = self.tensors_memory_mb(list(self.model.parameters()) + list(self.model.buffers()))
+
+    def configure(self, input_size: int = None, max_size: int = None, score_threshold: float = None,
+                  box_nms_thresh: float = None, rpn_nms_thresh: float = None, **proposal_budget) -> None:
+        if input_size is not None:
+            set_model_input_size(self.model, input_size, max_size)
+        set_model_proposal_budget(self.model, **proposal_budget)
+        set_model_postprocess(self.model, box_score_thresh=score_threshold, box_nms_thresh=box_nms_thresh,
+                              rpn_nms_thresh=rpn_nms_thresh)
+        if score_threshold is not None:
+            self.score_threshold = score_threshold
+
+    def variant(self, input_size: int = None, max_size: int = None, **proposal_budget) -> "TorchBackend":
+        backend = copy.copy(self)
+        backend.model = make_model_variant(self.model)
+        backend.configure(input_size, max_size, **proposal_budget)
+        return backend
+
+    def __call__(self, images):
+        return self.model([image.to(self.device) for image in images])
+
+
+class TorchScriptBackend(InferenceBackend):
+    """TorchScript model exported by ModelExporter, frozen and graph optimised at load time"""
+    name = 'torchscript'
+
+    def load(self, model_path: str) -> None:
+        model = torch.jit.load(model_path, map_location=self.device)
+        model.eval()
+        # frozen modules inline their weights as constants, so measure before freezing
+        self.weights_memory_mb = self.tensors_memory_mb(list(model.parameters()) + list(model.buffers()))
+        try:
+            model = torch.jit.optimize_for_inference(torch.jit.freeze(model))
+        except Exception as e:
+            # freezing is an optimisation, the scripted module still runs without it
+            logging.warning(f"Could not freeze the TorchScript model, serving it unfrozen: {e}")
+        self.model = model
+
+    def __call__(self, images):
+        # a scripted detection model always returns a (losses, detections) tuple
+        _, detections = self.model(images)
+        return detections
+
+
+class QuantizedTorchBackend(TorchScriptBackend):
+    """
+    int8 model built by ModelQuantization, int8 kernels only run on the cpu. The model is saved
+    scripted because a pickled FX quantized backbone cannot be unpickled in another process.
+    """
+    name = 'quantized'
+
+    def __init__(self, device):
+        super().__init__(torch.device("cpu"))
+        if torch.device(device).type != 'cpu':
+            logging.warning(f"The quantized backend runs on the cpu, ignoring device {device}")
+
+    def load(self, model_path: str) -> None:
+        torch.backends.quantized.engine = QUANTIZATION_ENGINE
+        super().load(model_path)
+        # packed int8 weights are not listed in parameters() or buffers()
+        self.weights_memory_mb = os.path.getsize(model_path) / (1024 * 1024)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    ONNX model exported by ModelExporter, run with onnxruntime and all graph optimisations.
+
+    The exported graph takes one image of any size, so a batch is run image by image.
+    """
+    name = 'onnxruntime'
+
+    def load(self, model_path: str) -> None:
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # follow the intra-op thread budget the inference executor gave torch
+        session_options.intra_op_num_threads = torch.get_num_threads()
+        providers = ['CPUExecutionProvider']
+        if torch.device(self.device).type == 'cuda' and 'CUDAExecutionProvider' in ort.get_available_providers():
+            providers.insert(0, 'CUDAExecutionProvider')
+
+        self.session = ort.InferenceSession(model_path, sess_options=session_options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        self.weights_memory_mb = os.path.getsize(model_path) / (1024 * 1024)
+
+    def __call__(self, images):
+        detections = []
+        for image in images:
+            outputs = self.session.run(None, {self.input_name: image.detach().cpu().numpy()})
+            detections.append({name: torch.from_numpy(output) for name, output in zip(self.output_names, outputs)})
+        return detections
+
+
+INFERENCE_BACKENDS = {backend.name: backend for backend in [TorchBackend, QuantizedTorchBackend, TorchScriptBackend, OnnxRuntimeBackend]}
+
+
+def get_inference_backend(name: str, device) -> InferenceBackend:
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {name}, expected one of {list(INFERENCE_BACKENDS)}")
+    return INFERENCE_BACKENDS[name](device)
@@ -0,0 +1,97 @@
+import os
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import torch
+from helmet.entity.config_entity import InferenceExecutorConfig
+from helmet.logger import logging
+
+
+def available_cpus() -> int:
+    """Number of cores this process may run on, honours taskset/cgroup affinity"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for the blocking parts of a request (decode, inference, encode).
+
+    The event loop hands work over with `await executor.run(...)` and keeps accepting
+    connections meanwhile. Torch releases the GIL inside its kernels, so threads are enough.
+    The torch intra-op thread count is derived from the cores available and the number of
+    forwards that can run at the same time, so concurrent requests do not oversubscribe cores.
+    """
+
+    def __init__(self, inference_executor_config: InferenceExecutorConfig = None, concurrent_forwards: int = None):
+        """
+        :param inference_executor_config: Configuration for the executor
+        :param concurrent_forwards: Forwards that may run at the same time, one when a batch scheduler
+                                    serialises them, MAX_WORKERS otherwise
+        """
+        self.inference_executor_config = inference_executor_config if inference_executor_config is not None else InferenceExecutorConfig()
+        self.concurrent_forwards = concurrent_forwards if concurrent_forwards is not None else self.inference_executor_config.MAX_WORKERS
+        self._executor: ThreadPoolExecutor = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._pending = 0
+        self._completed = 0
+
+
+    def torch_num_threads(self) -> int:
+        if self.inference_executor_config.TORCH_NUM_THREADS is not None:
+            return self.inference_executor_config.TORCH_NUM_THREADS
+        return max(1, available_cpus() // max(1, self.concurrent_forwards))
+
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        num_threads = self.torch_num_threads()
+        torch.set_num_threads(num_threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.inference_executor_config.MAX_WORKERS,
+                                            thread_name_prefix="inference")
+        logging.info(f"Started inference executor with {self.inference_executor_config.MAX_WORKERS} workers "
+                     f"and {num_threads} torch threads on {available_cpus()} cpus")
+
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+    def _call(self, func, *args, **kwargs):
+        with self._lock:
+            self._pending -= 1
+            self._active += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+
+    async def run(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) on the pool and awaits its result without blocking the loop"""
+        self.start()
+        with self._lock:
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, func, *args, **kwargs))
+
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.inference_executor_config.MAX_WORKERS,
+                "torch_num_threads": torch.get_num_threads(),
+                "available_cpus": available_cpus(),
+                "active": self._active,
+                "pending": self._pending,
+                "completed": self._completed,
+            }
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import datetime
+from dataclasses import dataclass, field
+import torch
+from helmet.configuration.s3_operations import S3Operation
+from helmet.entity.config_entity import ModelRegistryConfig
+from helmet.exception import HelmetException
+from helmet.logger import logging
+from helmet.utils.main_utils import get_process_memory_mb
+from helmet.serving.inference_backend import InferenceBackend, get_inference_backend
+
+
+@dataclass
+class ResidentModel:
+    model: InferenceBackend
+    model_path: str
+    version: str
+    loaded_at: str
+    load_time_seconds: float
+    weights_memory_mb: float
+    process_memory_mb: float
+    # serving variants sharing this model's weights, built on first use
+    variants: dict = field(default_factory=dict)
+
+
+class ModelRegistry:
+    """
+    Process wide holder of the serving model.
+
+    The model is downloaded and deserialized once, kept in eval mode and shared by every
+    request. Like S3Operation, the resident model lives on the class so that all
+    ModelRegistry instances in the process hand out the same handle.
+    """
+    _resident_model: ResidentModel = None
+    _lock = threading.Lock()
+
+    def __init__(self, model_registry_config: ModelRegistryConfig = None):
+        self.model_registry_config = model_registry_config if model_registry_config is not None else ModelRegistryConfig()
+
+
+    def get_model_version_from_s3(self) -> str:
+        """ETag or version id of the model object currently in the bucket"""
+        return S3Operation().get_object_version(self.model_registry_config.S3_MODEL_KEY_PATH,
+                                                self.model_registry_config.BUCKET_NAME)
+
+
+    def get_model_from_s3(self, model_path: str = None) -> str:
+        """
+        Method Name :   get_model_from_s3
+        Description :   This method downloads the served model from the s3 bucket.
+
+        Output      :   Local path of the downloaded model
+        """
+        logging.info("Entered the get_model_from_s3 method of ModelRegistry class")
+        try:
+            os.makedirs(self.model_registry_config.PREDICT_MODEL_DIR, exist_ok=True)
+            s3 = S3Operation()
+            best_model_path = s3.read_data_from_s3(self.model_registry_config.S3_MODEL_KEY_PATH,
+                                                   self.model_registry_config.BUCKET_NAME,
+                                                   model_path or self.model_registry_config.PREDICT_MODEL_PATH)
+            logging.info("Exited the get_model_from_s3 method of ModelRegistry class")
+            return best_model_path
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def warmup(self, model) -> None:
+        """Runs one dummy forward so lazy initialisation does not land on the first request"""
+        size = self.model_registry_config.WARMUP_INPUT_SIZE
+        with torch.inference_mode():
+            model([torch.zeros(3, size, size, device=self.model_registry_config.DEVICE)])
+
+
+    def load_model(self, model_path: str, version: str = None) -> ResidentModel:
+        """
+        Method Name :   load_model
+        Description :   This method loads the model with the configured inference backend on the
+                        serving device, in eval mode.
+
+        Output      :   ResidentModel with load time and memory footprint
+        """
+        logging.info("Entered the load_model method of ModelRegistry class")
+        try:
+            memory_before = get_process_memory_mb()
+            start_time = time.perf_counter()
+
+            model = get_inference_backend(self.model_registry_config.INFERENCE_BACKEND, self.model_registry_config.DEVICE)
+            model.load(model_path)
+            config = self.model_registry_config
+            model.configure(input_size=config.SERVING_INPUT_SIZE, max_size=config.SERVING_MAX_SIZE,
+                            score_threshold=config.SCORE_THRESHOLD, box_nms_thresh=config.BOX_NMS_THRESH,
+                            rpn_nms_thresh=config.RPN_NMS_THRESH, rpn_pre_nms_top_n=config.RPN_PRE_NMS_TOP_N,
+                            rpn_post_nms_top_n=config.RPN_POST_NMS_TOP_N,
+                            box_detections_per_img=config.BOX_DETECTIONS_PER_IMG)
+
+            if self.model_registry_config.WARMUP:
+                self.warmup(model)
+
+            resident_model = ResidentModel(
+                model=model,
+                model_path=model_path,
+                version=version,
+                loaded_at=datetime.now().isoformat(timespec="seconds"),
+                load_time_seconds=time.perf_counter() - start_time,
+                weights_memory_mb=model.weights_memory_mb,
+                process_memory_mb=get_process_memory_mb() - memory_before,
+            )
+            logging.info(f"Loaded model {model_path} in {resident_model.load_time_seconds:.3f}s, "
+                         f"weights {resident_model.weights_memory_mb:.1f} MB, "
+                         f"process memory +{resident_model.process_memory_mb:.1f} MB")
+            logging.info("Exited the load_model method of ModelRegistry class")
+            return resident_model
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def initialize(self) -> ResidentModel:
+        """Loads the model from s3 if no model is resident yet, returns the resident model"""
+        if ModelRegistry._resident_model is not None:
+            return ModelRegistry._resident_model
+
+        with ModelRegistry._lock:
+            # another thread may have finished loading while we waited for the lock
+            if ModelRegistry._resident_model is None:
+                # read the version before downloading, if the object changes in between the
+                # watcher sees a different version on its next check and reloads again
+                version = self.get_model_version_from_s3()
+                model_path = self.get_model_from_s3()
+                ModelRegistry._resident_model = self.load_model(model_path, version)
+        return ModelRegistry._resident_model
+
+
+    def swap(self, resident_model: ResidentModel) -> ResidentModel:
+        """
+        Atomically replaces the resident model, returns the previous one.
+
+        Readers fetch the model once per forward, so in-flight requests finish on the model they
+        already hold and the old weights are freed when the last of them drops its reference.
+        """
+        with ModelRegistry._lock:
+            previous = ModelRegistry._resident_model
+            ModelRegistry._resident_model = resident_model
+        logging.info(f"Serving model version {resident_model.version}")
+        return previous
+
+
+    def reload_if_changed(self) -> bool:
+        """
+        Method Name :   reload_if_changed
+        Description :   This method checks the model object version in s3 and, when it changed,
+                        downloads the new model to a temporary file, loads and warms it and swaps
+                        it into the resident slot.
+
+        Output      :   True when a new model was swapped in
+        """
+        logging.info("Entered the reload_if_changed method of ModelRegistry class")
+        try:
+            version = self.get_model_version_from_s3()
+            resident_model = ModelRegistry._resident_model
+            if resident_model is not None and resident_model.version == version:
+                return False
+
+            os.makedirs(self.model_registry_config.PREDICT_MODEL_DIR, exist_ok=True)
+            fd, model_path = tempfile.mkstemp(suffix=os.path.splitext(self.model_registry_config.MODEL_NAME)[1], dir=self.model_registry_config.PREDICT_MODEL_DIR)
+            os.close(fd)
+            try:
+                self.get_model_from_s3(model_path)
+                new_model = self.load_model(model_path, version)
+            except Exception:
+                os.remove(model_path)
+                raise
+
+            # the new model is moved into place only after it loaded and warmed up fine
+            os.replace(model_path, self.model_registry_config.PREDICT_MODEL_PATH)
+            new_model.model_path = self.model_registry_config.PREDICT_MODEL_PATH
+            self.swap(new_model)
+
+            logging.info("Exited the reload_if_changed method of ModelRegistry class")
+            return True
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def get_resident_model(self) -> ResidentModel:
+        return self.initialize()
+
+
+    def get_model(self) -> InferenceBackend:
+        return self.get_resident_model().model
+
+
+    def get_model_variant(self, name: str, input_size: int = None, max_size: int = None, **proposal_budget) -> InferenceBackend:
+        """
+        The resident model with other serving settings under name, built once per resident model.
+        Variants share the resident model's weights, a swapped in model starts without variants.
+        """
+        resident_model = self.get_resident_model()
+        model = resident_model.variants.get(name)
+        if model is None:
+            with ModelRegistry._lock:
+                model = resident_model.variants.get(name)
+                if model is None:
+                    model = resident_model.model.variant(input_size=input_size, max_size=max_size, **proposal_budget)
+                    resident_model.variants[name] = model
+                    logging.info(f"Built model variant {name}: input_size={input_size}, max_size={max_size}, {proposal_budget}")
+        return model
+
+
+    def get_model_version(self) -> str:
+        resident_model = ModelRegistry._resident_model
+        return resident_model.version if resident_model is not None else None
+
+
+    def is_loaded(self) -> bool:
+        return ModelRegistry._resident_model is not None
+
+
+    def get_model_info(self) -> dict:
+        resident_model = ModelRegistry._resident_model
+        if resident_model is None:
+            return {"loaded": False}
+
+        return {
+            "loaded": True,
+            "model_path": resident_model.model_path,
+            "version": resident_model.version,
+            "loaded_at": resident_model.loaded_at,
+            "load_time_seconds": round(resident_model.load_time_seconds, 3),
+            "weights_memory_mb": round(resident_model.weights_memory_mb, 2),
+            "process_memory_mb": round(resident_model.process_memory_mb, 2),
+            "backend": resident_model.model.name,
+            "device": str(self.model_registry_config.DEVICE),
+        }
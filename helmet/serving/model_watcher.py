@@ -0,0 +1,75 @@
+import time
+import threading
+from datetime import datetime
+from helmet.entity.config_entity import ModelRegistryConfig
+from helmet.logger import logging
+from helmet.serving.model_registry import ModelRegistry
+
+
+class ModelWatcher:
+    """
+    Background thread that polls the model object in s3 and hot swaps the resident model
+    whenever ModelPusher uploads a new version.
+    """
+
+    def __init__(self, model_registry: ModelRegistry, model_registry_config: ModelRegistryConfig = None):
+        self.model_registry = model_registry
+        self.model_registry_config = model_registry_config if model_registry_config is not None else model_registry.model_registry_config
+        self._stop_event = threading.Event()
+        self._worker: threading.Thread = None
+        self._checks = 0
+        self._reloads = 0
+        self._failures = 0
+        self._last_check: str = None
+        self._last_error: str = None
+
+
+    def start(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._worker.start()
+        logging.info(f"Started the model watcher, checking every {self.model_registry_config.WATCHER_INTERVAL_SECONDS}s")
+
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+
+    def check(self) -> bool:
+        self._checks += 1
+        self._last_check = datetime.now().isoformat(timespec="seconds")
+        try:
+            reloaded = self.model_registry.reload_if_changed()
+            if reloaded:
+                self._reloads += 1
+            self._last_error = None
+            return reloaded
+        except Exception as e:
+            # keep serving the current model and try again on the next interval
+            self._failures += 1
+            self._last_error = str(e)
+            logging.error(f"Model reload check failed: {e}")
+            return False
+
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.model_registry_config.WATCHER_INTERVAL_SECONDS):
+            start_time = time.perf_counter()
+            if self.check():
+                logging.info(f"Hot reloaded the model in {time.perf_counter() - start_time:.3f}s")
+
+
+    def get_stats(self) -> dict:
+        return {
+            "interval_seconds": self.model_registry_config.WATCHER_INTERVAL_SECONDS,
+            "checks": self._checks,
+            "reloads": self._reloads,
+            "failures": self._failures,
+            "last_check": self._last_check,
+            "last_error": self._last_error,
+        }
@@ -0,0 +1,216 @@
+import gc
+import os
+import sys
+import time
+import signal
+import socket
+from typing import Dict, List
+import torch
+import uvicorn
+from helmet.entity.config_entity import PreforkServerConfig
+from helmet.exception import HelmetException
+from helmet.logger import logging
+from helmet.serving.inference_executor import available_cpus
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.model_watcher import ModelWatcher
+
+
+def split_cpus(cpus: List[int], workers: int) -> List[List[int]]:
+    """Disjoint contiguous CPU sets, one per worker, as equal in size as possible"""
+    workers = max(1, min(workers, len(cpus)))
+    size, remainder = divmod(len(cpus), workers)
+    cpu_sets, start = [], 0
+    for index in range(workers):
+        end = start + size + (1 if index < remainder else 0)
+        cpu_sets.append(cpus[start:end])
+        start = end
+    return cpu_sets
+
+
+class PreforkServer:
+    """
+    Serves the app from N forked worker processes that share one copy of the model weights.
+
+    The parent binds the listening socket and loads the model once, then freezes the garbage
+    collector so collections in the workers do not write to, and so copy, the pages holding the
+    model's objects. Each forked worker is pinned to its own disjoint CPU set; the
+    InferenceExecutor derives the torch intra-op thread count from that affinity, so workers never
+    compete for cores. Weight tensors are only ever read, so their pages stay shared copy-on-write
+    and resident memory grows by each worker's activations, not by another copy of the model.
+
+    Components that must exist once per server rather than once per worker are kept out of the
+    workers: the parent runs the model watcher and, when a new model was loaded, re-forks the workers
+    one at a time so they share the new weights too; only worker 0 runs the shared memory ingestion.
+    """
+
+    # set in a worker process, reported by /stats
+    worker_info: Dict = None
+
+    def __init__(self, app, model_registry: ModelRegistry, prefork_server_config: PreforkServerConfig = None,
+                 model_watcher: ModelWatcher = None):
+        self.app = app
+        self.model_registry = model_registry
+        self.model_watcher = model_watcher
+        self.prefork_server_config = prefork_server_config if prefork_server_config is not None else PreforkServerConfig()
+        self._socket: socket.socket = None
+        self._workers: Dict[int, tuple] = {}
+        self._stopping = False
+
+
+    @staticmethod
+    def is_worker() -> bool:
+        return PreforkServer.worker_info is not None
+
+
+    @staticmethod
+    def is_primary() -> bool:
+        """True in a single process server and in worker 0, the process that owns once per server components"""
+        return PreforkServer.worker_info is None or PreforkServer.worker_info["index"] == 0
+
+
+    def bind(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.prefork_server_config.HOST, self.prefork_server_config.PORT))
+        sock.set_inheritable(True)
+        return sock
+
+
+    def _without_warmup(self, load):
+        """Runs load() with warmup off, the workers warm up after fork"""
+        warmup = self.model_registry.model_registry_config.WARMUP
+        self.model_registry.model_registry_config.WARMUP = False
+        try:
+            return load()
+        finally:
+            self.model_registry.model_registry_config.WARMUP = warmup
+
+
+    def load_shared_model(self) -> None:
+        """Loads the model in the parent, without warmup, so workers inherit it instead of loading their own"""
+        # no intra-op thread pool may exist before fork, the workers set their own thread count
+        torch.set_num_threads(1)
+        self._without_warmup(self.model_registry.initialize)
+        gc.collect()
+        # everything allocated so far moves to the permanent generation, the collector no longer scans it
+        gc.freeze()
+
+
+    def reload_workers(self) -> None:
+        """Replaces the workers one at a time so they fork from the parent's newly loaded model"""
+        gc.collect()
+        gc.freeze()
+        for pid, (index, cpu_set) in list(self._workers.items()):
+            if self._stopping:
+                return
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            # uvicorn finishes the worker's in flight requests before it exits
+            os.waitpid(pid, 0)
+            self._workers.pop(pid, None)
+            if not self._stopping:
+                self._start_worker(index, cpu_set)
+        logging.info(f"Restarted {len(self._workers)} workers on model version {self.model_registry.get_model_version()}")
+
+
+    def check_model(self) -> None:
+        """Runs the model watcher's check in the parent, the workers never load a model themselves"""
+        if self._without_warmup(self.model_watcher.check):
+            self.reload_workers()
+
+
+    def _run_worker(self, index: int, cpus: List[int]) -> None:
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+        if self.prefork_server_config.PIN_CPUS:
+            os.sched_setaffinity(0, cpus)
+        torch.set_num_threads(available_cpus())
+        PreforkServer.worker_info = {"index": index, "pid": os.getpid(), "cpus": cpus}
+
+        if self.model_registry.model_registry_config.WARMUP:
+            # warmup only allocates activations, the shared weights are read, not copied
+            self.model_registry.warmup(self.model_registry.get_model())
+        logging.info(f"Worker {index} (pid {os.getpid()}) serving on cpus {cpus} with {torch.get_num_threads()} torch threads")
+
+        server = uvicorn.Server(uvicorn.Config(self.app, lifespan="on"))
+        server.run(sockets=[self._socket])
+
+
+    def _start_worker(self, index: int, cpus: List[int]) -> int:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(index, cpus)
+            except BaseException as e:
+                logging.error(f"Worker {index} failed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self._workers[pid] = (index, cpus)
+        return pid
+
+
+    def _stop_workers(self, signum, frame) -> None:
+        self._stopping = True
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+    def run(self) -> None:
+        """
+        Method Name :   run
+        Description :   This method binds the socket, loads the shared model, forks the workers and
+                        supervises them, restarting a worker that dies until SIGINT or SIGTERM.
+
+        Output      :   Returns once every worker exited
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the run method of PreforkServer class")
+        try:
+            self._socket = self.bind()
+            self.load_shared_model()
+
+            cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+            cpu_sets = split_cpus(cpus, self.prefork_server_config.WORKERS)
+            if len(cpu_sets) < self.prefork_server_config.WORKERS:
+                logging.warning(f"Only {len(cpus)} cpus available, starting {len(cpu_sets)} workers")
+
+            signal.signal(signal.SIGINT, self._stop_workers)
+            signal.signal(signal.SIGTERM, self._stop_workers)
+            for index, cpu_set in enumerate(cpu_sets):
+                self._start_worker(index, cpu_set)
+
+            # the parent stays single threaded, so the watcher is polled here rather than on its own thread
+            next_check = time.monotonic() + (self.model_watcher.model_registry_config.WATCHER_INTERVAL_SECONDS
+                                             if self.model_watcher is not None else 0)
+            while self._workers:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                except InterruptedError:
+                    continue
+                if pid == 0:
+                    if self.model_watcher is not None and not self._stopping and time.monotonic() >= next_check:
+                        self.check_model()
+                        next_check = time.monotonic() + self.model_watcher.model_registry_config.WATCHER_INTERVAL_SECONDS
+                    time.sleep(0.5)
+                    continue
+                index, cpu_set = self._workers.pop(pid, (None, None))
+                if index is None or self._stopping:
+                    continue
+                logging.error(f"Worker {index} (pid {pid}) exited with status {status}, restarting it")
+                time.sleep(1)
+                self._start_worker(index, cpu_set)
+
+            self._socket.close()
+            logging.info("Exited the run method of PreforkServer class")
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
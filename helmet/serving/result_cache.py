@@ -0,0 +1,140 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from helmet.entity.config_entity import ResultCacheConfig
+from helmet.serving.admission_control import AdmissionRejected
+from helmet.serving.stream_scheduler import StaleFrameError
+
+# failures that belong to the request that ran the computation rather than to the key: its own
+# deadline ran out or a newer frame of its stream superseded it
+_REQUEST_FAILURES = (AdmissionRejected, StaleFrameError)
+
+
+def is_request_failure(error: BaseException) -> bool:
+    """True when error, or an exception it was raised from, is one of _REQUEST_FAILURES"""
+    while error is not None:
+        if isinstance(error, _REQUEST_FAILURES):
+            return True
+        error = error.__cause__
+    return False
+
+
+class ResultCache:
+    """
+    LRU cache of prediction results keyed by a hash of the image bytes and the model version.
+
+    Entries expire after TTL_SECONDS and the least recently used one is evicted past MAX_ENTRIES.
+    Concurrent requests for a key that is being computed wait for that computation instead of
+    running their own inference. When it fails for reasons of its own request, e.g. an expired
+    deadline, the waiters do not inherit the failure, one of them computes the key again.
+    """
+
+    def __init__(self, result_cache_config: ResultCacheConfig = None):
+        self.result_cache_config = result_cache_config if result_cache_config is not None else ResultCacheConfig()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._retried = 0
+
+
+    @staticmethod
+    def make_key(image_bytes: bytes, model_version, *parts) -> str:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return ":".join([digest, str(model_version)] + [str(part) for part in parts])
+
+
+    def _lookup(self, key: str):
+        """Returns (hit, value), must be called with the lock held"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+
+    def _store(self, key: str, value) -> None:
+        """Must be called with the lock held"""
+        self._entries[key] = (value, time.monotonic() + self.result_cache_config.TTL_SECONDS)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.result_cache_config.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+    def get_or_compute(self, key: str, compute):
+        """Returns the cached value for key, or runs compute() once for all concurrent callers"""
+        while True:
+            with self._lock:
+                hit, value = self._lookup(key)
+                if hit:
+                    self._hits += 1
+                    return value
+                future = self._in_flight.get(key)
+                is_owner = future is None
+                if is_owner:
+                    future = Future()
+                    self._in_flight[key] = future
+                    self._misses += 1
+                else:
+                    self._coalesced += 1
+
+            if is_owner:
+                break
+            try:
+                return future.result()
+            except BaseException as e:
+                if not is_request_failure(e):
+                    raise
+                # the owner ran out of time or was superseded, this request may still have time
+                with self._lock:
+                    self._retried += 1
+
+        try:
+            value = compute()
+        except BaseException as e:
+            # failures are not cached, waiting duplicates get the same error unless it was the owner's own
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, value)
+            self._in_flight.pop(key, None)
+        future.set_result(value)
+        return value
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.result_cache_config.MAX_ENTRIES,
+                "ttl_seconds": self.result_cache_config.TTL_SECONDS,
+                "in_flight": len(self._in_flight),
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "retried_after_owner_failure": self._retried,
+                "hit_rate": round((self._hits + self._coalesced) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,132 @@
+import time
+import threading
+from collections import deque
+from typing import Dict
+import numpy as np
+import torch
+from helmet.entity.config_entity import SharedMemoryIngestConfig
+from helmet.logger import logging
+from helmet.serving.result_cache import is_request_failure
+from helmet.serving.shared_memory_ring import SharedFrameRing, SharedResultRing, frame_ring_name, result_ring_name, \
+    RESULT_STATUS_OK, RESULT_STATUS_ERROR, RESULT_STATUS_DROPPED
+
+
+class _IngestStream:
+    def __init__(self, name: str, frame_ring: SharedFrameRing, result_ring: SharedResultRing, prediction_pipeline):
+        self.name = name
+        self.frame_ring = frame_ring
+        self.result_ring = result_ring
+        self.prediction_pipeline = prediction_pipeline
+        self.worker: threading.Thread = None
+        self.frames = 0
+        self.results_dropped = 0
+        self.frames_dropped = 0
+        self.errors = 0
+        self.latencies_ms = deque(maxlen=256)
+
+
+class SharedMemoryIngest:
+    """
+    Zero copy ingestion for frame grabbers running on the same host.
+
+    For every configured stream the server creates a SharedFrameRing the grabber writes raw RGB
+    frames into and a SharedResultRing it reads detections back from. One worker thread per stream
+    reads each frame straight out of shared memory, the only copy is the uint8 to float conversion
+    the model needs anyway, so frames skip JPEG encoding, HTTP and image_loader entirely.
+    """
+
+    def __init__(self, prediction_pipeline_factory, shared_memory_ingest_config: SharedMemoryIngestConfig = None):
+        """
+        :param prediction_pipeline_factory: callable(stream_name) returning the PredictionPipeline of a stream
+        :param shared_memory_ingest_config: Configuration for the rings
+        """
+        self.prediction_pipeline_factory = prediction_pipeline_factory
+        self.shared_memory_ingest_config = shared_memory_ingest_config if shared_memory_ingest_config is not None else SharedMemoryIngestConfig()
+        self._streams: Dict[str, _IngestStream] = {}
+        self._stop_event = threading.Event()
+
+
+    def start(self) -> None:
+        if self._streams:
+            return
+        self._stop_event.clear()
+        config = self.shared_memory_ingest_config
+        for name in config.STREAMS:
+            frame_ring = SharedFrameRing(frame_ring_name(name), create=True, slot_count=config.SLOT_COUNT,
+                                         max_height=config.MAX_FRAME_HEIGHT, max_width=config.MAX_FRAME_WIDTH)
+            result_ring = SharedResultRing(result_ring_name(name), create=True, slot_count=config.SLOT_COUNT,
+                                           max_detections=config.MAX_DETECTIONS)
+            stream = _IngestStream(name, frame_ring, result_ring, self.prediction_pipeline_factory(name))
+            stream.worker = threading.Thread(target=self._run, args=(stream,), name=f"shm-ingest-{name}", daemon=True)
+            self._streams[name] = stream
+            stream.worker.start()
+            logging.info(f"Started shared memory ingestion for stream {name} on {frame_ring.name} / {result_ring.name}")
+
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for stream in self._streams.values():
+            stream.worker.join()
+            stream.frame_ring.close()
+            stream.result_ring.close()
+        self._streams = {}
+
+
+    def process_frame(self, stream: _IngestStream) -> bool:
+        """Runs the detector on the oldest unread frame of the stream, False when there is none"""
+        frame = stream.frame_ring.read()
+        if frame is None:
+            return False
+        sequence, captured_at_ns, pixels = frame
+        start_time = time.perf_counter_ns()
+        try:
+            # reads the pixels in place, the slot goes back to the grabber once the float copy exists
+            image_tensor = torch.from_numpy(pixels).permute(2, 0, 1).to(torch.float32).div_(255)
+        finally:
+            stream.frame_ring.release()
+
+        pred, status = None, RESULT_STATUS_OK
+        try:
+            stream.prediction_pipeline.pin_serving_tier()
+            pred = stream.prediction_pipeline.gated_infer(image_tensor, camera_id=stream.name)
+        except Exception as e:
+            # the grabber still gets a slot for the frame, otherwise it waits for a result that never comes
+            if is_request_failure(e):
+                status = RESULT_STATUS_DROPPED
+                stream.frames_dropped += 1
+            else:
+                status = RESULT_STATUS_ERROR
+                stream.errors += 1
+                logging.error(f"Shared memory ingestion of stream {stream.name} failed on frame {sequence}: {e}")
+        tier = stream.prediction_pipeline.tier_index
+        if not stream.result_ring.write(sequence, pred, inference_ns=time.perf_counter_ns() - start_time,
+                                        tier=tier if tier is not None else -1, status=status):
+            stream.results_dropped += 1
+        stream.frames += 1
+        stream.latencies_ms.append((time.time_ns() - captured_at_ns) / 1e6)
+        return True
+
+
+    def _run(self, stream: _IngestStream) -> None:
+        poll_interval = self.shared_memory_ingest_config.POLL_INTERVAL_SECONDS
+        while not self._stop_event.is_set():
+            try:
+                if not self.process_frame(stream):
+                    time.sleep(poll_interval)
+            except Exception as e:
+                stream.errors += 1
+                logging.error(f"Shared memory ingestion of stream {stream.name} failed: {e}")
+
+
+    def get_stats(self) -> dict:
+        return {
+            name: {
+                "frames": stream.frames,
+                "pending": stream.frame_ring.pending(),
+                "results_dropped": stream.results_dropped,
+                "frames_dropped": stream.frames_dropped,
+                "errors": stream.errors,
+                "mean_capture_to_result_ms": round(float(np.mean(stream.latencies_ms)), 3) if stream.latencies_ms else 0.0,
+            }
+            for name, stream in self._streams.items()
+        }
@@ -0,0 +1,232 @@
+import os
+import time
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+
+_HEADER_FIELDS = 8
+_HEADER_BYTES = _HEADER_FIELDS * 8
+# header layout, int64 each: magic, slot_count, two ring specific fields, head, tail
+_MAGIC, _SLOT_COUNT, _FIELD_A, _FIELD_B, _HEAD, _TAIL = range(6)
+_FRAME_MAGIC = 0x48454C4D46524D31    # "HELMFRM1"
+_RESULT_MAGIC = 0x48454C4D52534C32   # "HELMRSL2"
+_SLOT_HEADER_FIELDS = 4
+
+# status of a result slot, a frame that was not inferred still gets one so the grabber can tell
+RESULT_STATUS_OK = 0
+RESULT_STATUS_ERROR = 1
+RESULT_STATUS_DROPPED = 2
+
+
+def _align(size: int, alignment: int = 64) -> int:
+    return (size + alignment - 1) // alignment * alignment
+
+
+# blocks this process created and has not unlinked yet, their tracker registration is the creator's
+_created = set()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to a block another process created. That process owns it, so this one must not
+    track it, or its resource tracker would unlink the block when this process exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 attaching always registers the block, POSIX only, under its /name. The
+        # tracker keeps one entry per name, so in the creating process the entry is the creator's to drop
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix" and shm.name not in _created:
+            resource_tracker.unregister(f"/{shm.name}", "shared_memory")
+        return shm
+
+
+class _SharedRing:
+    """
+    Single producer, single consumer ring of fixed size slots in a named shared memory block.
+
+    head counts the slots written and is only advanced by the producer, tail counts the slots
+    consumed and is only advanced by the consumer. A slot's contents are written before head moves
+    past it and read before tail moves past it, so neither side needs a lock.
+    """
+
+    MAGIC = 0
+    SLOT_HEADER_FIELDS = _SLOT_HEADER_FIELDS
+
+    def __init__(self, name: str, create: bool, slot_count: int, field_a: int, field_b: int):
+        if create:
+            self.slot_count, self.field_a, self.field_b = slot_count, field_a, field_b
+            self.slot_bytes = self._slot_bytes()
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_BYTES + slot_count * self.slot_bytes)
+            except FileExistsError:
+                # left over from a process that did not shut down cleanly
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_BYTES + slot_count * self.slot_bytes)
+            self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            self.header[:] = 0
+            self.header[_SLOT_COUNT], self.header[_FIELD_A], self.header[_FIELD_B] = slot_count, field_a, field_b
+            self.header[_MAGIC] = self.MAGIC
+        else:
+            self.shm = _attach(name)
+            self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            if int(self.header[_MAGIC]) != self.MAGIC:
+                raise ValueError(f"Shared memory block {name} is not a {type(self).__name__}")
+            self.slot_count, self.field_a, self.field_b = (int(self.header[field]) for field in (_SLOT_COUNT, _FIELD_A, _FIELD_B))
+            self.slot_bytes = self._slot_bytes()
+        self.name = name
+        self.is_owner = create
+        if create:
+            _created.add(self.shm.name)
+
+
+    def _slot_bytes(self) -> int:
+        raise NotImplementedError
+
+
+    def _slot_offset(self, position: int) -> int:
+        return _HEADER_BYTES + (position % self.slot_count) * self.slot_bytes
+
+
+    def _slot_header(self, position: int) -> np.ndarray:
+        return np.ndarray((self.SLOT_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf, offset=self._slot_offset(position))
+
+
+    def pending(self) -> int:
+        return int(self.header[_HEAD]) - int(self.header[_TAIL])
+
+
+    def _writable_position(self):
+        head = int(self.header[_HEAD])
+        return head if head - int(self.header[_TAIL]) < self.slot_count else None
+
+
+    def _publish(self) -> None:
+        self.header[_HEAD] = self.header[_HEAD] + 1
+
+
+    def _readable_position(self):
+        tail = int(self.header[_TAIL])
+        return tail if int(self.header[_HEAD]) > tail else None
+
+
+    def release(self) -> None:
+        """Consumer side, hands the oldest slot back to the producer"""
+        self.header[_TAIL] = self.header[_TAIL] + 1
+
+
+    def close(self) -> None:
+        # views into the buffer must go before the mapping can be closed
+        self.header = None
+        self.shm.close()
+        if self.is_owner:
+            self.shm.unlink()
+            _created.discard(self.shm.name)
+
+
+class SharedFrameRing(_SharedRing):
+    """
+    Raw uint8 HWC RGB frames up to max_height x max_width. Each slot holds the producer's sequence
+    number, the frame size and the capture time in ns ahead of the pixels.
+    """
+
+    MAGIC = _FRAME_MAGIC
+
+    def __init__(self, name: str, create: bool = False, slot_count: int = 4, max_height: int = 1080, max_width: int = 1920):
+        super().__init__(name, create, slot_count, max_height, max_width)
+        self.max_height, self.max_width = self.field_a, self.field_b
+
+
+    def _slot_bytes(self) -> int:
+        return _align(_SLOT_HEADER_FIELDS * 8 + self.field_a * self.field_b * 3)
+
+
+    def write(self, frame: np.ndarray, sequence: int) -> bool:
+        """Producer side, returns False and drops the frame when every slot is still unread"""
+        height, width = frame.shape[:2]
+        if height > self.max_height or width > self.max_width or frame.ndim != 3 or frame.shape[2] != 3:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit a {self.max_height}x{self.max_width}x3 slot")
+        position = self._writable_position()
+        if position is None:
+            return False
+        offset = self._slot_offset(position)
+        pixels = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf, offset=offset + _SLOT_HEADER_FIELDS * 8)
+        pixels[:] = frame
+        self._slot_header(position)[:] = (sequence, height, width, time.time_ns())
+        self._publish()
+        return True
+
+
+    def read(self):
+        """
+        Consumer side, (sequence, captured_at_ns, HWC uint8 view) of the oldest unread frame or None.
+        The view points into shared memory and is only valid until release().
+        """
+        position = self._readable_position()
+        if position is None:
+            return None
+        sequence, height, width, captured_at_ns = (int(v) for v in self._slot_header(position))
+        pixels = np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf,
+                            offset=self._slot_offset(position) + _SLOT_HEADER_FIELDS * 8)
+        return sequence, captured_at_ns, pixels
+
+
+class SharedResultRing(_SharedRing):
+    """
+    Detections for the frames of the companion SharedFrameRing. Each slot holds the frame's
+    sequence number, the detection count, the inference time in ns, the index of the serving
+    tier the frame ran on (-1 without load degradation) and a RESULT_STATUS, followed by up to
+    max_detections rows of float32 (x0, y0, x1, y1, label, score). A frame that failed or was
+    dropped as stale gets a slot with its status and no detections.
+    """
+
+    MAGIC = _RESULT_MAGIC
+    SLOT_HEADER_FIELDS = _SLOT_HEADER_FIELDS + 1
+
+    def __init__(self, name: str, create: bool = False, slot_count: int = 4, max_detections: int = 64):
+        super().__init__(name, create, slot_count, max_detections, 0)
+        self.max_detections = self.field_a
+
+
+    def _slot_bytes(self) -> int:
+        return _align(self.SLOT_HEADER_FIELDS * 8 + self.field_a * 6 * 4)
+
+
+    def write(self, sequence: int, pred: dict = None, inference_ns: int = 0, tier: int = -1,
+              status: int = RESULT_STATUS_OK) -> bool:
+        """Producer side (the inference worker), returns False when the reader fell a full ring behind"""
+        position = self._writable_position()
+        if position is None:
+            return False
+        count = min(len(pred['boxes']), self.max_detections) if pred is not None else 0
+        rows = np.ndarray((self.max_detections, 6), dtype=np.float32, buffer=self.shm.buf,
+                          offset=self._slot_offset(position) + self.SLOT_HEADER_FIELDS * 8)
+        if count:
+            rows[:count, :4] = pred['boxes'][:count].numpy()
+            rows[:count, 4] = pred['labels'][:count].numpy()
+            rows[:count, 5] = pred['scores'][:count].numpy()
+        self._slot_header(position)[:] = (sequence, count, inference_ns, tier, status)
+        self._publish()
+        return True
+
+
+    def read(self):
+        """Consumer side, (sequence, inference_ns, rows copied out of the ring, tier, status) or None, releases the slot"""
+        position = self._readable_position()
+        if position is None:
+            return None
+        sequence, count, inference_ns, tier, status = (int(v) for v in self._slot_header(position))
+        rows = np.ndarray((self.max_detections, 6), dtype=np.float32, buffer=self.shm.buf,
+                          offset=self._slot_offset(position) + self.SLOT_HEADER_FIELDS * 8)[:count].copy()
+        self.release()
+        return sequence, inference_ns, rows, tier, status
+
+
+def frame_ring_name(stream_name: str) -> str:
+    return f"helmet_{stream_name}_frames"
+
+
+def result_ring_name(stream_name: str) -> str:
+    return f"helmet_{stream_name}_results"
@@ -0,0 +1,303 @@
+import sys
+import time
+import threading
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+from typing import Dict, List
+import numpy as np
+import torch
+from helmet.entity.config_entity import StreamSchedulerConfig
+from helmet.exception import HelmetException
+from helmet.logger import logging
+from helmet.serving.model_registry import ModelRegistry
+from helmet.serving.degradation import DegradationPolicy
+from helmet.serving.inference_backend import InferenceBackend
+
+STREAM_POLICY_ROUND_ROBIN = 'round_robin'
+STREAM_POLICY_DEADLINE = 'deadline'
+
+
+class StaleFrameError(RuntimeError):
+    """The frame could no longer be processed before its deadline and was dropped"""
+
+
+class TooManyStreamsError(RuntimeError):
+    """A new stream was refused because MAX_STREAMS streams all still have frames pending"""
+
+
+class _PendingFrame:
+    __slots__ = ("stream_id", "image_tensor", "future", "enqueued", "deadline", "model")
+
+    def __init__(self, stream_id: str, image_tensor: torch.Tensor, future: Future, enqueued: float, deadline: float,
+                 model: InferenceBackend = None):
+        self.stream_id = stream_id
+        self.image_tensor = image_tensor
+        self.future = future
+        self.enqueued = enqueued
+        self.deadline = deadline
+        # the model of the frame's serving tier, None runs the policy's current one
+        self.model = model
+
+
+class _StreamStats:
+    def __init__(self, latency_window: int):
+        self.submitted = 0
+        self.processed = 0
+        self.dropped_stale = 0
+        self.dropped_superseded = 0
+        self.deadline_misses = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.last_submitted = time.monotonic()
+
+    def to_dict(self) -> dict:
+        latencies = np.array(self.latencies) if self.latencies else None
+        return {
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "dropped_stale": self.dropped_stale,
+            "dropped_superseded": self.dropped_superseded,
+            "deadline_misses": self.deadline_misses,
+            "mean_latency_ms": round(float(latencies.mean()), 3) if latencies is not None else 0.0,
+            "p95_latency_ms": round(float(np.percentile(latencies, 95)), 3) if latencies is not None else 0.0,
+        }
+
+
+class StreamScheduler:
+    """
+    Batches frames from many named camera streams in front of the detector.
+
+    Every stream has its own short queue, so a chatty camera only ever delays its own frames. The
+    worker forms each batch either round-robin, one frame per stream in turn, or earliest deadline
+    first across all streams. Before a batch runs, frames that can no longer finish before their
+    deadline, given the recent forward time, are dropped and fail with StaleFrameError instead of
+    being processed late.
+    """
+
+    def __init__(self, model_registry: ModelRegistry, stream_scheduler_config: StreamSchedulerConfig = None,
+                 degradation_policy: DegradationPolicy = None):
+        self.model_registry = model_registry
+        # under load the policy hands out a cheaper variant of the resident model
+        self.degradation_policy = degradation_policy
+        self.stream_scheduler_config = stream_scheduler_config if stream_scheduler_config is not None else StreamSchedulerConfig()
+        if self.stream_scheduler_config.POLICY not in (STREAM_POLICY_ROUND_ROBIN, STREAM_POLICY_DEADLINE):
+            raise ValueError(f"Unknown stream scheduling policy {self.stream_scheduler_config.POLICY}")
+        self._streams: "OrderedDict[str, deque]" = OrderedDict()
+        self._stream_stats: Dict[str, _StreamStats] = {}
+        self._condition = threading.Condition()
+        self._pending = 0
+        self._stop_event = threading.Event()
+        self._worker: threading.Thread = None
+        self._forward_time_estimate = 0.0
+        self._batches_run = 0
+        self._evicted_streams = 0
+
+
+    def start(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name="stream-scheduler", daemon=True)
+        self._worker.start()
+        logging.info(f"Started the stream scheduler worker with the {self.stream_scheduler_config.POLICY} policy")
+
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        logging.info("Stopped the stream scheduler worker")
+
+
+    def _evict_idle_streams(self, room_for: int = 0) -> None:
+        """
+        Forgets streams with nothing pending that have not submitted for IDLE_STREAM_TTL_SECONDS, then
+        the longest idle ones until room_for new streams fit under MAX_STREAMS. Must be called with the
+        lock held.
+        """
+        now = time.monotonic()
+        idle = sorted((stats.last_submitted, stream_id) for stream_id, stats in self._stream_stats.items()
+                      if not self._streams.get(stream_id))
+        for last_submitted, stream_id in idle:
+            if now - last_submitted < self.stream_scheduler_config.IDLE_STREAM_TTL_SECONDS \
+                    and len(self._stream_stats) + room_for <= self.stream_scheduler_config.MAX_STREAMS:
+                break
+            self._streams.pop(stream_id, None)
+            del self._stream_stats[stream_id]
+            self._evicted_streams += 1
+
+
+    def submit(self, stream_id: str, image_tensor: torch.Tensor, deadline_ms: float = None,
+               model: InferenceBackend = None) -> Future:
+        """Queues one frame of stream_id, the future resolves to its prediction dict or StaleFrameError"""
+        now = time.perf_counter()
+        deadline_ms = deadline_ms if deadline_ms is not None else self.stream_scheduler_config.DEADLINE_MS
+        frame = _PendingFrame(stream_id, image_tensor, Future(), now, now + deadline_ms / 1000, model)
+        with self._condition:
+            stream = self._streams.get(stream_id)
+            if stream is None:
+                # stream ids come from clients, so idle ones are forgotten and their number is capped
+                if stream_id not in self._stream_stats:
+                    self._evict_idle_streams(room_for=1)
+                    if len(self._stream_stats) >= self.stream_scheduler_config.MAX_STREAMS:
+                        raise TooManyStreamsError(f"All {self.stream_scheduler_config.MAX_STREAMS} streams are busy")
+                stream = self._streams[stream_id] = deque()
+                self._stream_stats.setdefault(stream_id, _StreamStats(self.stream_scheduler_config.LATENCY_WINDOW))
+            stats = self._stream_stats[stream_id]
+            stats.submitted += 1
+            stats.last_submitted = time.monotonic()
+            if len(stream) >= self.stream_scheduler_config.MAX_PENDING_PER_STREAM:
+                # a newer frame of the same camera makes the oldest pending one pointless
+                superseded = stream.popleft()
+                self._pending -= 1
+                stats.dropped_superseded += 1
+                if superseded.future.set_running_or_notify_cancel():
+                    superseded.future.set_exception(StaleFrameError("Superseded by a newer frame of the same stream"))
+            stream.append(frame)
+            self._pending += 1
+            self._condition.notify()
+        return frame.future
+
+
+    def predict(self, stream_id: str, image_tensor: torch.Tensor, deadline_ms: float = None,
+                model: InferenceBackend = None) -> Dict[str, torch.Tensor]:
+        try:
+            return self.submit(stream_id, image_tensor, deadline_ms, model).result()
+        except Exception as e:
+            raise HelmetException(e, sys) from e
+
+
+    def _drop_stale(self) -> None:
+        """Must be called with the lock held"""
+        cutoff = time.perf_counter() + self._forward_time_estimate
+        for stream_id, stream in self._streams.items():
+            while stream and stream[0].deadline < cutoff:
+                frame = stream.popleft()
+                self._pending -= 1
+                self._stream_stats[stream_id].dropped_stale += 1
+                if frame.future.set_running_or_notify_cancel():
+                    frame.future.set_exception(StaleFrameError("Frame dropped, it could not meet its deadline"))
+
+
+    def _take_round_robin(self) -> List[_PendingFrame]:
+        """Must be called with the lock held"""
+        batch = []
+        while len(batch) < self.stream_scheduler_config.MAX_BATCH_SIZE and self._pending:
+            for stream_id in list(self._streams):
+                stream = self._streams[stream_id]
+                if not stream:
+                    continue
+                batch.append(stream.popleft())
+                self._pending -= 1
+                # the stream that was just served goes to the back of the rotation
+                self._streams.move_to_end(stream_id)
+                if len(batch) == self.stream_scheduler_config.MAX_BATCH_SIZE:
+                    break
+        return batch
+
+
+    def _take_earliest_deadlines(self) -> List[_PendingFrame]:
+        """Must be called with the lock held"""
+        candidates = sorted((frame for stream in self._streams.values() for frame in stream), key=lambda f: f.deadline)
+        batch = candidates[:self.stream_scheduler_config.MAX_BATCH_SIZE]
+        for frame in batch:
+            self._streams[frame.stream_id].remove(frame)
+        self._pending -= len(batch)
+        return batch
+
+
+    def _collect_batch(self) -> List[_PendingFrame]:
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending or self._stop_event.is_set(), timeout=0.1):
+                return []
+            # give other streams a moment to fill the batch, but never past the earliest deadline
+            earliest_deadline = min(stream[0].deadline for stream in self._streams.values() if stream) if self._pending else 0
+            wait_until = min(time.perf_counter() + self.stream_scheduler_config.MAX_WAIT_SECONDS,
+                             earliest_deadline - self._forward_time_estimate)
+            while self._pending < self.stream_scheduler_config.MAX_BATCH_SIZE and not self._stop_event.is_set():
+                remaining = wait_until - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            self._drop_stale()
+            if self.stream_scheduler_config.POLICY == STREAM_POLICY_DEADLINE:
+                return self._take_earliest_deadlines()
+            return self._take_round_robin()
+
+
+    def _run_batch(self, batch: List[_PendingFrame]) -> None:
+        batch = [frame for frame in batch if frame.future.set_running_or_notify_cancel()]
+        # frames resolved to different tiers around a tier change run on their own model each
+        groups = defaultdict(list)
+        for frame in batch:
+            groups[id(frame.model)].append(frame)
+        for group in groups.values():
+            self._forward(group)
+
+
+    def _forward(self, batch: List[_PendingFrame]) -> None:
+        device = self.stream_scheduler_config.DEVICE
+        forward_start = time.perf_counter()
+        try:
+            model = batch[0].model
+            if model is None:
+                model = self.degradation_policy.get_model() if self.degradation_policy is not None else self.model_registry.get_model()
+            with torch.inference_mode():
+                outputs = model([frame.image_tensor.to(device) for frame in batch])
+            outputs = [{k: v.to("cpu") for k, v in output.items()} for output in outputs]
+        except Exception as e:
+            logging.error(f"Stream batch of {len(batch)} frames failed: {e}")
+            for frame in batch:
+                frame.future.set_exception(e)
+            return
+        forward_end = time.perf_counter()
+
+        for frame, output in zip(batch, outputs):
+            frame.future.set_result(output)
+
+        with self._condition:
+            forward_time = forward_end - forward_start
+            # exponential moving average, used to drop frames that would finish too late
+            self._forward_time_estimate = forward_time if not self._batches_run \
+                else 0.8 * self._forward_time_estimate + 0.2 * forward_time
+            self._batches_run += 1
+            for frame in batch:
+                stats = self._stream_stats.get(frame.stream_id)
+                if stats is None:
+                    continue
+                stats.processed += 1
+                stats.latencies.append(1000 * (forward_end - frame.enqueued))
+                if forward_end > frame.deadline:
+                    stats.deadline_misses += 1
+
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self._run_batch(batch)
+
+        # fail whatever is still queued so no caller waits forever
+        with self._condition:
+            for stream in self._streams.values():
+                while stream:
+                    frame = stream.popleft()
+                    if frame.future.set_running_or_notify_cancel():
+                        frame.future.set_exception(RuntimeError("Stream scheduler stopped"))
+            self._pending = 0
+
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            self._evict_idle_streams()
+            return {
+                "policy": self.stream_scheduler_config.POLICY,
+                "pending": self._pending,
+                "batches_run": self._batches_run,
+                "evicted_streams": self._evicted_streams,
+                "forward_time_estimate_ms": round(1000 * self._forward_time_estimate, 3),
+                "streams": {stream_id: stats.to_dict() for stream_id, stats in self._stream_stats.items()},
+            }
@@ -0,0 +1,53 @@
+from typing import List, Tuple
+import torch
+from torchvision.ops import batched_nms
+
+
+def tile_starts(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Start offsets along one axis, the last tile is aligned to the far edge"""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, tile_size - overlap)
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def make_tiles(height: int, width: int, tile_size: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Overlapping (x0, y0, x1, y1) tiles covering the whole image"""
+    return [(x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+            for y0 in tile_starts(height, tile_size, overlap)
+            for x0 in tile_starts(width, tile_size, overlap)]
+
+
+def filter_tiles_by_mask(tiles, region_mask: torch.Tensor):
+    """Keeps the tiles that contain at least one pixel of the HxW boolean region mask"""
+    return [tile for tile in tiles if bool(region_mask[tile[1]:tile[3], tile[0]:tile[2]].any())]
+
+
+def filter_detections_by_mask(pred: dict, region_mask: torch.Tensor) -> dict:
+    """Drops detections whose box centre falls outside the HxW boolean region mask"""
+    if len(pred['boxes']) == 0:
+        return pred
+    height, width = region_mask.shape
+    centres_x = ((pred['boxes'][:, 0] + pred['boxes'][:, 2]) / 2).long().clamp(0, width - 1)
+    centres_y = ((pred['boxes'][:, 1] + pred['boxes'][:, 3]) / 2).long().clamp(0, height - 1)
+    keep = region_mask[centres_y, centres_x]
+    return {k: v[keep] for k, v in pred.items()}
+
+
+def merge_tile_detections(preds: List[dict], tiles, iou_threshold: float) -> dict:
+    """
+    Shifts every tile's boxes to global coordinates and removes the duplicates found in the
+    overlap of neighbouring tiles with per class NMS
+    """
+    if not preds:
+        return {'boxes': torch.zeros((0, 4)), 'labels': torch.zeros((0,), dtype=torch.int64), 'scores': torch.zeros((0,))}
+
+    boxes = torch.cat([pred['boxes'] + torch.tensor([x0, y0, x0, y0], dtype=pred['boxes'].dtype)
+                       for pred, (x0, y0, _, _) in zip(preds, tiles)])
+    labels = torch.cat([pred['labels'] for pred in preds])
+    scores = torch.cat([pred['scores'] for pred in preds])
+
+    keep = batched_nms(boxes, scores, labels, iou_threshold)
+    return {'boxes': boxes[keep], 'labels': labels[keep], 'scores': scores[keep]}
@@ -0,0 +1,104 @@
+from typing import List
+import torch
+from torchvision.ops import box_iou
+from helmet.entity.config_entity import TrackerConfig
+
+
+class Track:
+    """One tracked object with a constant velocity motion model in box coordinates"""
+
+    def __init__(self, box: torch.Tensor, label: int, score: float):
+        self.box = box
+        self.label = label
+        self.score = score
+        self.velocity = torch.zeros(4)
+        self.confidence = 1.0
+        self.frames_since_detection = 0
+
+
+class IoUTracker:
+    """
+    Carries detections across the frames the detector skips.
+
+    Detections are matched to tracks greedily by IoU within each class. Between detections every
+    track moves by its last observed per frame velocity and its confidence decays, faster for
+    tracks moving quickly relative to their size. The detector is due again when the least
+    confident track drops below MIN_CONFIDENCE.
+    """
+
+    def __init__(self, tracker_config: TrackerConfig = None):
+        self.tracker_config = tracker_config if tracker_config is not None else TrackerConfig()
+        self.tracks: List[Track] = []
+
+
+    def reset(self) -> None:
+        self.tracks = []
+
+
+    @property
+    def confidence(self) -> float:
+        """Confidence of the least certain track, 1.0 without tracks"""
+        return min((track.confidence for track in self.tracks), default=1.0)
+
+
+    def needs_detection(self) -> bool:
+        return self.confidence < self.tracker_config.MIN_CONFIDENCE
+
+
+    def update(self, pred: dict) -> dict:
+        """Matches a detector result to the tracks, returns it unchanged"""
+        boxes = pred['boxes'].to(torch.float32)
+        labels = pred['labels'].tolist()
+        scores = pred['scores'].tolist()
+
+        matched_tracks = set()
+        matched_detections = set()
+        if self.tracks and len(boxes):
+            ious = box_iou(torch.stack([track.box for track in self.tracks]), boxes)
+            for track_index, detection_index in sorted(
+                    ((t, d) for t in range(len(self.tracks)) for d in range(len(boxes))),
+                    key=lambda pair: -float(ious[pair])):
+                if float(ious[track_index, detection_index]) < self.tracker_config.IOU_THRESHOLD:
+                    break
+                track = self.tracks[track_index]
+                if track_index in matched_tracks or detection_index in matched_detections \
+                        or track.label != labels[detection_index]:
+                    continue
+                # the track was already extrapolated, measure velocity from where it was last seen
+                last_seen_box = track.box - track.velocity * track.frames_since_detection
+                track.velocity = (boxes[detection_index] - last_seen_box) / (track.frames_since_detection + 1)
+                track.box = boxes[detection_index]
+                track.score = scores[detection_index]
+                track.confidence = 1.0
+                track.frames_since_detection = 0
+                matched_tracks.add(track_index)
+                matched_detections.add(detection_index)
+
+        # unmatched tracks are gone from view, the detector saw every object in this frame
+        self.tracks = [track for index, track in enumerate(self.tracks) if index in matched_tracks]
+        self.tracks += [Track(boxes[index], labels[index], scores[index])
+                        for index in range(len(boxes)) if index not in matched_detections]
+        return pred
+
+
+    def propagate(self, image_size) -> dict:
+        """Moves every track one frame forward and returns the tracks as a prediction dict"""
+        width, height = image_size
+        limits = torch.tensor([width, height, width, height], dtype=torch.float32)
+        for track in self.tracks:
+            track.box = torch.minimum(torch.clamp(track.box + track.velocity, min=0), limits)
+            track.frames_since_detection += 1
+            box_size = max(float(track.box[2] - track.box[0]), float(track.box[3] - track.box[1]), 1.0)
+            relative_speed = float(track.velocity.abs().max()) / box_size
+            track.confidence *= self.tracker_config.CONFIDENCE_DECAY / (1.0 + self.tracker_config.MOTION_PENALTY * relative_speed)
+        return self.to_prediction()
+
+
+    def to_prediction(self) -> dict:
+        if not self.tracks:
+            return {'boxes': torch.zeros((0, 4)), 'labels': torch.zeros((0,), dtype=torch.int64), 'scores': torch.zeros((0,))}
+        return {
+            'boxes': torch.stack([track.box for track in self.tracks]),
+            'labels': torch.tensor([track.label for track in self.tracks], dtype=torch.int64),
+            'scores': torch.tensor([track.score for track in self.tracks]),
+        }
@@ -0,0 +1,259 @@
+import sys
+import time
+import queue
+import threading
+import cv2
+import torch
+from helmet.entity.config_entity import VideoPipelineConfig, TrackerConfig
+from helmet.exception import HelmetException
+from helmet.logger import logging
+from helmet.serving.tracker import IoUTracker
+
+# marks the end of the stream between stages
+_END_OF_STREAM = object()
+
+
+class StageStats:
+    """Frames handled by one stage and the time it spent working, excluding queue waits"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.busy_seconds = 0.0
+
+    def add(self, frames: int, seconds: float) -> None:
+        self.frames += frames
+        self.busy_seconds += seconds
+
+    def to_dict(self) -> dict:
+        return {
+            "frames": self.frames,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "fps": round(self.frames / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+        }
+
+
+class VideoPipeline:
+    """
+    Runs the detector over a video file as three concurrent stages connected by bounded queues:
+
+        decode (OpenCV) -> inference (batched PredictionPipeline.detect_batch) -> encode (annotate/write)
+
+    Each stage reports its own frames per second of busy time, the slowest one is the bottleneck.
+    With a detect interval above 1 the inference stage runs the detector on every N-th frame and
+    an IoUTracker carries the boxes across the frames in between.
+    A pipeline object handles one video.
+    """
+
+    def __init__(self, prediction_pipeline, video_pipeline_config: VideoPipelineConfig = None,
+                 tracker_config: TrackerConfig = None):
+        self.prediction_pipeline = prediction_pipeline
+        self.video_pipeline_config = video_pipeline_config if video_pipeline_config is not None else VideoPipelineConfig()
+        self.tracker = IoUTracker(tracker_config)
+        self.detect_interval = self.video_pipeline_config.DETECT_INTERVAL
+        self.detector_frames = 0
+        self._frames_since_detection = None
+        self._stop_event = threading.Event()
+        self._errors = []
+        self.stats = {name: StageStats(name) for name in ["decode", "inference", "encode"]}
+
+
+    def _put(self, stage_queue: queue.Queue, item) -> bool:
+        """Blocks while the queue is full, gives up when another stage failed"""
+        while not self._stop_event.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+    def _get(self, stage_queue: queue.Queue):
+        while not self._stop_event.is_set():
+            try:
+                return stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END_OF_STREAM
+
+
+    def _fail(self, stage: str, error: Exception) -> None:
+        logging.error(f"Video {stage} stage failed: {error}")
+        self._errors.append(error)
+        self._stop_event.set()
+
+
+    def _decode_stage(self, capture, frame_stride: int, output_queue: queue.Queue) -> None:
+        try:
+            frame_index = 0
+            while not self._stop_event.is_set():
+                start_time = time.perf_counter()
+                if frame_index % frame_stride:
+                    # grab() advances without decoding the skipped frame
+                    if not capture.grab():
+                        break
+                    frame_index += 1
+                    continue
+                ok, frame_bgr = capture.read()
+                if not ok:
+                    break
+                frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+                image_tensor = torch.from_numpy(frame_rgb).permute(2, 0, 1).to(torch.float32).div_(255)
+                self.stats["decode"].add(1, time.perf_counter() - start_time)
+                if not self._put(output_queue, (frame_index, frame_bgr, image_tensor)):
+                    return
+                frame_index += 1
+        except Exception as e:
+            self._fail("decode", e)
+        finally:
+            self._put(output_queue, _END_OF_STREAM)
+
+
+    def detect_frames(self, frames: list) -> list:
+        """Detections above the score threshold for a batch of (frame_index, frame_bgr, image_tensor)"""
+        preds = self.prediction_pipeline.detect_batch([image_tensor for _, _, image_tensor in frames])
+        self.detector_frames += len(frames)
+        return [self.prediction_pipeline.filter_detections(pred) for pred in preds]
+
+
+    def track_frames(self, frames: list) -> list:
+        """
+        Detections for consecutive frames where the detector only runs when it is due: on the first
+        frame, every detect_interval frames, or as soon as the tracker's confidence drops.
+        """
+        preds = []
+        for frame in frames:
+            if self._frames_since_detection is None or self._frames_since_detection + 1 >= self.detect_interval \
+                    or self.tracker.needs_detection():
+                pred = self.tracker.update(self.detect_frames([frame])[0])
+                self._frames_since_detection = 0
+            else:
+                height, width = frame[2].shape[-2:]
+                pred = self.tracker.propagate((width, height))
+                self._frames_since_detection += 1
+            preds.append(pred)
+        return preds
+
+
+    def _inference_stage(self, input_queue: queue.Queue, output_queue: queue.Queue) -> None:
+        try:
+            finished = False
+            while not finished:
+                item = self._get(input_queue)
+                if item is _END_OF_STREAM:
+                    break
+                batch = [item]
+                # take whatever else is already decoded, up to the batch size, without waiting
+                while len(batch) < self.video_pipeline_config.BATCH_SIZE:
+                    try:
+                        item = input_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _END_OF_STREAM:
+                        finished = True
+                        break
+                    batch.append(item)
+
+                start_time = time.perf_counter()
+                preds = self.track_frames(batch) if self.detect_interval > 1 else self.detect_frames(batch)
+                self.stats["inference"].add(len(batch), time.perf_counter() - start_time)
+                for (frame_index, frame_bgr, _), pred in zip(batch, preds):
+                    if not self._put(output_queue, (frame_index, frame_bgr, pred)):
+                        return
+        except Exception as e:
+            self._fail("inference", e)
+        finally:
+            self._put(output_queue, _END_OF_STREAM)
+
+
+    def annotate(self, frame_bgr, pred: dict):
+        for box, label, score in zip(pred['boxes'].tolist(), pred['labels'].tolist(), pred['scores'].tolist()):
+            color = self.video_pipeline_config.BOX_COLOR_BGR.get(label, (255, 255, 255))
+            x0, y0, x1, y1 = (int(v) for v in box)
+            cv2.rectangle(frame_bgr, (x0, y0), (x1, y1), color, 2)
+            cv2.putText(frame_bgr, f"{self.prediction_pipeline.label_name(label)} {score:.2f}", (x0, max(0, y0 - 5)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1, cv2.LINE_AA)
+        return frame_bgr
+
+
+    def _encode_stage(self, input_queue: queue.Queue, writer, frame_results: list) -> None:
+        try:
+            while True:
+                item = self._get(input_queue)
+                if item is _END_OF_STREAM:
+                    break
+                frame_index, frame_bgr, pred = item
+                start_time = time.perf_counter()
+                if writer is not None:
+                    writer.write(self.annotate(frame_bgr, pred))
+                height, width = frame_bgr.shape[:2]
+                result = self.prediction_pipeline.format_detections(pred, image_size=(width, height))
+                frame_results.append({"frame_index": frame_index, "detections": result["detections"]})
+                self.stats["encode"].add(1, time.perf_counter() - start_time)
+        except Exception as e:
+            self._fail("encode", e)
+
+
+    def run(self, input_path: str, output_path: str = None, frame_stride: int = None, detect_interval: int = None) -> dict:
+        """
+        Method Name :   run
+        Description :   This method runs the three stage pipeline over the video at input_path and
+                        writes the annotated video to output_path when one is given. detect_interval
+                        overrides the configured number of frames per detector run.
+
+        Output      :   {"frames": per frame detections, "stats": per stage frames/sec and the serving tier}
+        """
+        logging.info("Entered the run method of VideoPipeline class")
+        try:
+            frame_stride = max(1, frame_stride or self.video_pipeline_config.FRAME_STRIDE)
+            self.detect_interval = max(1, detect_interval or self.video_pipeline_config.DETECT_INTERVAL)
+            capture = cv2.VideoCapture(input_path)
+            if not capture.isOpened():
+                raise ValueError("Could not open the video")
+
+            writer = None
+            if output_path is not None:
+                source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+                width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+                height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*self.video_pipeline_config.OUTPUT_FOURCC),
+                                         source_fps / frame_stride, (width, height))
+
+            decoded_queue = queue.Queue(maxsize=self.video_pipeline_config.QUEUE_SIZE)
+            detected_queue = queue.Queue(maxsize=self.video_pipeline_config.QUEUE_SIZE)
+            frame_results = []
+            stages = [
+                threading.Thread(target=self._decode_stage, args=(capture, frame_stride, decoded_queue), name="video-decode"),
+                threading.Thread(target=self._inference_stage, args=(decoded_queue, detected_queue), name="video-inference"),
+                threading.Thread(target=self._encode_stage, args=(detected_queue, writer, frame_results), name="video-encode"),
+            ]
+
+            start_time = time.perf_counter()
+            for stage in stages:
+                stage.start()
+            for stage in stages:
+                stage.join()
+            wall_seconds = time.perf_counter() - start_time
+
+            capture.release()
+            if writer is not None:
+                writer.release()
+            if self._errors:
+                raise self._errors[0]
+
+            stats = {name: stage_stats.to_dict() for name, stage_stats in self.stats.items()}
+            stats["frame_stride"] = frame_stride
+            stats["detect_interval"] = self.detect_interval
+            stats["tier"] = self.prediction_pipeline.tier_name
+            stats["detector_frames"] = self.detector_frames
+            stats["detector_frame_fraction"] = round(self.detector_frames / len(frame_results), 4) if frame_results else 0.0
+            stats["wall_seconds"] = round(wall_seconds, 3)
+            stats["end_to_end_fps"] = round(len(frame_results) / wall_seconds, 2) if wall_seconds else 0.0
+            stats["bottleneck"] = min(self.stats.values(), key=lambda s: s.frames / s.busy_seconds if s.busy_seconds else float("inf")).name
+            logging.info(f"Video pipeline stats: {stats}")
+            logging.info("Exited the run method of VideoPipeline class")
+            return {"frames": frame_results, "stats": stats}
+
+        except Exception as e:
+            raise HelmetException(e, sys) from e
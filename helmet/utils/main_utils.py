@@ -43,3 +43,33 @@ def image_to_base64(image):
 
     return my_string
 
+
+
+def get_process_memory_mb() -> float:
+    """Resident set size of the current process in MB"""
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    # ru_maxrss is the peak RSS in KB on Linux, used when /proc is not available
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def get_process_pss_mb() -> float:
+    """
+    Proportional set size of the current process in MB, pages shared with other processes count
+    divided by the number of sharers. None where /proc/self/smaps_rollup is not available.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as smaps_file:
+            for line in smaps_file:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
@@ -0,0 +1,7 @@
+import pytest
+from tests.fakes import FakeRegistry
+
+
+@pytest.fixture
+def fake_registry():
+    return FakeRegistry()
@@ -0,0 +1,48 @@
+import threading
+import time
+import torch
+
+
+class FakeBackend:
+    """Stands in for an InferenceBackend: one fixed detection per image, no weights to download"""
+
+    score_threshold = None
+
+    def __init__(self, name: str = "fake", score: float = 0.9, delay_seconds: float = 0.0):
+        self.name = name
+        self.score = score
+        self.delay_seconds = delay_seconds
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, images):
+        with self._lock:
+            self.batches.append(len(images))
+        if self.delay_seconds:
+            time.sleep(self.delay_seconds)
+        return [{'boxes': torch.tensor([[1.0, 2.0, 11.0, 12.0]]), 'labels': torch.tensor([1]),
+                 'scores': torch.tensor([self.score])} for _ in images]
+
+    @property
+    def images_seen(self) -> int:
+        return sum(self.batches)
+
+
+class FakeRegistry:
+    """The parts of ModelRegistry the serving components use, variants are separate FakeBackends"""
+
+    def __init__(self, model: FakeBackend = None, version: str = "v1"):
+        self.model = model if model is not None else FakeBackend()
+        self.version = version
+        self.variants = {}
+
+    def get_model(self):
+        return self.model
+
+    def get_model_variant(self, name: str, **settings):
+        if name not in self.variants:
+            self.variants[name] = FakeBackend(name)
+        return self.variants[name]
+
+    def get_model_version(self):
+        return self.version
@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import time
+import pytest
+from helmet.exception import HelmetException
+from helmet.serving.admission_control import AdmissionController, AdmissionRejected, check_deadline, find_rejection
+
+
+async def hold(controller: AdmissionController, release: asyncio.Event, deadline_ms: float = None):
+    async with controller.admit(deadline_ms):
+        await release.wait()
+
+
+def test_request_past_the_queue_depth_is_rejected_with_retry_after():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=1)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        queued = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected) as rejection:
+            async with controller.admit():
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+        return rejection.value, controller.get_stats()
+
+    rejection, stats = asyncio.run(scenario())
+    assert rejection.retry_after_seconds >= 1
+    assert (stats["admitted"], stats["rejected_queue_full"]) == (2, 1)
+
+
+def test_queued_request_is_dropped_once_its_deadline_passes():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=4)
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(controller, release))
+        await asyncio.sleep(0.01)
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit(deadline_ms=20):
+                pass
+        release.set()
+        await running
+        return controller.get_stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["dropped_deadline"] == 1 and stats["queue_depth"] == 0
+
+
+def test_admit_yields_the_deadline():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue_depth=1)
+        async with controller.admit(deadline_ms=1000) as deadline:
+            return deadline - time.perf_counter()
+
+    assert 0.9 < asyncio.run(scenario()) <= 1.0
+
+
+def test_expired_deadline_is_found_through_wrapping():
+    check_deadline(None)
+    check_deadline(time.perf_counter() + 60)
+    with pytest.raises(AdmissionRejected):
+        check_deadline(time.perf_counter() - 1)
+
+    try:
+        check_deadline(time.perf_counter() - 1)
+    except AdmissionRejected as e:
+        wrapped = HelmetException(e, sys)
+        wrapped.__cause__ = e
+    assert find_rejection(wrapped) is not None
+    assert find_rejection(ValueError("other")) is None
+
+
+def test_shed_response_is_a_503_with_retry_after():
+    from app import shed_response
+
+    response = shed_response(AdmissionRejected("Server is at capacity", retry_after_seconds=3))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
@@ -0,0 +1,53 @@
+import time
+import pytest
+import torch
+from helmet.entity.config_entity import BatchSchedulerConfig
+from helmet.serving.admission_control import AdmissionRejected, find_rejection
+from helmet.serving.batch_scheduler import BatchScheduler
+from tests.fakes import FakeBackend
+
+
+@pytest.fixture
+def batch_scheduler(fake_registry):
+    config = BatchSchedulerConfig()
+    config.MAX_BATCH_SIZE = 4
+    config.MAX_WAIT_SECONDS = 0.05
+    config.DEVICE = torch.device("cpu")
+    scheduler = BatchScheduler(fake_registry, config)
+    scheduler.start()
+    yield scheduler
+    scheduler.stop()
+
+
+def test_concurrent_requests_share_a_forward(batch_scheduler, fake_registry):
+    futures = [batch_scheduler.submit(torch.rand(3, 32, 32)) for _ in range(4)]
+    preds = [future.result(timeout=5) for future in futures]
+
+    assert all(pred['labels'].tolist() == [1] for pred in preds)
+    assert fake_registry.model.batches == [4]
+
+
+def test_expired_request_fails_without_running_the_model(batch_scheduler, fake_registry):
+    future = batch_scheduler.submit(torch.rand(3, 32, 32), deadline=time.perf_counter() - 1)
+
+    with pytest.raises(AdmissionRejected):
+        future.result(timeout=5)
+    assert fake_registry.model.images_seen == 0
+
+
+def test_predict_error_still_names_the_rejection(batch_scheduler):
+    with pytest.raises(Exception) as error:
+        batch_scheduler.predict(torch.rand(3, 32, 32), deadline=time.perf_counter() - 1)
+
+    assert find_rejection(error.value) is not None
+
+
+def test_requests_for_different_models_run_separately(batch_scheduler, fake_registry):
+    tier_model = FakeBackend("reduced")
+    futures = [batch_scheduler.submit(torch.rand(3, 32, 32)), batch_scheduler.submit(torch.rand(3, 32, 32), model=tier_model),
+               batch_scheduler.submit(torch.rand(3, 32, 32))]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert fake_registry.model.images_seen == 2
+    assert tier_model.batches == [1]
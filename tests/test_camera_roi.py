@@ -0,0 +1,76 @@
+import io
+import os
+import json
+import pytest
+from PIL import Image
+from helmet.constants import RESPONSE_FORMAT_JSON
+from helmet.entity.config_entity import CameraROIConfig, ResultCacheConfig
+from helmet.pipeline.prediction_pipeline import PredictionPipeline
+from helmet.serving.camera_roi import CameraRegions
+from helmet.serving.result_cache import ResultCache
+
+
+@pytest.fixture
+def roi_file(tmp_path):
+    path = tmp_path / "camera_roi.json"
+    path.write_text(json.dumps({"gate_cam": [{"rect": [0.0, 0.5, 0.5, 1.0]}]}))
+    return path
+
+
+@pytest.fixture
+def camera_regions(roi_file):
+    config = CameraROIConfig()
+    config.FILE_PATH = str(roi_file)
+    config.RELOAD_INTERVAL_SECONDS = 0
+    return CameraRegions(config)
+
+
+def write_regions(roi_file, definitions: dict) -> None:
+    roi_file.write_text(json.dumps(definitions))
+    # mtime resolution can be coarse, make sure the edit is seen
+    stat = roi_file.stat()
+    os.utime(roi_file, (stat.st_atime, stat.st_mtime + 10))
+
+
+def test_region_is_rasterized_and_bounded(camera_regions):
+    roi = camera_regions.get("gate_cam", 40, 60)
+
+    assert roi.mask.shape == (40, 60)
+    assert roi.bounds == (0, 20, 30, 40)
+    assert camera_regions.get("other_cam", 40, 60) is None
+
+
+def test_digest_follows_the_definition(camera_regions, roi_file):
+    digest = camera_regions.digest("gate_cam")
+    assert digest is not None and camera_regions.digest("other_cam") is None
+
+    write_regions(roi_file, {"gate_cam": [{"rect": [0.0, 0.5, 0.5, 1.0]}], "yard_cam": [{"rect": [0, 0, 1, 1]}]})
+    assert camera_regions.digest("gate_cam") == digest
+
+    write_regions(roi_file, {"gate_cam": [{"rect": [0.0, 0.0, 0.5, 1.0]}]})
+    assert camera_regions.digest("gate_cam") != digest
+
+
+def encode_png(width: int = 64, height: int = 48) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (120, 120, 120)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_cached_results_are_keyed_on_camera_and_region(fake_registry, camera_regions, roi_file):
+    result_cache = ResultCache(ResultCacheConfig())
+    prediction_pipeline = PredictionPipeline(model_registry=fake_registry, result_cache=result_cache,
+                                             camera_regions=camera_regions)
+    image = encode_png()
+
+    gate = prediction_pipeline.run_pipeline(image, RESPONSE_FORMAT_JSON, camera_id="gate_cam")
+    prediction_pipeline.run_pipeline(image, RESPONSE_FORMAT_JSON, camera_id="gate_cam")
+    prediction_pipeline.run_pipeline(image, RESPONSE_FORMAT_JSON, camera_id="yard_cam")
+    write_regions(roi_file, {"gate_cam": [{"rect": [0.5, 0.5, 1.0, 1.0]}]})
+    moved = prediction_pipeline.run_pipeline(image, RESPONSE_FORMAT_JSON, camera_id="gate_cam")
+
+    stats = result_cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+    # the model only sees the crop around the region, its box is mapped back to the frame
+    assert [detection["box"] for detection in gate["detections"]] == [[1.0, 26.0, 11.0, 36.0]]
+    assert [detection["box"] for detection in moved["detections"]] == [[33.0, 26.0, 43.0, 36.0]]
@@ -0,0 +1,73 @@
+import time
+import torch
+from helmet.entity.config_entity import DegradationConfig
+from helmet.pipeline.prediction_pipeline import PredictionPipeline
+from helmet.serving.degradation import DegradationPolicy
+
+
+def make_policy(fake_registry, queue_depth=lambda: 0, **settings) -> DegradationPolicy:
+    config = DegradationConfig()
+    config.EVALUATE_INTERVAL_SECONDS = 0
+    config.STEP_DOWN_COOLDOWN_SECONDS = 0
+    config.STEP_UP_COOLDOWN_SECONDS = 0.05
+    for name, value in settings.items():
+        setattr(config, name, value)
+    return DegradationPolicy(fake_registry, queue_depth, config)
+
+
+def test_tier_zero_is_the_resident_model(fake_registry):
+    serving_tier = make_policy(fake_registry).resolve()
+
+    assert (serving_tier.name, serving_tier.index) == ("full", 0)
+    assert serving_tier.model is fake_registry.model
+
+
+def test_queue_pressure_steps_down_and_relief_steps_back_up(fake_registry):
+    depth = [100]
+    policy = make_policy(fake_registry, queue_depth=lambda: depth[0])
+
+    assert policy.evaluate() == "reduced"
+    assert policy.evaluate() == "minimal"
+    assert policy.evaluate() == "minimal"
+    depth[0] = 0
+    assert policy.evaluate() == "minimal"
+    time.sleep(0.1)
+    assert policy.evaluate() == "reduced"
+    assert policy.get_stats()["step_downs"] == 2
+
+
+def test_resolved_tier_stays_fixed_when_the_policy_moves(fake_registry):
+    depth = [100]
+    policy = make_policy(fake_registry, queue_depth=lambda: depth[0])
+    policy.evaluate()
+    serving_tier = policy.resolve()
+    depth[0] = 0
+    time.sleep(0.1)
+    policy.evaluate()
+
+    assert policy.tier_name == "full"
+    assert (serving_tier.name, serving_tier.index) == ("reduced", 1)
+    assert serving_tier.model is fake_registry.variants["reduced"]
+
+
+def test_tier_model_is_looked_up_once(fake_registry):
+    lookups = []
+    policy = make_policy(fake_registry)
+    policy.model_for = lambda tier_index: lookups.append(tier_index) or fake_registry.model
+    serving_tier = policy.resolve()
+
+    assert lookups == []
+    assert serving_tier.model is serving_tier.model
+    assert lookups == [0]
+
+
+def test_pipeline_runs_and_reports_its_pinned_tier(fake_registry):
+    policy = make_policy(fake_registry, queue_depth=lambda: 100)
+    policy.evaluate()
+    prediction_pipeline = PredictionPipeline(model_registry=fake_registry, degradation_policy=policy)
+    policy.evaluate()
+
+    prediction_pipeline.detect(torch.rand(3, 32, 32))
+    assert prediction_pipeline.tier_name == "reduced"
+    assert fake_registry.variants["reduced"].images_seen == 1
+    assert fake_registry.model.images_seen == 0
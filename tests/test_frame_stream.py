@@ -0,0 +1,37 @@
+import asyncio
+from helmet.serving.frame_stream import FrameSlot
+
+
+def test_full_slot_drops_the_oldest_frame():
+    async def scenario():
+        frame_slot = FrameSlot(max_pending=2)
+        for frame in range(5):
+            frame_slot.put(frame)
+        frame_slot.close()
+        return [await frame_slot.get() for _ in range(3)], frame_slot
+
+    frames, frame_slot = asyncio.run(scenario())
+    assert frames == [3, 4, None]
+    assert (frame_slot.received, frame_slot.dropped) == (5, 3)
+
+
+def test_get_waits_for_the_next_frame():
+    async def scenario():
+        frame_slot = FrameSlot()
+        getter = asyncio.create_task(frame_slot.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        frame_slot.put("frame")
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(scenario()) == "frame"
+
+
+def test_closed_slot_still_hands_out_pending_frames():
+    async def scenario():
+        frame_slot = FrameSlot(max_pending=4)
+        frame_slot.put("last")
+        frame_slot.close()
+        return await frame_slot.get(), await frame_slot.get()
+
+    assert asyncio.run(scenario()) == ("last", None)
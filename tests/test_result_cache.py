@@ -0,0 +1,106 @@
+import sys
+import threading
+import time
+from helmet.entity.config_entity import ResultCacheConfig
+from helmet.exception import HelmetException
+from helmet.serving.admission_control import AdmissionRejected
+from helmet.serving.result_cache import ResultCache
+
+
+def make_cache(ttl_seconds: float = 300, max_entries: int = 16) -> ResultCache:
+    config = ResultCacheConfig()
+    config.TTL_SECONDS = ttl_seconds
+    config.MAX_ENTRIES = max_entries
+    return ResultCache(config)
+
+
+def test_hit_until_the_entry_expires():
+    cache = make_cache(ttl_seconds=0.05)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_compute("k", compute) == 1
+    assert cache.get_or_compute("k", compute) == 1
+    time.sleep(0.1)
+    assert cache.get_or_compute("k", compute) == 2
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.get_or_compute("a", lambda: "a")
+    cache.get_or_compute("b", lambda: "b")
+    cache.get_or_compute("a", lambda: "a")
+    cache.get_or_compute("c", lambda: "c")
+
+    assert cache.get_or_compute("a", lambda: "recomputed") == "a"
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+
+
+def test_key_covers_model_version_and_parts():
+    assert ResultCache.make_key(b"img", "v1", "json") != ResultCache.make_key(b"img", "v2", "json")
+    assert ResultCache.make_key(b"img", "v1", "json", "cam1") != ResultCache.make_key(b"img", "v1", "json", "cam2")
+
+
+def run_concurrently(cache, owner_compute, waiters: int):
+    """Starts the owner, then waiters for the same key while the owner is still computing"""
+    results, started = [], threading.Event()
+
+    def owner():
+        try:
+            results.append(("owner", cache.get_or_compute("k", lambda: started.set() or owner_compute())))
+        except Exception as e:
+            results.append(("owner", e))
+
+    def waiter():
+        try:
+            results.append(("waiter", cache.get_or_compute("k", lambda: "waiter value")))
+        except Exception as e:
+            results.append(("waiter", e))
+
+    threads = [threading.Thread(target=owner)]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=waiter) for _ in range(waiters)]
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_duplicate_requests_wait_for_one_computation():
+    cache = make_cache()
+    results = run_concurrently(cache, lambda: time.sleep(0.2) or "owner value", waiters=3)
+
+    assert sorted(value for _, value in results) == ["owner value"] * 4
+    assert cache.get_stats()["coalesced"] == 3
+
+
+def test_waiters_share_a_genuine_failure():
+    cache = make_cache()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("cannot decode")
+
+    results = run_concurrently(cache, fail, waiters=2)
+    assert all(isinstance(value, ValueError) for _, value in results)
+
+
+def test_waiters_recompute_when_the_owner_request_expired():
+    cache = make_cache()
+
+    def expire():
+        time.sleep(0.2)
+        try:
+            raise AdmissionRejected("Request deadline passed before inference")
+        except AdmissionRejected as e:
+            raise HelmetException(e, sys) from e
+
+    results = run_concurrently(cache, expire, waiters=3)
+    waiter_values = [value for role, value in results if role == "waiter"]
+    assert waiter_values == ["waiter value"] * 3
+    assert cache.get_stats()["retried_after_owner_failure"] == 3
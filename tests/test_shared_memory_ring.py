@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import pytest
+import torch
+from helmet.serving.shared_memory_ring import SharedFrameRing, SharedResultRing, RESULT_STATUS_OK, RESULT_STATUS_DROPPED
+
+
+def ring_name(kind: str) -> str:
+    # unique per test process so parallel runs never meet in /dev/shm
+    return f"helmet_test_{os.getpid()}_{kind}"
+
+
+@pytest.fixture
+def frame_ring():
+    ring = SharedFrameRing(ring_name("frames"), create=True, slot_count=2, max_height=8, max_width=8)
+    yield ring
+    ring.close()
+
+
+@pytest.fixture
+def result_ring():
+    ring = SharedResultRing(ring_name("results"), create=True, slot_count=2, max_detections=4)
+    yield ring
+    ring.close()
+
+
+def test_frames_wrap_around_the_ring(frame_ring):
+    for sequence in range(5):
+        frame = np.full((4, 6, 3), sequence, dtype=np.uint8)
+        assert frame_ring.write(frame, sequence)
+        read_sequence, _, pixels = frame_ring.read()
+        assert read_sequence == sequence and pixels.shape == (4, 6, 3) and int(pixels[0, 0, 0]) == sequence
+        frame_ring.release()
+    assert frame_ring.pending() == 0
+
+
+def test_full_frame_ring_refuses_writes_until_a_slot_is_released(frame_ring):
+    frame = np.zeros((2, 2, 3), dtype=np.uint8)
+    assert frame_ring.write(frame, 0) and frame_ring.write(frame, 1)
+    assert not frame_ring.write(frame, 2)
+
+    assert frame_ring.read()[0] == 0
+    frame_ring.release()
+    assert frame_ring.write(frame, 2)
+    assert frame_ring.pending() == 2
+
+
+def test_oversized_frame_is_rejected(frame_ring):
+    with pytest.raises(ValueError):
+        frame_ring.write(np.zeros((16, 16, 3), dtype=np.uint8), 0)
+
+
+def test_reader_attached_by_name_sees_the_writer(frame_ring):
+    reader = SharedFrameRing(frame_ring.name)
+    try:
+        frame_ring.write(np.full((2, 2, 3), 7, dtype=np.uint8), 42)
+        sequence, _, pixels = reader.read()
+        assert sequence == 42 and int(pixels.max()) == 7
+        reader.release()
+        assert frame_ring.pending() == 0
+    finally:
+        reader.close()
+
+
+def test_results_carry_detections_tier_and_status(result_ring):
+    pred = {'boxes': torch.tensor([[1.0, 2.0, 3.0, 4.0]] * 6), 'labels': torch.ones(6, dtype=torch.int64),
+            'scores': torch.full((6,), 0.9)}
+    for sequence in range(3):
+        assert result_ring.write(sequence, pred, inference_ns=10, tier=1)
+        read_sequence, inference_ns, rows, tier, status = result_ring.read()
+        # capped at max_detections
+        assert (read_sequence, inference_ns, rows.shape, tier, status) == (sequence, 10, (4, 6), 1, RESULT_STATUS_OK)
+
+    assert result_ring.write(3, None, status=RESULT_STATUS_DROPPED)
+    sequence, _, rows, tier, status = result_ring.read()
+    assert (sequence, len(rows), tier, status) == (3, 0, -1, RESULT_STATUS_DROPPED)
+    assert result_ring.read() is None
+
+
+def test_frame_ring_is_not_a_result_ring(frame_ring):
+    with pytest.raises(ValueError):
+        SharedResultRing(frame_ring.name)
@@ -0,0 +1,91 @@
+import time
+import pytest
+import torch
+from helmet.entity.config_entity import StreamSchedulerConfig
+from helmet.serving.stream_scheduler import StreamScheduler, StaleFrameError, TooManyStreamsError
+
+
+def make_scheduler(fake_registry, **settings) -> StreamScheduler:
+    config = StreamSchedulerConfig()
+    config.MAX_WAIT_SECONDS = 0.01
+    config.DEVICE = torch.device("cpu")
+    for name, value in settings.items():
+        setattr(config, name, value)
+    return StreamScheduler(fake_registry, config)
+
+
+@pytest.fixture
+def scheduler_factory(fake_registry):
+    schedulers = []
+
+    def factory(**settings):
+        scheduler = make_scheduler(fake_registry, **settings)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield factory
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def test_frames_of_many_streams_are_batched(scheduler_factory, fake_registry):
+    scheduler = scheduler_factory(MAX_BATCH_SIZE=4)
+    futures = [scheduler.submit(f"cam{index}", torch.rand(3, 32, 32)) for index in range(4)]
+    scheduler.start()
+
+    assert all(future.result(timeout=5)['labels'].tolist() == [1] for future in futures)
+    assert fake_registry.model.batches == [4]
+
+
+def test_frame_past_its_deadline_is_dropped_without_a_forward(scheduler_factory, fake_registry):
+    scheduler = scheduler_factory()
+    future = scheduler.submit("cam", torch.rand(3, 32, 32), deadline_ms=-1)
+    scheduler.start()
+
+    with pytest.raises(StaleFrameError):
+        future.result(timeout=5)
+    assert fake_registry.model.images_seen == 0
+    assert scheduler.get_stats()["streams"]["cam"]["dropped_stale"] == 1
+
+
+def test_newer_frame_supersedes_the_oldest_pending_one(scheduler_factory):
+    scheduler = scheduler_factory(MAX_PENDING_PER_STREAM=1)
+    first = scheduler.submit("cam", torch.rand(3, 32, 32))
+    second = scheduler.submit("cam", torch.rand(3, 32, 32))
+    scheduler.start()
+
+    with pytest.raises(StaleFrameError):
+        first.result(timeout=5)
+    assert second.result(timeout=5) is not None
+    assert scheduler.get_stats()["streams"]["cam"]["dropped_superseded"] == 1
+
+
+def test_longest_idle_stream_is_evicted_to_make_room(scheduler_factory):
+    scheduler = scheduler_factory(MAX_STREAMS=2, IDLE_STREAM_TTL_SECONDS=60)
+    scheduler.start()
+    for stream_id in ["cam1", "cam2", "cam3"]:
+        scheduler.predict(stream_id, torch.rand(3, 32, 32))
+
+    stats = scheduler.get_stats()
+    assert sorted(stats["streams"]) == ["cam2", "cam3"]
+    assert stats["evicted_streams"] == 1
+
+
+def test_streams_idle_past_the_ttl_are_forgotten(scheduler_factory):
+    scheduler = scheduler_factory(IDLE_STREAM_TTL_SECONDS=0.05)
+    scheduler.start()
+    scheduler.predict("cam", torch.rand(3, 32, 32))
+    assert "cam" in scheduler.get_stats()["streams"]
+
+    time.sleep(0.1)
+    stats = scheduler.get_stats()
+    assert stats["streams"] == {}
+    assert stats["evicted_streams"] == 1
+
+
+def test_busy_streams_are_never_evicted(scheduler_factory):
+    scheduler = scheduler_factory(MAX_STREAMS=1, IDLE_STREAM_TTL_SECONDS=0)
+    scheduler.submit("cam1", torch.rand(3, 32, 32))
+
+    with pytest.raises(TooManyStreamsError):
+        scheduler.submit("cam2", torch.rand(3, 32, 32))
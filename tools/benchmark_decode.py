@@ -0,0 +1,65 @@
+#!/usr/bin/python
+
+# Micro-benchmark of PredictionPipeline.image_loader against the previous decode path.
+# python tools/benchmark_decode.py --sizes 1280x720 1920x1080 3840x2160 --repeats 20
+
+import io
+import time
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+from helmet.pipeline.prediction_pipeline import PredictionPipeline
+from helmet.constants import DECODE_DRAFT_MIN_SIZE
+
+
+def make_jpeg(width, height, quality=90):
+    # smooth gradients plus noise compress like a camera frame, unlike pure noise
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    noise = np.random.default_rng(0).normal(0, 12, (height, width, 3))
+    array = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1) + noise
+    buffered = io.BytesIO()
+    Image.fromarray(np.clip(array, 0, 255).astype(np.uint8)).save(buffered, format="JPEG", quality=quality)
+    return buffered.getvalue()
+
+
+def previous_image_loader(image_bytes):
+    """The decode path before the uint8 rewrite, kept here as the baseline"""
+    image = Image.open(io.BytesIO(image_bytes))
+    tensor_image = transforms.ToTensor()(image)
+    image_int = torch.tensor(tensor_image * 255, dtype=torch.uint8)
+    return tensor_image, image_int
+
+
+def time_per_call(func, repeats):
+    func()
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        func()
+    return 1000 * (time.perf_counter() - start_time) / repeats
+
+
+if __name__ == "__main__":
+    import argparse
+    import warnings
+
+    parser = argparse.ArgumentParser(description="Benchmark image decoding for the prediction pipeline.")
+    parser.add_argument("--sizes", nargs="+", default=["1280x720", "1920x1080", "3840x2160"], help="WIDTHxHEIGHT")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", UserWarning)
+    torch.set_num_threads(1)
+    prediction_pipeline = PredictionPipeline()
+
+    print(f"{'size':>11} {'MP':>6} {'previous ms/MP':>15} {'uint8 ms/MP':>12} {'draft ms/MP':>12}")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split("x"))
+        megapixels = width * height / 1e6
+        image_bytes = make_jpeg(width, height)
+
+        previous = time_per_call(lambda: previous_image_loader(image_bytes), args.repeats)
+        direct = time_per_call(lambda: prediction_pipeline.image_loader(image_bytes), args.repeats)
+        draft = time_per_call(lambda: prediction_pipeline.image_loader(image_bytes, DECODE_DRAFT_MIN_SIZE), args.repeats)
+        print(f"{size:>11} {megapixels:>6.2f} {previous / megapixels:>15.2f} {direct / megapixels:>12.2f} {draft / megapixels:>12.2f}")
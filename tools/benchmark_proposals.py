@@ -0,0 +1,88 @@
+#!/usr/bin/python
+
+# Latency and mAP of a trained model as the RPN proposal budget shrinks, on the raw test split.
+# The first row is torchvision's default budget with the score threshold applied after the model.
+# python tools/benchmark_proposals.py artifacts/<timestamp>/TrainedModel/model.pt \
+#     artifacts/<timestamp>/DataIngestionArtifacts --post-nms 1000 300 100 50 25
+
+import time
+import numpy as np
+import torch
+import albumentations as A
+from albumentations.pytorch import ToTensorV2
+from torch.utils.data import DataLoader, Subset
+from helmet.constants import BBOX_FORMAT, DATA_TRANSFORMATION_TEST_SPLIT, SERVING_INPUT_SIZE, SERVING_MAX_SIZE, \
+    PREDICTION_SCORE_THRESHOLD, SERVING_BOX_DETECTIONS_PER_IMG
+from helmet.ml.detection.engine import evaluate
+from helmet.ml.feature.helmet_detection import HelmetDetection
+from helmet.ml.models.model_configuration import set_model_input_size, set_model_proposal_budget, set_model_postprocess, \
+    make_model_variant
+
+
+def collate_fn(batch):
+    return tuple(zip(*batch))
+
+
+def benchmark_latency(model, images, score_threshold=None):
+    timings = []
+    with torch.inference_mode():
+        model([images[0]])
+        for image in images:
+            start_time = time.perf_counter()
+            pred = model([image])[0]
+            if score_threshold is not None:
+                # the filtering the pipeline did after the model before the threshold moved into it
+                keep = pred['scores'] > score_threshold
+                pred = {k: v[keep] for k, v in pred.items()}
+            timings.append(1000 * (time.perf_counter() - start_time))
+    return np.mean(timings), np.percentile(timings, 95)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark RPN proposal budgets of a trained detector.")
+    parser.add_argument("model_path", help="Pickled model saved by ModelTrainer.", type=str)
+    parser.add_argument("data_root", help="DataIngestionArtifacts directory holding the test split.", type=str)
+    parser.add_argument("--post-nms", nargs="+", type=int, default=[1000, 300, 100, 50, 25],
+                        help="Proposals kept after the RPN NMS, the pre NMS count per level is three times this.")
+    parser.add_argument("--num-images", type=int, default=None, help="Limit the test images used.")
+    parser.add_argument("--skip-map", action="store_true", help="Only measure latency.")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    # keep the original resolution, the model's own transform resizes to the serving size
+    transforms = A.Compose([ToTensorV2()], bbox_params=A.BboxParams(format=BBOX_FORMAT))
+    dataset = HelmetDetection(root=args.data_root, split=DATA_TRANSFORMATION_TEST_SPLIT, transforms=transforms)
+    if args.num_images is not None:
+        dataset = Subset(dataset, range(min(args.num_images, len(dataset))))
+    loader = DataLoader(dataset, batch_size=1, shuffle=False, collate_fn=collate_fn)
+    images = [dataset[index][0] for index in range(min(20, len(dataset)))]
+
+    model = torch.load(args.model_path, map_location=torch.device("cpu"))
+    model.eval()
+    set_model_input_size(model, SERVING_INPUT_SIZE, SERVING_MAX_SIZE)
+
+    results = []
+    baseline_latency = benchmark_latency(model, images, score_threshold=PREDICTION_SCORE_THRESHOLD)
+    # mAP is always measured with the score threshold in the model, so every row only counts confident boxes
+    thresholded = set_model_postprocess(make_model_variant(model), box_score_thresh=PREDICTION_SCORE_THRESHOLD)
+    baseline_map = None if args.skip_map else evaluate(thresholded, loader, device=torch.device("cpu")).coco_eval["bbox"].stats[0]
+    results.append(("default", *baseline_latency, baseline_map))
+
+    for post_nms_top_n in args.post_nms:
+        variant = make_model_variant(model)
+        set_model_proposal_budget(variant, rpn_pre_nms_top_n=3 * post_nms_top_n, rpn_post_nms_top_n=post_nms_top_n,
+                                  box_detections_per_img=SERVING_BOX_DETECTIONS_PER_IMG)
+        set_model_postprocess(variant, box_score_thresh=PREDICTION_SCORE_THRESHOLD)
+        latency_mean, latency_p95 = benchmark_latency(variant, images)
+        map_all = None if args.skip_map else evaluate(variant, loader, device=torch.device("cpu")).coco_eval["bbox"].stats[0]
+        results.append((str(post_nms_top_n), latency_mean, latency_p95, map_all))
+
+    print(f"{'post nms':>9} {'mean ms':>9} {'p95 ms':>9} {'speedup':>8} {'mAP':>7}")
+    for name, latency_mean, latency_p95, map_all in results:
+        map_text = f"{map_all:>7.3f}" if map_all is not None else f"{'-':>7}"
+        print(f"{name:>9} {latency_mean:>9.1f} {latency_p95:>9.1f} {baseline_latency[0] / latency_mean:>7.2f}x {map_text}")
@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+# Latency and mAP of a trained model at several serving resolutions, on the raw test split.
+# python tools/benchmark_resolution.py artifacts/<timestamp>/TrainedModel/model.pt \
+#     artifacts/<timestamp>/DataIngestionArtifacts --sizes 320 416 512 640 800
+
+import time
+import numpy as np
+import torch
+import albumentations as A
+from albumentations.pytorch import ToTensorV2
+from torch.utils.data import DataLoader, Subset
+from helmet.constants import BBOX_FORMAT, DATA_TRANSFORMATION_TEST_SPLIT
+from helmet.ml.detection.engine import evaluate
+from helmet.ml.feature.helmet_detection import HelmetDetection
+from helmet.ml.models.model_configuration import set_model_input_size
+
+
+def collate_fn(batch):
+    return tuple(zip(*batch))
+
+
+def benchmark_latency(model, images):
+    timings = []
+    with torch.inference_mode():
+        model([images[0]])
+        for image in images:
+            start_time = time.perf_counter()
+            model([image])
+            timings.append(1000 * (time.perf_counter() - start_time))
+    return np.mean(timings), np.percentile(timings, 95)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark serving resolutions of a trained detector.")
+    parser.add_argument("model_path", help="Pickled model saved by ModelTrainer.", type=str)
+    parser.add_argument("data_root", help="DataIngestionArtifacts directory holding the test split.", type=str)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[320, 416, 512, 640, 800])
+    parser.add_argument("--max-size-ratio", type=float, default=1333 / 800)
+    parser.add_argument("--num-images", type=int, default=None, help="Limit the test images used.")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    # keep the original resolution, the model's own transform does the resizing under test
+    transforms = A.Compose([ToTensorV2()], bbox_params=A.BboxParams(format=BBOX_FORMAT))
+    dataset = HelmetDetection(root=args.data_root, split=DATA_TRANSFORMATION_TEST_SPLIT, transforms=transforms)
+    if args.num_images is not None:
+        dataset = Subset(dataset, range(min(args.num_images, len(dataset))))
+    loader = DataLoader(dataset, batch_size=1, shuffle=False, collate_fn=collate_fn)
+    images = [dataset[index][0] for index in range(min(20, len(dataset)))]
+
+    model = torch.load(args.model_path, map_location=torch.device("cpu"))
+    model.eval()
+
+    results = []
+    for size in args.sizes:
+        set_model_input_size(model, size, int(size * args.max_size_ratio))
+        latency_mean, latency_p95 = benchmark_latency(model, images)
+        stats = evaluate(model, loader, device=torch.device("cpu")).coco_eval["bbox"].stats
+        results.append((size, latency_mean, latency_p95, stats[0], stats[1]))
+
+    print(f"{'size':>6} {'mean ms':>9} {'p95 ms':>9} {'mAP':>7} {'mAP@.5':>7}")
+    for size, latency_mean, latency_p95, map_all, map_50 in results:
+        print(f"{size:>6} {latency_mean:>9.1f} {latency_p95:>9.1f} {map_all:>7.3f} {map_50:>7.3f}")
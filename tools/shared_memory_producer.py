@@ -0,0 +1,69 @@
+#!/usr/bin/python
+
+# Reference frame grabber for the shared memory ingestion path. Start the server with
+# HELMET_SHM_STREAMS=cam01 python app.py, then feed it a video and print the detections:
+# python tools/shared_memory_producer.py cam01 site_footage.mp4 --fps 25
+
+import time
+import cv2
+from helmet.constants import PREDICTION_CLASSES, DEGRADATION_TIERS
+from helmet.serving.shared_memory_ring import SharedFrameRing, SharedResultRing, frame_ring_name, result_ring_name, \
+    RESULT_STATUS_ERROR, RESULT_STATUS_DROPPED
+
+
+def print_results(result_ring):
+    while True:
+        result = result_ring.read()
+        if result is None:
+            return
+        sequence, inference_ns, rows, tier, status = result
+        if status == RESULT_STATUS_ERROR:
+            print(f"frame {sequence}: inference failed, see the server log")
+            continue
+        if status == RESULT_STATUS_DROPPED:
+            print(f"frame {sequence}: dropped, too late to be worth inferring")
+            continue
+        labels = [PREDICTION_CLASSES[int(label)] if int(label) < len(PREDICTION_CLASSES) else str(int(label))
+                  for label in rows[:, 4]]
+        tier_name = f" on the {DEGRADATION_TIERS[tier]['name']} tier" if 0 <= tier < len(DEGRADATION_TIERS) else ""
+        print(f"frame {sequence}: {len(rows)} detections {labels} in {inference_ns / 1e6:.1f} ms{tier_name}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Push video frames into a shared memory frame ring.")
+    parser.add_argument("stream", help="Stream name listed in HELMET_SHM_STREAMS on the server.", type=str)
+    parser.add_argument("video_path", help="Video file or camera index.", type=str)
+    parser.add_argument("--fps", type=float, default=None, help="Pace frames at this rate, as fast as possible if unset.")
+    args = parser.parse_args()
+
+    frame_ring = SharedFrameRing(frame_ring_name(args.stream))
+    result_ring = SharedResultRing(result_ring_name(args.stream))
+    capture = cv2.VideoCapture(int(args.video_path) if args.video_path.isdigit() else args.video_path)
+
+    sequence = 0
+    dropped = 0
+    start_time = time.perf_counter()
+    while True:
+        ok, frame_bgr = capture.read()
+        if not ok:
+            break
+        # frames are handed over as RGB, exactly what the model consumes
+        if not frame_ring.write(cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB), sequence):
+            dropped += 1
+        sequence += 1
+        print_results(result_ring)
+        if args.fps:
+            time.sleep(max(0.0, start_time + sequence / args.fps - time.perf_counter()))
+
+    # wait for the frames still in flight
+    deadline = time.perf_counter() + 5
+    while frame_ring.pending() and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.5)
+    print_results(result_ring)
+    capture.release()
+    frame_ring.close()
+    result_ring.close()
+    print(f"sent {sequence - dropped} frames, dropped {dropped} while every slot was busy")